@@ -0,0 +1,86 @@
+"""Benchmarks join_shapefile_to_dataframe: the old read_file + set_index + join path against the cached store.
+
+Each path joins the same dataframe to the same shapefile `repeat` times in a
+fresh interpreter, as a notebook session re-running the join would.
+
+Usage:
+    python benchmarks/bench_joins.py 1000 10000 100000
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+OLD = """
+import geopandas as gpd
+def join(df, shapefile, index_column, join_column):
+    gdf = gpd.read_file(shapefile)
+    gdf = gdf.set_index(index_column)
+    gdf[join_column] = gdf.index
+    gdf = gdf.join(df, on=join_column)
+    return gdf
+"""
+
+NEW = """
+from maplab.maplab import join_shapefile_to_dataframe as join
+"""
+
+RUNNER = """
+import resource, sys, time
+import pandas as pd
+path, repeat = sys.argv[1], int(sys.argv[2])
+{code}
+df = pd.read_parquet(path.replace(".shp", ".parquet"))
+times = []
+for _ in range(repeat):
+    start = time.perf_counter()
+    out = join(df, path, "county", "NAME")
+    times.append(time.perf_counter() - start)
+print(times[0], sum(times[1:]) / max(len(times) - 1, 1), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def write_data(path, n):
+    """Writes a shapefile of n county polygons and a parquet table of values keyed by county."""
+    import geopandas as gpd
+    import numpy as np
+    import pandas as pd
+    import shapely
+
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-90, -81, n), rng.uniform(34, 37, n)
+    names = [f"County {i}" for i in range(n)]
+    gdf = gpd.GeoDataFrame(
+        {"county": names, "state": "TN", "area": rng.uniform(size=n)},
+        geometry=shapely.buffer(shapely.points(x, y), 0.05, quad_segs=16),
+        crs="EPSG:4326",
+    )
+    gdf.to_file(path)
+    pd.DataFrame({"population": rng.integers(1000, 100000, n)}, index=names).to_parquet(path.replace(".shp", ".parquet"))
+
+
+def run(code, path, repeat):
+    """Runs the join in a fresh interpreter and returns (first seconds, repeat seconds, peak RSS in MB)."""
+    env = dict(os.environ, MAPLAB_CACHE_DIR=os.path.join(os.path.dirname(path), "cache"))
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(code=code), path, str(repeat)],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout.split()
+    return float(out[0]), float(out[1]), float(out[2])
+
+
+def main(sizes, repeat=5):
+    print(f"{'features':>10} {'path':>6} {'first s':>9} {'repeat s':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"counties_{n}.shp")
+            write_data(path, n)
+            # "cold" is the first session (converting to GeoParquet), "warm" a later one.
+            for label, code in [("old", OLD), ("cold", NEW), ("warm", NEW)]:
+                first, again, peak = run(code, path, repeat)
+                print(f"{n:>10} {label:>6} {first:>9.3f} {again:>9.3f} {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,74 @@
+"""Benchmarks CSV point ingestion: the old read_csv + shapely path against maplab.points.read_points.
+
+Usage:
+    python benchmarks/bench_points.py 100000 1000000 10000000
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+OLD = """
+import pandas as pd
+import geopandas as gpd
+df = pd.read_csv(path)
+gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['longitude'], df['latitude']))
+coords = [[point.y, point.x] for point in gdf['geometry'].tolist()]
+"""
+
+NEW = """
+from maplab.points import read_points
+lon, lat, _ = read_points(path)
+"""
+
+RUNNER = """
+import resource, sys, time
+path = sys.argv[1]
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def write_csv(path, n, chunk=1_000_000):
+    """Writes a CSV of n random points with a few attribute columns."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        df = pd.DataFrame({
+            "id": np.arange(start, start + size),
+            "name": rng.choice(["Knoxville", "Nashville", "Memphis", "Chattanooga"], size),
+            "longitude": rng.uniform(-90, -81, size).round(6),
+            "latitude": rng.uniform(34, 37, size).round(6),
+            "value": rng.normal(size=size),
+        })
+        df.to_csv(path, mode="a" if start else "w", header=not start, index=False)
+
+
+def run(code, path):
+    """Runs a snippet in a fresh interpreter and returns (seconds, peak RSS in MB)."""
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(code=code), path],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(out[0]), float(out[1])
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'path':>6} {'seconds':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"points_{n}.csv")
+            write_csv(path, n)
+            for label, code in [("old", OLD), ("new", NEW)]:
+                seconds, peak = run(code, path)
+                print(f"{n:>10} {label:>6} {seconds:>9.2f} {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [100_000, 1_000_000, 10_000_000])
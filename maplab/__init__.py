@@ -4,4 +4,54 @@ __author__ = """Hannah Williams"""
 __email__ = 'hwilli72@vols.utk.edu'
 __version__ = '0.2.2'
 
-from .maplab import *
\ No newline at end of file
+import importlib
+
+# Submodules are only imported the first time they (or one of their
+# attributes) are accessed, so ``import maplab`` stays cheap.
+_submodules = [
+    "maplab",
+    "foliumap",
+    "basemaps",
+    "choropleth",
+    "chunks",
+    "events",
+    "geocoder",
+    "points",
+    "raster",
+    "remote",
+    "tables",
+    "tiles",
+    "vector",
+]
+
+
+def __getattr__(name):
+    """Lazily resolves submodules and the public names of ``maplab.maplab``.
+
+    Args:
+        name (str): The attribute being looked up on the package.
+
+    Returns:
+        object: The submodule or attribute.
+    """
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+
+    if name.startswith("__") and name != "__all__":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(".maplab", __name__)
+    if name == "__all__":
+        return [n for n in dir(module) if not n.startswith("_")]
+
+    try:
+        value = getattr(module, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(__getattr__("__all__")))
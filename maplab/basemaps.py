@@ -0,0 +1,114 @@
+"""Basemap lookup and pooling helpers."""
+
+from collections import OrderedDict
+
+GOOGLE_BASEMAPS = {
+    "roadmap": "http://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}",
+    "satellite": "http://mt0.google.com/vt/lyrs=y&hl=en&x={x}&y={y}&z={z}",
+    "terrain_only": "http://mt0.google.com/vt/lyrs=t&hl=en&x={x}&y={y}&z={z}",
+    "terrain": "http://mt0.google.com/vt/lyrs=p&hl=en&x={x}&y={y}&z={z}",
+    "terrain with labels": "http://mt0.google.com/vt/lyrs=p&hl=en&x={x}&y={y}&z={z}",
+}
+
+_lookup = None
+
+
+def basemap_lookup():
+    """Returns the table of available basemaps, building it on first use.
+
+    Keys are lower-case names: the Google basemaps, every xyzservices
+    provider (e.g. "openstreetmap.mapnik") and every provider group, which
+    maps to its first provider (e.g. "openstreetmap").
+
+    Returns:
+        dict: The basemaps as {name: xyzservices.TileProvider or {"url", "name", "attribution"}}.
+    """
+    global _lookup
+    if _lookup is None:
+        import xyzservices.providers as xyz
+
+        table = {}
+        for name, provider in xyz.flatten().items():
+            table.setdefault(name.lower(), provider)
+            table.setdefault(name.split(".")[0].lower(), provider)
+        for name, url in GOOGLE_BASEMAPS.items():
+            table[name] = {"url": url, "name": name, "attribution": "Google"}
+        _lookup = table
+    return _lookup
+
+
+def resolve_basemap(basemap):
+    """Looks up a basemap by name.
+
+    Args:
+        basemap (str): The basemap name, e.g. "SATELLITE" or "Esri.WorldImagery".
+
+    Returns:
+        dict: The "url", "name" and "attribution" of the basemap.
+    """
+    entry = basemap_lookup().get(basemap.lower())
+    if entry is None:
+        raise ValueError(f"Basemap '{basemap}' not found.")
+    if isinstance(entry, dict):
+        return entry
+
+    try:
+        url = entry.build_url()
+    except ValueError as e:
+        raise ValueError(f"Basemap '{basemap}' cannot be used: {e}") from None
+    return {"url": url, "name": entry.name, "attribution": entry.attribution}
+
+
+class BasemapPool:
+    """Keeps one active basemap on a map plus a few hidden, warm ones.
+
+    Switching to a basemap in the pool only toggles visibility, so the tiles
+    the browser already loaded are reused and only one basemap is rendered
+    at a time. The least recently used hidden basemaps are removed once the
+    pool is full.
+
+    Args:
+        m (maplab.Map): The map.
+        size (int, optional): The maximum number of basemap layers kept on the map. Defaults to 3.
+    """
+
+    def __init__(self, m, size=3) -> None:
+        self.m = m
+        self.size = size
+        self.layers = OrderedDict()
+        self.active = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def switch(self, basemap, **kwargs):
+        """Makes a basemap the visible one.
+
+        Args:
+            basemap (str): The basemap name.
+            kwargs: Keyword arguments to pass to add_tile_layer when the basemap is created.
+
+        Returns:
+            ipyleaflet.TileLayer: The basemap layer.
+        """
+        key = basemap.lower()
+        with self.m.batch():
+            if key in self.layers:
+                self.stats["hits"] += 1
+                layer = self.layers[key]
+                self.layers.move_to_end(key)
+            else:
+                self.stats["misses"] += 1
+                entry = resolve_basemap(basemap)
+                layer = self.m.add_tile_layer(entry["url"], name=entry["name"], attribution=entry["attribution"],
+                                              **kwargs)
+                self.layers[key] = layer
+
+            if self.active is not None and self.active is not layer:
+                self.active.visible = False
+            layer.visible = True
+            self.active = layer
+
+            while len(self.layers) > self.size:
+                _, old = self.layers.popitem(last=False)
+                self.m.remove_layer(old)
+                self.stats["evictions"] += 1
+        return layer
@@ -0,0 +1,216 @@
+"""Choropleth classification and styling helpers."""
+
+SCHEMES = ["quantile", "equal_interval", "natural_breaks"]
+
+
+def quantile_breaks(values, k=5):
+    """Returns class upper bounds that put about the same number of values in each class.
+
+    Args:
+        values (numpy.ndarray): The finite values.
+        k (int, optional): The number of classes. Defaults to 5.
+
+    Returns:
+        numpy.ndarray: The upper bound of each class (duplicates removed).
+    """
+    import numpy as np
+
+    return np.unique(np.quantile(values, np.linspace(0, 1, k + 1)[1:]))
+
+
+def equal_interval_breaks(values, k=5):
+    """Returns class upper bounds that split the value range into equal intervals.
+
+    Args:
+        values (numpy.ndarray): The finite values.
+        k (int, optional): The number of classes. Defaults to 5.
+
+    Returns:
+        numpy.ndarray: The upper bound of each class.
+    """
+    import numpy as np
+
+    lo, hi = values.min(), values.max()
+    return np.unique(lo + (hi - lo) * np.linspace(0, 1, k + 1)[1:])
+
+
+def natural_breaks(values, k=5, max_samples=1000, seed=0):
+    """Returns Fisher-Jenks natural break class upper bounds.
+
+    The classes minimize the sum of squared deviations from their means,
+    found by dynamic programming over the sorted values. Each class level is
+    one vectorized minimum over an (n, n) cost matrix, and larger inputs are
+    sampled down to max_samples values (keeping the minimum and maximum).
+
+    Args:
+        values (numpy.ndarray): The finite values.
+        k (int, optional): The number of classes. Defaults to 5.
+        max_samples (int, optional): The largest number of values classified exactly. Defaults to 1000.
+        seed (int, optional): The sampling seed. Defaults to 0.
+
+    Returns:
+        numpy.ndarray: The upper bound of each class.
+    """
+    import numpy as np
+
+    x = np.sort(np.asarray(values, dtype="float64"))
+    if len(x) > max_samples:
+        rng = np.random.default_rng(seed)
+        x = np.sort(np.r_[x[0], x[-1], rng.choice(x[1:-1], max_samples - 2, replace=False)])
+    n = len(x)
+    k = min(k, len(np.unique(x)))
+    if k <= 1:
+        return np.array([x[-1]])
+
+    # cost[i, j]: squared deviations of x[i..j] from their mean (inf when i > j).
+    s1 = np.r_[0, np.cumsum(x)]
+    s2 = np.r_[0, np.cumsum(x * x)]
+    i, j = np.triu_indices(n)
+    cost = np.full((n, n), np.inf)
+    count = j - i + 1
+    cost[i, j] = s2[j + 1] - s2[i] - (s1[j + 1] - s1[i]) ** 2 / count
+
+    # best[j]: the smallest error of splitting x[0..j] into the current number of classes.
+    best = cost[0].copy()
+    starts = []
+    for _ in range(1, k):
+        # Class c covers x[i..j], after the best split of x[0..i-1] into c - 1 classes.
+        total = np.r_[np.inf, best[:-1]][:, None] + cost
+        starts.append(total.argmin(axis=0))
+        best = total.min(axis=0)
+
+    bounds = [x[-1]]
+    end = n - 1
+    for start in reversed(starts):
+        end = start[end] - 1
+        bounds.append(x[end])
+    return np.unique(bounds)
+
+
+BREAKS = {
+    "quantile": quantile_breaks,
+    "equal_interval": equal_interval_breaks,
+    "natural_breaks": natural_breaks,
+}
+
+
+def classify(values, scheme="quantile", k=5):
+    """Classifies values into k classes.
+
+    Args:
+        values (array-like): The values. Missing values get class -1.
+        scheme (str, optional): "quantile", "equal_interval" or "natural_breaks". Defaults to "quantile".
+        k (int, optional): The number of classes. Defaults to 5.
+
+    Returns:
+        tuple: The class of each value (numpy.ndarray of int) and the class upper bounds.
+    """
+    import numpy as np
+
+    if scheme not in BREAKS:
+        raise ValueError(f"Scheme '{scheme}' not found. Available schemes: {', '.join(SCHEMES)}.")
+    values = np.asarray(values, dtype="float64")
+    valid = np.isfinite(values)
+    if not valid.any():
+        return np.full(len(values), -1), np.array([])
+
+    bins = BREAKS[scheme](values[valid], k)
+    classes = np.minimum(np.searchsorted(bins, values, side="left"), len(bins) - 1)
+    return np.where(valid, classes, -1), bins
+
+
+def class_colors(n, colormap="ylorrd"):
+    """Returns n hex colors sampled evenly from a colormap.
+
+    Args:
+        n (int): The number of colors.
+        colormap (str, optional): The colormap (see maplab.raster.COLORMAPS). Defaults to "ylorrd".
+
+    Returns:
+        list: The "#rrggbb" colors.
+    """
+    from .raster import colormap_lut
+
+    lut = colormap_lut(colormap, max(n, 2))[:n] if n > 1 else colormap_lut(colormap, 2)[-1:]
+    return ["#%02x%02x%02x" % tuple(rgb) for rgb in lut.tolist()]
+
+
+class Choropleth:
+    """A GeoJSON choropleth whose per-feature styles are embedded in the data.
+
+    ipyleaflet applies the "style" property of each feature in the browser,
+    so no Python style callback runs. The geometries are serialized once:
+    restyling only classifies the new column and swaps each feature's style
+    dict, reusing the geometry objects of the first payload.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The features.
+        column (str): The column to map.
+        scheme (str, optional): The classification scheme (see classify). Defaults to "quantile".
+        k (int, optional): The number of classes. Defaults to 5.
+        colormap (str, optional): The colormap. Defaults to "ylorrd".
+        style (dict, optional): The style shared by all features. Defaults to None (thin white outlines).
+        missing_color (str, optional): The fill color of features without a value. Defaults to "#cccccc".
+        name (str, optional): The layer name. Defaults to "Choropleth".
+        kwargs: Keyword arguments to pass to the GeoJSON layer.
+    """
+
+    def __init__(self, gdf, column, scheme="quantile", k=5, colormap="ylorrd", style=None, missing_color="#cccccc",
+                 name="Choropleth", **kwargs) -> None:
+        import ipyleaflet
+
+        from .vector import to_geojson, to_wgs84
+
+        self.gdf = to_wgs84(gdf)
+        self.base_style = {"color": "#ffffff", "weight": 1, "fillOpacity": 0.7, **(style or {})}
+        self.missing_color = missing_color
+        self.geometries = [f["geometry"] for f in to_geojson(self.gdf[[self.gdf.geometry.name]])["features"]]
+        self.layer = ipyleaflet.GeoJSON(name=name, **kwargs)
+        self.restyle(column, scheme=scheme, k=k, colormap=colormap)
+
+    def styles(self):
+        """Returns the style dict of each feature for the current classification.
+
+        Returns:
+            list: One style dict per feature.
+        """
+        fills = self.colors + [self.missing_color]
+        # One shared dict per class keeps building the payload proportional to the number of classes.
+        by_class = [{**self.base_style, "fillColor": fill} for fill in fills]
+        return [by_class[c] for c in self.classes.tolist()]
+
+    def restyle(self, column=None, scheme=None, k=None, colormap=None):
+        """Reclassifies the features and updates their colors.
+
+        Args:
+            column (str, optional): The column to map. Defaults to None (unchanged).
+            scheme (str, optional): The classification scheme. Defaults to None (unchanged).
+            k (int, optional): The number of classes. Defaults to None (unchanged).
+            colormap (str, optional): The colormap. Defaults to None (unchanged).
+        """
+        self.column = column or self.column
+        self.scheme = scheme or self.scheme
+        self.k = k or self.k
+        self.colormap = colormap or self.colormap
+
+        self.classes, self.bins = classify(self.gdf[self.column], self.scheme, self.k)
+        self.colors = class_colors(len(self.bins), self.colormap)
+        self.layer.data = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "id": i, "properties": {"style": style}, "geometry": geometry}
+                for i, (geometry, style) in enumerate(zip(self.geometries, self.styles()))
+            ],
+        }
+        if getattr(self, "legend", None) is not None:
+            self.legend.legend = self.legend_items()
+            self.legend.title = self.column
+
+    def legend_items(self):
+        """Returns the legend entries of the current classes.
+
+        Returns:
+            dict: The class labels mapped to their colors.
+        """
+        lows = [float(self.gdf[self.column].min())] + self.bins[:-1].tolist()
+        return {f"{lo:,.4g} - {hi:,.4g}": color for lo, hi, color in zip(lows, self.bins.tolist(), self.colors)}
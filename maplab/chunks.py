@@ -0,0 +1,59 @@
+"""Helpers for processing large files chunk by chunk."""
+
+
+def csv_ranges(in_csv, chunk_bytes):
+    """Splits a CSV file into line-aligned byte ranges after the header.
+
+    Quoted values containing line breaks are not supported.
+
+    Args:
+        in_csv (str): The CSV file.
+        chunk_bytes (int): The approximate size of each range in bytes.
+
+    Yields:
+        tuple: The (start, end) byte offsets of each range.
+    """
+    import os
+
+    size = os.path.getsize(in_csv)
+    with open(in_csv, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def imap_bounded(fn, tasks, processes=None):
+    """Applies a function to each task, optionally in a process pool, yielding the results in order.
+
+    With a pool, at most 2 * processes tasks are in flight at once, so memory
+    stays flat however many tasks there are.
+
+    Args:
+        fn (callable): A picklable function.
+        tasks (iterable): The argument tuples, one per call.
+        processes (int, optional): The number of worker processes. Defaults to None (no pool).
+
+    Yields:
+        object: The result of each call.
+    """
+    if not processes:
+        for args in tasks:
+            yield fn(*args)
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for args in tasks:
+            pending.append(pool.submit(fn, *args))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,153 @@
+"""Throttled interaction event dispatch for the map classes."""
+
+import threading
+import time
+
+
+class _Handler:
+    """A handler registered on an EventDispatcher with its rate limiting state."""
+
+    def __init__(self, fn, throttle, debounce, latest) -> None:
+        self.fn = fn
+        self.throttle = throttle
+        self.debounce = debounce
+        self.latest = latest
+        self.last = None
+        self.pending = None
+        self.timer = None
+
+
+class EventDispatcher:
+    """Routes the interaction events of a map to handlers, with per-handler rate limiting.
+
+    A single on_interaction callback is registered on the map, and events are
+    passed on by type. Each handler can be:
+
+    - throttled: handled at most once every `throttle` seconds. With
+      latest=True, the last event of each window is delivered when the
+      window ends, so the final position of a drag is never lost.
+    - debounced: handled once no event of its type has arrived for
+      `debounce` seconds, with the last event.
+
+    Events superseded by a newer one are counted as dropped.
+
+    Args:
+        m (ipyleaflet.Map): The map.
+        clock (callable, optional): The time source in seconds. Defaults to time.monotonic.
+    """
+
+    def __init__(self, m, clock=time.monotonic) -> None:
+        self.m = m
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.handlers = {}
+        self.stats = {}
+        m.on_interaction(self.dispatch)
+
+    def on(self, event_type, fn, throttle=None, debounce=None, latest=True):
+        """Registers a handler for an event type.
+
+        Args:
+            event_type (str): The interaction type, e.g. "click", "mousemove", "mousedown" or "mouseup".
+            fn (callable): The handler, called with the event fields as keyword arguments.
+            throttle (float, optional): The minimum number of seconds between calls. Defaults to None.
+            debounce (float, optional): The number of quiet seconds to wait before calling. Defaults to None.
+            latest (bool, optional): Whether a throttled handler receives the last event of each window
+                once the window ends. Defaults to True.
+
+        Returns:
+            callable: The handler.
+        """
+        if throttle and debounce:
+            raise ValueError("throttle and debounce cannot be used together.")
+        with self.lock:
+            self.handlers.setdefault(event_type, []).append(_Handler(fn, throttle, debounce, latest))
+            self.stats.setdefault(event_type, {"received": 0, "handled": 0, "dropped": 0})
+        return fn
+
+    def off(self, event_type, fn):
+        """Removes a handler.
+
+        Args:
+            event_type (str): The interaction type.
+            fn (callable): The handler.
+        """
+        with self.lock:
+            for handler in [h for h in self.handlers.get(event_type, []) if h.fn is fn]:
+                if handler.timer is not None:
+                    handler.timer.cancel()
+                self.handlers[event_type].remove(handler)
+
+    def dispatch(self, **event):
+        """Passes an interaction event to the handlers of its type."""
+        event_type = event.get("type")
+        with self.lock:
+            handlers = list(self.handlers.get(event_type, []))
+            if not handlers:
+                return
+            self.stats[event_type]["received"] += 1
+
+        for handler in handlers:
+            self._receive(event_type, handler, event)
+
+    def _receive(self, event_type, handler, event):
+        with self.lock:
+            if handler.debounce:
+                self._replace(event_type, handler, event)
+                self._schedule(event_type, handler, handler.debounce, restart=True)
+                return
+
+            now = self.clock()
+            if handler.throttle and handler.last is not None and now - handler.last < handler.throttle:
+                if handler.latest:
+                    self._replace(event_type, handler, event)
+                    self._schedule(event_type, handler, handler.throttle - (now - handler.last))
+                else:
+                    self.stats[event_type]["dropped"] += 1
+                return
+            handler.last = now
+            # An event still waiting from the previous window is older than this one.
+            if handler.timer is not None:
+                handler.timer.cancel()
+                handler.timer = None
+            if handler.pending is not None:
+                handler.pending = None
+                self.stats[event_type]["dropped"] += 1
+        self._call(event_type, handler, event)
+
+    def _replace(self, event_type, handler, event):
+        if handler.pending is not None:
+            self.stats[event_type]["dropped"] += 1
+        handler.pending = event
+
+    def _schedule(self, event_type, handler, delay, restart=False):
+        if handler.timer is not None:
+            if not restart:
+                return
+            handler.timer.cancel()
+        handler.timer = threading.Timer(delay, self._fire, args=(event_type, handler))
+        handler.timer.daemon = True
+        handler.timer.start()
+
+    def _fire(self, event_type, handler):
+        with self.lock:
+            event, handler.pending, handler.timer = handler.pending, None, None
+            if event is None:
+                return
+            handler.last = self.clock()
+        self._call(event_type, handler, event)
+
+    def _call(self, event_type, handler, event):
+        with self.lock:
+            self.stats[event_type]["handled"] += 1
+        handler.fn(**event)
+
+    def flush(self):
+        """Delivers every pending event now instead of waiting for its timer."""
+        with self.lock:
+            pending = [(t, h) for t, hs in self.handlers.items() for h in hs if h.pending is not None]
+            for _, handler in pending:
+                if handler.timer is not None:
+                    handler.timer.cancel()
+        for event_type, handler in pending:
+            self._fire(event_type, handler)
@@ -48,6 +48,35 @@ class Map(folium.Map):
         basemap = folium.basemaps[name](**kwargs)
         self.add_child(basemap)
 
+# Add GeoDataFrame function
+    def add_gdf(self, gdf, name, **kwargs):
+        """Add a GeoDataFrame to the map.
+
+        The GeoJSON is taken from the shared cache of maplab.vector.to_geojson, so data
+        already shown on a map (either backend) is not serialized again.
+
+        Args:
+            gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+            name (str): The name of the layer.
+            kwargs: Keyword arguments to pass to folium.GeoJson.
+
+        Returns:
+            folium.GeoJson: The layer.
+        """
+        from .vector import to_geojson, to_wgs84
+
+        gdf = to_wgs84(gdf)
+        if not gdf.index.is_unique:
+            # folium rewrites the ids of features without unique ones, which would modify the shared GeoJSON.
+            gdf = gdf.reset_index(drop=True)
+        layer = folium.features.GeoJson(
+            data=to_geojson(gdf),
+            name=name,
+            **kwargs
+        )
+        self.add_child(layer)
+        return layer
+
 # Add shapefile function
     def add_shapefile(self, path, name, **kwargs):
         """Add a shapefile to the map.
@@ -55,29 +84,38 @@ class Map(folium.Map):
             path (str): The path to the shapefile.
             name (str): The name of the shapefile.
         """
-        shapefile = folium.features.GeoJson(
-            data=path,
-            name=name,
-            **kwargs
-        )
-        self.add_child(shapefile)
+        import geopandas as gpd
+
+        return self.add_gdf(gpd.read_file(path), name, **kwargs)
 
 # Add GeoJSON function
     def add_geojson(self, path, name, **kwargs):
         """Add a GeoJSON file to the map.
         Args:
-            path (str): The path to the GeoJSON file.
+            path (str | dict | geopandas.GeoDataFrame): The path to the GeoJSON file, GeoJSON data
+                or a GeoDataFrame.
             name (str): The name of the GeoJSON file.
         """
+        import os
+
+        if hasattr(path, "geometry"):
+            return self.add_gdf(path, name, **kwargs)
+        if isinstance(path, str) and os.path.isfile(path):
+            import geopandas as gpd
+
+            from .vector import read_geojson
+
+            data = read_geojson(path)
+            if data["features"]:
+                # Local files go through add_gdf and the shared GeoJSON cache; GeoJSON dicts and URLs are
+                # passed to folium as they are.
+                return self.add_gdf(gpd.GeoDataFrame.from_features(data, crs="EPSG:4326"), name, **kwargs)
+            path = data
+
         geojson = folium.features.GeoJson(
             data=path,
             name=name,
             **kwargs
         )
         self.add_child(geojson)
-
-
-
-
-
-
+        return geojson
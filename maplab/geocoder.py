@@ -0,0 +1,181 @@
+"""Offline geocoding from a local gazetteer."""
+
+import unicodedata
+
+
+def normalize_name(name):
+    """Normalizes a place name for matching: no accents, lower case and single spaces.
+
+    Args:
+        name (str): The place name.
+
+    Returns:
+        str: The normalized name.
+    """
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())
+
+
+def normalize_names(names):
+    """Normalizes many place names, processing each distinct name once.
+
+    Args:
+        names (array-like): The place names.
+
+    Returns:
+        numpy.ndarray: The normalized names, as an object array.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(names, dtype="object").fillna(""), sort=False)
+    normalized = pd.Index(uniques).map(normalize_name).to_numpy(dtype="object")
+    return normalized[codes]
+
+
+class Geocoder:
+    """Geocodes place names offline from a gazetteer CSV such as docs/examples/data/world_cities.csv.
+
+    Names are normalized and sorted once, so every name that starts with a
+    prefix is a contiguous range of the table found with two binary searches,
+    and the range is ranked by population. Exact lookups for batch geocoding
+    go through a hash index of the most populous place for each name.
+
+    Args:
+        in_csv (str): The gazetteer CSV.
+        name (str, optional): The name column. Defaults to "name".
+        x (str, optional): The longitude column. Defaults to "longitude".
+        y (str, optional): The latitude column. Defaults to "latitude".
+        population (str, optional): The population column used for ranking. Defaults to "pop_max".
+        columns (list, optional): Other columns to keep and return, e.g. ["sov_a3"]. Defaults to None.
+    """
+
+    def __init__(self, in_csv, name="name", x="longitude", y="latitude", population="pop_max", columns=None) -> None:
+        import numpy as np
+        import pandas as pd
+
+        columns = list(columns or [])
+        usecols = [name, x, y] + ([population] if population else []) + columns
+        df = pd.read_csv(in_csv, usecols=usecols, encoding="utf-8-sig")
+        df = df.dropna(subset=[name, x, y])
+
+        self.names = df[name].astype("object").to_numpy()
+        self.lon = df[x].to_numpy(dtype="float64")
+        self.lat = df[y].to_numpy(dtype="float64")
+        self.population = df[population].fillna(0).to_numpy(dtype="float64") if population else np.zeros(len(df))
+        self.extra = {c: df[c].to_numpy() for c in columns}
+
+        keys = normalize_names(self.names)
+        # Sorting by key, then by descending population, puts the best match first within each name.
+        self.order = np.lexsort((-self.population, keys))
+        self.keys = keys[self.order].astype("str")
+        first = np.r_[True, self.keys[1:] != self.keys[:-1]]
+        self.exact = pd.Index(self.keys[first])
+        self.exact_rows = self.order[first]
+
+    def __len__(self):
+        return len(self.names)
+
+    def record(self, row):
+        """Returns a gazetteer entry.
+
+        Args:
+            row (int): The row in the gazetteer.
+
+        Returns:
+            dict: The name, latitude, longitude, population and the extra columns.
+        """
+        result = {
+            "name": self.names[row],
+            "latitude": float(self.lat[row]),
+            "longitude": float(self.lon[row]),
+            "population": float(self.population[row]),
+        }
+        for column, values in self.extra.items():
+            result[column] = values[row].item() if hasattr(values[row], "item") else values[row]
+        return result
+
+    def search(self, query, limit=10):
+        """Returns the most populous places whose name starts with a query.
+
+        Args:
+            query (str): The beginning of the place name.
+            limit (int, optional): The maximum number of results. Defaults to 10.
+
+        Returns:
+            list: The matching places as dicts (see record), most populous first.
+        """
+        import numpy as np
+
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        lo = np.searchsorted(self.keys, prefix, side="left")
+        hi = np.searchsorted(self.keys, prefix + "\U0010ffff", side="left")
+        rows = self.order[lo:hi]
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-self.population[rows], limit - 1)[:limit]]
+        rows = rows[np.argsort(-self.population[rows], kind="stable")]
+        return [self.record(row) for row in rows]
+
+    def geocode(self, names):
+        """Geocodes many place names by exact (normalized) name, picking the most populous match.
+
+        Args:
+            names (array-like): The place names, e.g. a DataFrame column.
+
+        Returns:
+            pandas.DataFrame: The "latitude", "longitude", "population" and matched "name" of each input
+                (NaN where there is no match), aligned with the input index when it has one.
+        """
+        import numpy as np
+        import pandas as pd
+
+        index = names.index if isinstance(names, pd.Series) else None
+        found = self.exact.get_indexer(normalize_names(names))
+        rows = np.where(found >= 0, self.exact_rows[found], 0)
+        missing = found < 0
+
+        result = pd.DataFrame({
+            "name": np.where(missing, None, self.names[rows]),
+            "latitude": np.where(missing, np.nan, self.lat[rows]),
+            "longitude": np.where(missing, np.nan, self.lon[rows]),
+            "population": np.where(missing, np.nan, self.population[rows]),
+        }, index=index)
+        for column, values in self.extra.items():
+            result[column] = pd.Series(values[rows], index=index).mask(missing)
+        return result
+
+    def nominatim(self, query):
+        """Answers a search in the Nominatim JSON format used by ipyleaflet.SearchControl.
+
+        Args:
+            query (dict): The query parameters, with the text in "q".
+
+        Returns:
+            list: The results with "display_name", "lat" and "lon".
+        """
+        limit = int(query.get("limit", 10))
+        return [
+            {"display_name": r["name"], "lat": str(r["latitude"]), "lon": str(r["longitude"])}
+            for r in self.search(query.get("q", ""), limit=limit)
+        ]
+
+
+def add_geocoder_endpoint(geocoder, server=None):
+    """Serves a geocoder from the local tile server in the Nominatim search format.
+
+    Args:
+        geocoder (Geocoder): The geocoder.
+        server (TileServer, optional): The server. Defaults to None (the shared server).
+
+    Returns:
+        str: The search URL template, with the query as "{s}".
+    """
+    import uuid
+
+    from .tiles import get_tile_server
+
+    server = server or get_tile_server()
+    url = server.add_endpoint("geocode-" + uuid.uuid4().hex[:12], geocoder.nominatim)
+    return url + "?format=json&q={s}"
@@ -1,12 +1,9 @@
 """Main module."""
 
+import contextlib
 import string
 import random
-import ipyleaflet 
-import pandas
-import geopandas
-import openpyxl
-import folium
+import ipyleaflet
 
 class Map(ipyleaflet.Map):
     
@@ -14,15 +11,23 @@ class Map(ipyleaflet.Map):
     Args:
         center (list, optional): The center of the map. Defaults to [20, 0].
         zoom (int, optional): The zoom level of the map. Defaults to 2.
+        tile_proxy (bool | dict, optional): Whether to route tile layers through the local caching
+            tile proxy. A dict is passed as keyword arguments to maplab.tiles.proxy_tile_url
+            (e.g. {"offline": True}). Defaults to False.
         kwargs: Keyword arguments to pass to the map.
     """
 
-    def __init__(self, center=[20, 0], zoom=2, **kwargs) -> None:
+    def __init__(self, center=[20, 0], zoom=2, tile_proxy=False, **kwargs) -> None:
+
+        self.tile_proxy = tile_proxy
+        self.feature_indexes = []
+        self.identify_options = None
 
         if "scroll_wheel_zoom" not in kwargs:
             kwargs["scroll_wheel_zoom"] = True
 
         super().__init__(center=center, zoom=zoom, **kwargs)
+        self.observe(self._prune_feature_indexes, names="layers")
 
         if "layers_control" not in kwargs:
             kwargs["layers_control"] = True
@@ -36,29 +41,119 @@ class Map(ipyleaflet.Map):
         if kwargs["fullscreen_control"]:
             self.add_fullscreen_control()
 
-    def add_search_control(self, position="topleft", **kwargs):
+    @property
+    def events(self):
+        """The map's interaction event dispatcher, created on first use.
+
+        Handlers registered on it can be throttled, debounced or coalesced to the
+        latest event (see maplab.events.EventDispatcher).
+
+        Returns:
+            maplab.events.EventDispatcher: The dispatcher.
+        """
+        if getattr(self, "_event_dispatcher", None) is None:
+            from .events import EventDispatcher
+
+            self._event_dispatcher = EventDispatcher(self)
+        return self._event_dispatcher
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Holds widget syncing so that all layer and control changes are sent as one update.
+
+        Example:
+            with m.batch() as stats:
+                m.add_basemap("SATELLITE")
+                m.add_gdf(gdf)
+            print(stats["messages_saved"], stats["bytes_saved"])
+
+        Args:
+            self: The map.
+
+        Yields:
+            dict: Statistics about the batch, filled in when the block exits: the number of layer/control
+                changes, the messages sent and saved, and the estimated payload bytes sent and saved.
+        """
+        import json
+
+        stats = {"changes": 0, "messages_sent": 0, "messages_saved": 0, "bytes_sent": 0, "bytes_saved": 0}
+        if self._holding_sync:
+            yield stats
+            return
+
+        sizes = {}
+
+        def on_change(change):
+            to_json = self.trait_metadata(change["name"], "to_json", self._trait_to_json)
+            sizes.setdefault(change["name"], []).append(len(json.dumps(to_json(change["new"], self))))
+
+        self.observe(on_change, names=["layers", "controls"])
+        try:
+            with self.hold_sync():
+                yield stats
+        finally:
+            self.unobserve(on_change, names=["layers", "controls"])
+            stats["changes"] = sum(len(v) for v in sizes.values())
+            # hold_sync sends every changed trait in a single comm message.
+            stats["messages_sent"] = int(stats["changes"] > 0)
+            stats["messages_saved"] = stats["changes"] - stats["messages_sent"]
+            stats["bytes_sent"] = sum(v[-1] for v in sizes.values())
+            stats["bytes_saved"] = sum(sum(v[:-1]) for v in sizes.values())
+            self.last_batch = stats
+
+    def add_layers(self, layers):
+        """Adds several layers to the map in a single update.
+
+        Args:
+            self: The map.
+            layers (list): The layers to add.
+
+        Returns:
+            list: The layers.
+        """
+        with self.batch():
+            for layer in layers:
+                self.add_layer(layer)
+        return list(layers)
+
+    def add_search_control(self, position="topleft", geocoder=None, **kwargs):
         """Adds a search control to the map.
 
         Args:
             self: The map.
             position (str, optional): The position of the search control. Defaults to "topleft".
+            geocoder (str | maplab.geocoder.Geocoder, optional): Search offline with a local geocoder, or
+                the path of a gazetteer CSV to build one from (e.g. "data/world_cities.csv"). Defaults to None
+                (the public Nominatim service).
             kwargs: Keyword arguments to pass to the search control.
 
         Returns:
             ipyleaflet.SearchControl: The search control.
         """
+        if geocoder is not None:
+            from .geocoder import Geocoder, add_geocoder_endpoint
+
+            if isinstance(geocoder, str):
+                geocoder = Geocoder(geocoder)
+            kwargs.setdefault("url", add_geocoder_endpoint(geocoder))
+
         if "url" not in kwargs:
             kwargs["url"] = 'https://nominatim.openstreetmap.org/search?format=json&q={s}'
 
 
         search_control = ipyleaflet.SearchControl(position=position, **kwargs)
         self.add_control(search_control)
+        return search_control
 
-    def add_draw_control(self, **kwargs):
+    def add_draw_control(self, select=False, predicate="intersects", highlight=True, **kwargs):
         """Adds a draw control to the map.
 
         Args:
             self: The map.
+            select (bool, optional): Whether drawing a shape selects the features of the vector layers
+                under it (see select). Defaults to False.
+            predicate (str, optional): The spatial predicate used for the selection. Defaults to "intersects".
+            highlight (bool, optional): Whether to highlight the selected features. Defaults to True.
             kwargs: Keyword arguments to pass to the draw control.
 
         Returns:
@@ -100,7 +195,97 @@ class Map(ipyleaflet.Map):
             }
         }
 
+        if select:
+            from .vector import drawn_geometry
+
+            def on_draw(control, action, geo_json):
+                if action == "created":
+                    self.select(drawn_geometry(geo_json), predicate=predicate, highlight=highlight)
+                elif action == "deleted":
+                    self.clear_selection()
+
+            draw_control.on_draw(on_draw)
+
         self.add_control(draw_control)
+        return draw_control
+
+    def select(self, geometry, predicate="intersects", highlight=True):
+        """Selects the features of the visible vector layers that match a spatial predicate with a geometry.
+
+        The selection is made from the data held in the kernel, so it can be
+        exported without reading the source files again (see export_selection).
+
+        Args:
+            self: The map.
+            geometry (shapely.Geometry): The selection geometry in EPSG:4326.
+            predicate (str, optional): The predicate the features must satisfy with the geometry, e.g.
+                "intersects", "within" or "contains". Defaults to "intersects".
+            highlight (bool, optional): Whether to highlight the selected features. Defaults to True.
+
+        Returns:
+            geopandas.GeoDataFrame: The selected features, with a "layer" column naming their layer.
+        """
+        import geopandas as gpd
+        import pandas as pd
+        from .vector import to_wgs84
+
+        parts = []
+        for layer, index in self.feature_indexes:
+            if layer not in self.layers or not getattr(layer, "visible", True):
+                continue
+            rows = to_wgs84(index.select(geometry, predicate=predicate))
+            if not rows.empty:
+                if rows.geometry.name != "geometry":
+                    rows = rows.rename_geometry("geometry")
+                parts.append(rows.assign(layer=layer.name))
+
+        if parts:
+            selection = gpd.GeoDataFrame(pd.concat(parts, ignore_index=True), geometry="geometry", crs="EPSG:4326")
+        else:
+            selection = gpd.GeoDataFrame({"layer": []}, geometry=gpd.GeoSeries([], crs="EPSG:4326"))
+        self.selection = selection
+
+        if highlight:
+            from .vector import to_geojson
+
+            data = to_geojson(selection[["geometry"]])
+            if getattr(self, "selection_layer", None) is None:
+                self.selection_layer = ipyleaflet.GeoJSON(
+                    data=data, name="Selection", style={"color": "#ffff00", "weight": 3, "fillOpacity": 0.3},
+                    point_style={"radius": 6, "color": "#ffff00", "fillOpacity": 0.8},
+                )
+            else:
+                self.selection_layer.data = data
+            if self.selection_layer not in self.layers:
+                self.add_layer(self.selection_layer)
+        return selection
+
+    def clear_selection(self):
+        """Clears the selection and its highlight.
+
+        Args:
+            self: The map.
+        """
+        self.selection = None
+        layer = getattr(self, "selection_layer", None)
+        if layer is not None and layer in self.layers:
+            self.remove_layer(layer)
+
+    def export_selection(self, out_file, driver=None):
+        """Writes the selected features to a file.
+
+        Args:
+            self: The map.
+            out_file (str): The output file. ".parquet" files are written as GeoParquet.
+            driver (str, optional): The OGR driver. Defaults to None (inferred from the extension).
+        """
+        selection = getattr(self, "selection", None)
+        if selection is None:
+            raise ValueError("Nothing is selected.")
+        if out_file.endswith(".parquet"):
+            selection.to_parquet(out_file)
+        else:
+            selection.to_file(out_file, driver=driver)
 
     def add_layers_control(self, position="topright"):
         """Adds a layers control to the map.
@@ -128,7 +313,7 @@ class Map(ipyleaflet.Map):
         fullscreen_control = ipyleaflet.FullScreenControl(position=position)
         self.add_control(fullscreen_control)
 
-    def add_tile_layer(self, url, name, attribution="", **kwargs):
+    def add_tile_layer(self, url, name, attribution="", proxy=None, **kwargs):
         """Adds a tile layer to the map.
 
         Args:
@@ -136,62 +321,111 @@ class Map(ipyleaflet.Map):
             url (str): The URL template of the tile layer.
             attribution (str): The attribution of the tile layer.
             name (str, optional): The name of the tile layer. Defaults to "OpenStreetMap".
+            proxy (bool | dict, optional): Whether to fetch the tiles through the local caching tile
+                proxy; a dict is passed to maplab.tiles.proxy_tile_url. Defaults to None (the map's tile_proxy setting).
             kwargs: Keyword arguments to pass to the tile layer.
 
         Returns:
             ipyleaflet.TileLayer: The tile layer.
         """
+        if proxy is None:
+            proxy = self.tile_proxy
+        if proxy:
+            from .tiles import proxy_tile_url
+
+            url = proxy_tile_url(url, **(proxy if isinstance(proxy, dict) else {}))
+
         tile_layer = ipyleaflet.TileLayer(url=url, attribution=attribution, name=name, **kwargs)
         self.add_layer(tile_layer)
+        return tile_layer
 
     def add_basemap(self, basemap, **kwargs):
         """Adds a basemap to the map.
         Args:
             self: The map.
-            basemap (str): The basemap to add.
+            basemap (str): The basemap to add: "ROADMAP", "SATELLITE", "TERRAIN", "TERRAIN_ONLY" or
+                any xyzservices provider, e.g. "Esri.WorldImagery".
             kwargs: Keyword arguments to pass to the basemap.
+
+        Returns:
+            ipyleaflet.TileLayer: The basemap layer.
         """
-        import xyzservices.providers as xyz
-
-        if basemap.lower() == "roadmap":
-            url = 'http://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}'
-            self.add_tile_layer(url, name=basemap, **kwargs)
-        elif basemap.lower() == "satellite":
-            url = 'http://mt0.google.com/vt/lyrs=y&hl=en&x={x}&y={y}&z={z}'
-            self.add_tile_layer(url, name=basemap, **kwargs)
-        elif basemap.lower() == "terrain_only":
-            url = 'http://mt0.google.com/vt/lyrs=t&hl=en&x={x}&y={y}&z={z}'
-            self.add_tile_layer(url, name=basemap, **kwargs)
-        elif basemap.lower() == "terrain":
-            url = 'http://mt0.google.com/vt/lyrs=p&hl=en&x={x}&y={y}&z={z}'
-            self.add_tile_layer(url, name=basemap, **kwargs)
-        else:
-            try:
-                basemap = eval(f"xyz.{basemap}")
-                url = basemap.build_url()
-                attribution = basemap.attribution
-                self.add_tile_layer(url, name=basemap.name, attribution=attribution, **kwargs)
-            except:
-                raise ValueError(f"Basemap '{basemap}' not found.")
-
-    def add_geojson(self, data, **kwargs):
+        from .basemaps import resolve_basemap
+
+        entry = resolve_basemap(basemap)
+        if basemap.lower() in ("roadmap", "satellite", "terrain_only", "terrain"):
+            return self.add_tile_layer(entry["url"], name=basemap, **kwargs)
+        return self.add_tile_layer(entry["url"], name=entry["name"], attribution=entry["attribution"], **kwargs)
+
+    def set_basemap(self, basemap, pool_size=3, **kwargs):
+        """Switches the visible basemap, keeping recently used basemaps warm instead of stacking new layers.
+
+        Args:
+            self: The map.
+            basemap (str): The basemap to show (see add_basemap).
+            pool_size (int, optional): The number of basemap layers kept on the map. Defaults to 3.
+            kwargs: Keyword arguments to pass to the basemap when it is first created.
+
+        Returns:
+            ipyleaflet.TileLayer: The basemap layer.
+        """
+        from .basemaps import BasemapPool
+
+        if getattr(self, "basemap_pool", None) is None:
+            self.basemap_pool = BasemapPool(self, size=pool_size)
+        return self.basemap_pool.switch(basemap, **kwargs)
+
+    def add_geojson(self, data, lod=False, tolerance=1.0, viewport=False, bbox=None, properties=None,
+                    max_features=None, identify=True, **kwargs):
         """Adds a GeoJSON layer to the map.
         Args:
             self: The map.
-            data (dict): The GeoJSON data.
+            data (dict | str): The GeoJSON data, or the path to a GeoJSON, GeoJSONSeq or
+                newline-delimited GeoJSON file. Files are read one feature at a time.
+            lod (bool, optional): Whether to simplify the geometries for the current zoom and
+                re-simplify them when the zoom changes. Defaults to False.
+            tolerance (float, optional): The simplification tolerance in screen pixels when lod is True. Defaults to 1.0.
+            viewport (bool, optional): Whether to only send the features near the current view,
+                updating them as the map is panned. Defaults to False.
+            bbox (tuple, optional): When reading a file, only keep features intersecting
+                (minx, miny, maxx, maxy). Defaults to None.
+            properties (list, optional): When reading a file, the properties to keep. Defaults to None (all).
+            max_features (int, optional): When reading a file, the maximum number of features. Defaults to None.
+            identify (bool, optional): Whether clicking a feature shows its attributes (see set_identify).
+                Defaults to True.
             kwargs: Keyword arguments to pass to the GeoJSON layer.
 
         Returns:
             ipyleaflet.GeoJSON: The GeoJSON layer.
         """
-        import json
+        path = isinstance(data, str)
+        if path:
+            from .vector import read_geojson
+
+            data = read_geojson(data, bbox=bbox, properties=properties, max_features=max_features)
+
+        if lod or viewport:
+            import geopandas as gpd
+
+            gdf = gpd.GeoDataFrame.from_features(data, crs="EPSG:4326")
+            return self.add_gdf(gdf, lod=lod, tolerance=tolerance, viewport=viewport, identify=identify, **kwargs)
+
+        if path and data["features"]:
+            import geopandas as gpd
+
+            from .vector import to_geojson
 
-        if isinstance(data, str):
-            with open(data, "r") as f:
-                data = json.load(f)
+            # Files are serialized through the shared cache, so the same file added twice is sent as one object.
+            # GeoJSON dicts are passed on as they are: they are already serialized.
+            data = to_geojson(gpd.GeoDataFrame.from_features(data, crs="EPSG:4326"))
 
         geojson = ipyleaflet.GeoJSON(data=data, **kwargs)
         self.add_layer(geojson)
+        if identify:
+            from .vector import FeatureIndex
+
+            self.add_feature_index(geojson, FeatureIndex(data))
+        return geojson
         
     def add_shp(self, data, name='Shapefile', **kwargs):
         """Adds a shapefile to the map.
@@ -203,28 +437,206 @@ class Map(ipyleaflet.Map):
             kwargs: Keyword arguments to pass to the shapefile layer.
 
         Returns:
-            gdf.__geo_interface__: The shapefile layer.
+            ipyleaflet.GeoJSON: The shapefile layer.
         """
         import geopandas as gpd
     
         gdf = gpd.read_file(data)
-        geojson = gdf.__geo_interface__
-        self.add_geojson(geojson, name=name, **kwargs)
+        return self.add_gdf(gdf, name=name, **kwargs)
 
-    def add_gdf(self, gdf, name='GeoDataFrame', **kwargs):
+    def add_gdf(self, gdf, name='GeoDataFrame', lod=False, tolerance=1.0, viewport=False, raster=False,
+                properties=None, identify=True, **kwargs):
         """Adds a geopandas GeoDataFrame to the map.
 
         Args:
             self: The map.
             gdf: The geopandas GeoDataFrame.
             name (str, optional): The name of the GeoDataFrame layer. Defaults to "GeoDataFrame".
-            kwargs: Keyword arguments to pass to the GeoDataFrame layer.
+            lod (bool, optional): Whether to simplify the geometries for the current zoom and
+                re-simplify them when the zoom changes. Defaults to False.
+            tolerance (float, optional): The simplification tolerance in screen pixels when lod is True. Defaults to 1.0.
+            viewport (bool, optional): Whether to only send the features near the current view,
+                updating them as the map is panned. Defaults to False.
+            raster (bool, optional): Whether to keep the features in the kernel and draw them as raster
+                tiles from the local tile server, with a popup showing the attributes of the clicked
+                feature. Defaults to False.
+            properties (list, optional): The columns sent to the map with the geometries; pass [] to send
+                geometries only. Every column is still shown when a feature is identified. Defaults to None (all).
+            identify (bool, optional): Whether clicking a feature shows its attributes (see set_identify).
+                Defaults to True.
+            kwargs: Keyword arguments to pass to the GeoDataFrame layer. With raster, "style" and "radius"
+                go to maplab.vector.VectorTiler and the rest to the tile layer.
+
+        Returns:
+            ipyleaflet.GeoJSON: The GeoDataFrame layer (an ipyleaflet.LayerGroup when viewport is True and an
+                ipyleaflet.TileLayer when raster is True).
+        """
+        if sum(map(bool, [lod, viewport, raster])) > 1:
+            raise ValueError("lod, viewport and raster cannot be used together.")
+
+        if raster:
+            from .vector import add_vector_tile_source
+
+            options = {key: kwargs.pop(key) for key in ["style", "radius"] if key in kwargs}
+            index, url = add_vector_tile_source(gdf, **options)
+            kwargs.setdefault("proxy", False)
+            layer = self.add_tile_layer(url, name=name, **kwargs)
+            layer.tiler = index
+        else:
+            from .vector import FeatureIndex
+
+            index = FeatureIndex(gdf)
+            if properties is not None:
+                gdf = gdf[list(properties) + [gdf.geometry.name]]
+
+            if viewport:
+                from .vector import ViewportCuller
+
+                culler = ViewportCuller(gdf, name=name, **kwargs)
+                self.add_layer(culler.layer)
+                culler.link(self)
+                layer = culler.layer
+            elif not lod:
+                from .vector import to_geojson
+
+                layer = self.add_geojson(to_geojson(gdf), name=name, identify=False, **kwargs)
+            else:
+                from .vector import LevelOfDetail
+
+                detail = LevelOfDetail(gdf, tolerance=tolerance)
+                layer = self.add_geojson(detail.geojson(self.zoom), name=name, identify=False, **kwargs)
+                detail.link(self, layer)
+
+        if identify:
+            self.add_feature_index(layer, index)
+        return layer
+
+    def add_choropleth(self, gdf, column, scheme='quantile', k=5, colormap='ylorrd', name='Choropleth',
+                       legend=True, position='bottomright', identify=True, **kwargs):
+        """Adds a choropleth of a GeoDataFrame column to the map.
+
+        The class of every feature is computed at once and its color is embedded in the
+        GeoJSON, so the map is drawn without a Python style callback. Switch to another
+        column, scheme or colormap with layer.choropleth.restyle(column, ...), which keeps
+        the serialized geometries.
+
+        Args:
+            self: The map.
+            gdf (geopandas.GeoDataFrame): The features, e.g. from join_shapefile_to_dataframe.
+            column (str): The column to map.
+            scheme (str, optional): "quantile", "equal_interval" or "natural_breaks". Defaults to "quantile".
+            k (int, optional): The number of classes. Defaults to 5.
+            colormap (str, optional): The colormap (see maplab.raster.COLORMAPS). Defaults to "ylorrd".
+            name (str, optional): The name of the layer. Defaults to "Choropleth".
+            legend (bool, optional): Whether to add a legend of the classes. Defaults to True.
+            position (str, optional): The position of the legend. Defaults to "bottomright".
+            identify (bool, optional): Whether clicking a feature shows its attributes (see set_identify).
+                Defaults to True.
+            kwargs: Keyword arguments to pass to maplab.choropleth.Choropleth, e.g. "style".
+
+        Returns:
+            ipyleaflet.GeoJSON: The choropleth layer, with the maplab.choropleth.Choropleth as layer.choropleth.
+        """
+        from .choropleth import Choropleth
+
+        choropleth = Choropleth(gdf, column, scheme=scheme, k=k, colormap=colormap, name=name, **kwargs)
+        layer = choropleth.layer
+        layer.choropleth = choropleth
+        self.add_layer(layer)
+        if legend:
+            choropleth.legend = ipyleaflet.LegendControl(choropleth.legend_items(), title=column, position=position)
+            self.add_control(choropleth.legend)
+        if identify:
+            from .vector import FeatureIndex
+
+            self.add_feature_index(layer, FeatureIndex(choropleth.gdf))
+        return layer
+
+    def add_feature_index(self, layer, index):
+        """Registers the spatial index used to identify the features of a layer.
+
+        The index is dropped when the layer is removed from the map.
+
+        Args:
+            self: The map.
+            layer (ipyleaflet.Layer): The layer.
+            index (maplab.vector.FeatureIndex): An object with an identify(lon, lat, zoom, tolerance) method.
+        """
+        self.feature_indexes.append((layer, index))
+        if self.identify_options is None:
+            self.set_identify()
+
+    def _prune_feature_indexes(self, change):
+        # Drop the indexes (and the data they hold) of layers removed from the map.
+        on_map = {id(layer) for layer in change["new"]}
+        self.feature_indexes = [(layer, index) for layer, index in self.feature_indexes if id(layer) in on_map]
+
+    def identify(self, lon, lat, tolerance=3):
+        """Returns the features under a location on the visible layers, topmost layer first.
+
+        Args:
+            self: The map.
+            lon (float): The longitude.
+            lat (float): The latitude.
+            tolerance (float, optional): The search distance in pixels. Defaults to 3.
 
         Returns:
-            gdf.__geo_interface__: The GeoDataFrame layer.
+            list: (layer, geopandas.GeoDataFrame) pairs for the layers with features at the location.
         """
-        geojson = gdf.__geo_interface__
-        self.add_geojson(geojson, name=name, **kwargs)
+        hits = []
+        for layer, index in reversed(self.feature_indexes):
+            if layer not in self.layers or not getattr(layer, "visible", True):
+                continue
+            rows = index.identify(lon, lat, zoom=self.zoom, tolerance=tolerance)
+            if not rows.empty:
+                hits.append((layer, rows))
+        return hits
+
+    def set_identify(self, event="click", output=None, tolerance=3, throttle=0.1):
+        """Sets how features are identified when the map is clicked or hovered.
+
+        Args:
+            self: The map.
+            event (str, optional): "click", "mousemove" (hover) or None to turn identification off.
+                Defaults to "click".
+            output (ipywidgets.Output, optional): Show the attributes in this widget instead of a popup.
+                Defaults to None.
+            tolerance (float, optional): The search distance in pixels for lines and points. Defaults to 3.
+            throttle (float, optional): The minimum number of seconds between hover lookups. Defaults to 0.1.
+        """
+        import ipywidgets
+        from .vector import attributes_html
+
+        if self.identify_options and self.identify_options["handler"]:
+            self.events.off(self.identify_options["event"], self.identify_options["handler"])
+        if event is None:
+            self.identify_options = {"event": None, "handler": None}
+            return
+
+        popup = ipyleaflet.Popup(child=ipywidgets.HTML(), close_button=True, auto_close=False)
+
+        def on_interaction(**kwargs):
+            lat, lon = kwargs["coordinates"]
+            hits = self.identify(lon, lat, tolerance=tolerance)
+            if not hits:
+                return
+            layer, rows = hits[0]
+            record = rows.iloc[0].drop(labels=rows.geometry.name).to_dict()
+            html = f"<b>{layer.name}</b>" * bool(layer.name) + attributes_html(record)
+            if output is not None:
+                from IPython.display import HTML
+
+                output.outputs = ()
+                output.append_display_data(HTML(html))
+                return
+            popup.child.value = html
+            popup.location = [lat, lon]
+            if popup not in self.layers:
+                self.add_layer(popup)
+
+        self.events.on(event, on_interaction, throttle=throttle if event == "mousemove" else None)
+        self.identify_options = {"event": event, "output": output, "tolerance": tolerance, "popup": popup,
+                                 "handler": on_interaction}
 
     def add_vector(self, data, name='Vector', **kwargs):
         """ Adds any geopandas supported vector data to the map.
@@ -235,54 +647,92 @@ class Map(ipyleaflet.Map):
             kwargs: Keyword arguments to pass to the vector layer."""
         import geopandas as gpd
         if data.endswith(".shp"):
-            self.add_shp(data, name=name, **kwargs)
-        if data.endswith(".geojson"):
-            self.add_geojson(data, name=name, **kwargs)
+            return self.add_shp(data, name=name, **kwargs)
+        elif data.endswith((".geojson", ".geojsonl", ".geojsons")):
+            return self.add_geojson(data, name=name, **kwargs)
         else:
             gdf = gpd.read_file(data) 
-            self.add_gdf(gdf, name=name, **kwargs)
+            return self.add_gdf(gdf, name=name, **kwargs)
 
-    def add_raster(self, url, name='Raster', fit_bounds=True, **kwargs):
+    def add_raster(self, url, name='Raster', fit_bounds=True, bands=None, rescale=None, colormap=None,
+                   titiler_endpoint=None, **kwargs):
         """Adds a raster layer to the map.
 
+        By default the tiles are rendered in the kernel from the Cloud-Optimized GeoTIFF
+        (a local file or an HTTP URL read with range requests) and served by the local tile server.
+
         Args:
             self: The map.
-            url (str): The URL to the raster.
+            url (str): The path or URL to the raster.
             name (str, optional): The name of the raster layer. Defaults to "Raster".
             fit_bounds (bool, optional): Whether to fit the bounds of the map to the raster. Defaults to True.
+            bands (list, optional): The 1-based band indexes to render. Defaults to None.
+            rescale (list, optional): The (min, max) range mapped to 0-255. Defaults to None (from the data).
+            colormap (str, optional): The colormap for single-band rasters (see maplab.raster.COLORMAPS). Defaults to None.
+            titiler_endpoint (str, optional): Render the tiles with a TiTiler server instead, e.g. "https://titiler.xyz".
+                Defaults to None.
             kwargs: Keyword arguments to pass to the raster layer.
 
         Returns:
-            ipyleaflet.RasterLayer: The raster layer.
+            ipyleaflet.TileLayer: The raster layer.
         """
-        import httpx
+        return self.add_rasters([url], names=[name], fit_bounds=fit_bounds, bands=bands, rescale=rescale,
+                                colormap=colormap, titiler_endpoint=titiler_endpoint, **kwargs)[0]
 
-        titiler_endpoint = "https://titiler.xyz"
+    def add_rasters(self, urls, names=None, fit_bounds=True, bands=None, rescale=None, colormap=None,
+                    titiler_endpoint=None, **kwargs):
+        """Adds several raster layers to the map, resolving their metadata in parallel.
 
-        r = httpx.get(
-            f"{titiler_endpoint}/cog/info",
-            params = {
-                "url": url,
-            }
-        ).json()
+        With a TiTiler endpoint, the info and tilejson requests of all rasters are sent
+        concurrently over a shared connection pool and memoized on disk, so adding the
+        same COG again does not repeat them.
 
-        bounds = r["bounds"]
+        Args:
+            self: The map.
+            urls (list): The paths or URLs to the rasters.
+            names (list, optional): The names of the raster layers. Defaults to None ("Raster 1", "Raster 2", ...).
+            fit_bounds (bool, optional): Whether to fit the bounds of the map to the rasters. Defaults to True.
+            bands (list, optional): The 1-based band indexes to render. Defaults to None.
+            rescale (list, optional): The (min, max) range mapped to 0-255. Defaults to None (from the data).
+            colormap (str, optional): The colormap for single-band rasters. Defaults to None.
+            titiler_endpoint (str, optional): Render the tiles with a TiTiler server instead. Defaults to None.
+            kwargs: Keyword arguments to pass to the raster layers.
 
-        r = httpx.get(
-            f"{titiler_endpoint}/cog/tilejson.json",
-            params = {
-                "url": url,
-            }
-        ).json()
+        Returns:
+            list: The ipyleaflet.TileLayer of each raster.
+        """
+        if names is None:
+            names = [f"Raster {i + 1}" for i in range(len(urls))]
 
-        tile = r["tiles"][0]
+        if titiler_endpoint is None:
+            from concurrent.futures import ThreadPoolExecutor
+            from .raster import add_cog_source
 
-        self.add_tile_layer(url=tile, name=name, **kwargs)
+            def open_cog(url):
+                return add_cog_source(url, bands=bands, rescale=rescale, colormap=colormap)
 
-        if fit_bounds:
-            bbox = [[bounds[0], bounds[1]], [bounds[2], bounds[3]]]
+            with ThreadPoolExecutor(max_workers=min(len(urls), 8) or 1) as pool:
+                sources = list(pool.map(open_cog, urls))
+            tiles = [tile for _, tile in sources]
+            bounds = [tiler.bounds for tiler, _ in sources]
+            kwargs.setdefault("proxy", False)
+        else:
+            from .remote import cog_metadata
+
+            metadata = cog_metadata(urls, endpoint=titiler_endpoint)
+            tiles = [m["tiles"][0] for m in metadata]
+            bounds = [m["bounds"] for m in metadata]
+
+        with self.batch():
+            layers = [self.add_tile_layer(url=tile, name=name, **kwargs) for tile, name in zip(tiles, names)]
+
+        if fit_bounds and bounds:
+            bbox = [
+                [min(b[1] for b in bounds), min(b[0] for b in bounds)],
+                [max(b[3] for b in bounds), max(b[2] for b in bounds)],
+            ]
             self.fit_bounds(bbox)
-    
+        return layers
 
     def add_image(self, path, w=250, h=250):
         """Adds a small image (like your logo) to the bottom right of the map
@@ -372,7 +822,7 @@ class Map(ipyleaflet.Map):
 
         def change_basemap(change):
             if change['new']:
-                self.add_basemap(basemap.value)
+                self.set_basemap(basemap.value)
 
         basemap.observe(change_basemap, names='value')
 
@@ -425,7 +875,8 @@ class Map(ipyleaflet.Map):
 
         self.add_control(toolbar_ctrl)
 
-    def add_wms_layer(self, url, name, layers, format='image/png', transparent=True, attribution='', **kwargs):
+    def add_wms_layer(self, url, name, layers, format='image/png', transparent=True, attribution='', cache=False,
+                      **kwargs):
         """Adds a WMS layer to the map.
         Args:
             url (str): The URL of the WMS service.
@@ -434,10 +885,17 @@ class Map(ipyleaflet.Map):
             format (str, optional): The format of the image. Defaults to 'image/png'.
             transparent (bool, optional): Whether the image is transparent. Defaults to True.
             attribution (str, optional): The attribution of the data. Defaults to ''.
+            cache (bool | dict, optional): Whether to request the layer as 256px tiles through the local
+                caching tile proxy; a dict is passed to maplab.tiles.proxy_tile_url. Defaults to False.
+
+        Returns:
+            ipyleaflet.WMSLayer: The WMS layer (an ipyleaflet.TileLayer when cache is set).
         """
-        import ipyleaflet
-        import requests
-        from ipyleaflet import WMSLayer
+        if cache:
+            from .tiles import wms_tile_url
+
+            tile_url = wms_tile_url(url, layers, format=format, transparent=transparent)
+            return self.add_tile_layer(tile_url, name=name, attribution=attribution, proxy=cache, **kwargs)
 
         wms = ipyleaflet.WMSLayer(
             url=url,
@@ -448,45 +906,101 @@ class Map(ipyleaflet.Map):
             name=name, **kwargs
         )
         self.add_layer(wms)
+        return wms
 
     def add_landcover(self, NLCD, **kwargs):
         """Adds the NLCD to the map.
         
         Args:
             self: The map.
-            NLCD (str): The NLCD to add.
+            NLCD (str): The NLCD to add, e.g. "2019 Land Cover" (see NLCD_LAYERS).
             kwargs: Keyword arguments to pass to the NLCD.
+
+        Returns:
+            ipyleaflet.WMSLayer: The NLCD layer.
         """
-        if NLCD.lower() == "2001 land cover":
-            url = 'https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2001_Land_Cover_L48/wms?'
-            layers = 'NLCD_2001_Land_Cover'
-            self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
-        elif NLCD.lower() == "2004 land cover":
-            url = 'https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2004_Land_Cover_L48/wms?'
-            layers = 'NLCD_2004_Land_Cover'
-            self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
-        elif NLCD.lower() == "2006 land cover":
-            url = 'https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2006_Land_Cover_L48/wms?'
-            layers = 'NLCD_2006_Land_Cover'
-            self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
-        elif NLCD.lower() == "2008 land cover":
-            url = 'https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2008_Land_Cover_L48/wms?'
-            layers = 'NLCD_2008_Land_Cover'
-            self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
-        elif NLCD.lower() == "2019 land cover":
-            url = 'https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2019_Land_Cover_L48/wms?'
-            layers = 'NLCD_2019_Land_Cover_L48'
-            self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
-        else:
+        year = NLCD.lower().replace("land cover", "").strip()
+        if not year.isdigit() or int(year) not in NLCD_LAYERS:
             print("Please enter a valid NLCD layer name.")
+            return None
+
+        url, layers = NLCD_LAYERS[int(year)]
+        return self.add_wms_layer(url, layers=layers, name=NLCD, **kwargs)
+
+    def add_landcover_timeseries(self, years=None, year=None, prefetch=1, cache=True, position="bottomright",
+                                 name="NLCD Land Cover", **kwargs):
+        """Adds every NLCD epoch as one stacked layer with a time slider.
+
+        All epochs are registered up front. Only the selected epoch is opaque; the
+        epochs next to it stay on the map at zero opacity so their tiles are loaded
+        ahead of time, and moving the slider only changes opacities. With cache,
+        the WMS tiles are fetched through the local tile cache, so scrubbing back
+        and forth does not request them again.
+
+        Args:
+            self: The map.
+            years (list, optional): The NLCD years to include. Defaults to None (all of NLCD_LAYERS).
+            year (int, optional): The year shown first. Defaults to None (the latest).
+            prefetch (int, optional): The number of epochs on each side of the selected one to keep warm. Defaults to 1.
+            cache (bool | dict, optional): Whether to fetch the tiles through the local caching tile proxy. Defaults to True.
+            position (str, optional): The position of the slider. Defaults to "bottomright".
+            name (str, optional): The name of the layer group. Defaults to "NLCD Land Cover".
+            kwargs: Keyword arguments to pass to each epoch layer.
+
+        Returns:
+            ipyleaflet.LayerGroup: The stacked NLCD layer.
+        """
+        import ipywidgets as widgets
+
+        years = sorted(years or NLCD_LAYERS)
+        epochs = {}
+        for y in years:
+            url, layers = NLCD_LAYERS[y]
+            if cache:
+                from .tiles import proxy_tile_url, wms_tile_url
+
+                tile_url = proxy_tile_url(wms_tile_url(url, layers), **(cache if isinstance(cache, dict) else {}))
+                layer = ipyleaflet.TileLayer(url=tile_url, name=f"{y} Land Cover", opacity=0, visible=False, **kwargs)
+            else:
+                layer = ipyleaflet.WMSLayer(url=url, layers=layers, format="image/png", transparent=True,
+                                            name=f"{y} Land Cover", opacity=0, visible=False, **kwargs)
+            epochs[y] = layer
+
+        group = ipyleaflet.LayerGroup(layers=tuple(epochs.values()), name=name)
+        slider = widgets.SelectionSlider(
+            options=years,
+            value=year if year is not None else years[-1],
+            description='NLCD:',
+            continuous_update=True,
+            layout=widgets.Layout(width='300px'),
+        )
+
+        def show(selected):
+            index = years.index(selected)
+            for i, y in enumerate(years):
+                layer = epochs[y]
+                layer.visible = abs(i - index) <= prefetch
+                layer.opacity = 1.0 if i == index else 0.0
+
+        slider.observe(lambda change: show(change["new"]), names='value')
+        show(slider.value)
 
+        with self.batch():
+            self.add_layer(group)
+            self.add_control(ipyleaflet.WidgetControl(widget=slider, position=position))
+        group.slider = slider
+        return group
 
-    def add_swipe_control(self, layer1_url, layer2_url, swipe_position):
+    def add_swipe_control(self, layer1_url, layer2_url, swipe_position, throttle=1 / 30):
         '''Adds a swipe control to the map.
         Args:
             layer1_url (str): The URL of the first tile layer to swipe between.
             layer2_url (str): The URL of the second tile layer to swipe between.
-            swipe_position (str): The position of the swipe control. Valid values are 'bottomleft', 'bottomright', 'topleft', and 'topright'.'''	        
+            swipe_position (str): The position of the swipe control. Valid values are 'bottomleft', 'bottomright', 'topleft', and 'topright'.
+            throttle (float, optional): The minimum number of seconds between drag updates. Defaults to 1/30.
+
+        Returns:
+            ipyleaflet.SplitMapControl: The swipe control.'''	        
         # Create the two layers to swipe between
         layer1 = ipyleaflet.TileLayer(url=layer1_url, name="Layer 1")
         layer2 = ipyleaflet.TileLayer(url=layer2_url, name="Layer 2")
@@ -501,71 +1015,159 @@ class Map(ipyleaflet.Map):
         swipe_control = ipyleaflet.SplitMapControl(left_layer=layer1, right_layer=layer2, position=swipe_position)
         self.add_control(swipe_control)
 
-        # make the swipe control draggable
-        def on_mouse_down(event):
+        # make the swipe control draggable; mousemove is throttled to the latest event so a
+        # drag does not flood the kernel with messages
+        def on_mouse_down(**event):
             swipe_control.dragging = True
             swipe_control.start_x = event['containerPoint'][0]
 
-        def on_mouse_move(event):
+        def on_mouse_move(**event):
             if swipe_control.dragging:
                 delta = event['containerPoint'][0] - swipe_control.start_x
-                swipe_control.split_position += delta / self.width * 100
+                # the pixel width of the map is not synced, so assume the width used by estimate_bounds
+                swipe_control.split_position += delta / getattr(self, 'width', 1024) * 100
                 swipe_control.start_x = event['containerPoint'][0]
 
-        def on_mouse_up(event):
+        def on_mouse_up(**event):
             swipe_control.dragging = False
 
-        self.on_interaction(on_mouse_down, 'mousedown')
-        self.on_interaction(on_mouse_move, 'mousemove')
-        self.on_interaction(on_mouse_up, 'mouseup')
+        swipe_control.dragging = False
+        swipe_control.split_position = 50
+        self.events.on('mousedown', on_mouse_down)
+        self.events.on('mousemove', on_mouse_move, throttle=throttle)
+        self.events.on('mouseup', on_mouse_up)
 
         print("Swipe tool added to map")
+        return swipe_control
     
-    def csv_to_shp(in_csv, out_shp, x='longitude', y='latitude'):
+    def csv_to_shp(self, in_csv, out_shp, x='longitude', y='latitude', **kwargs):
         '''Converts a csv file to a shapefile.
         Args:
             in_csv (str): The input csv file.
             out_shp (str): The output shapefile.
             x (str, optional): The name of the x column. Defaults to 'longitude'.
-            y (str, optional): The name of the y column. Defaults to 'latitude'.'''
-        import pandas as pd
-        import geopandas as gpd
-        from shapely.geometry import Point
-        df = pd.read_csv(in_csv)
-        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df[x], df[y]))
-        gdf.to_file(out_shp)
+            y (str, optional): The name of the y column. Defaults to 'latitude'.
+            kwargs: Keyword arguments to pass to csv_to_file.'''
+        self.csv_to_file(in_csv, out_shp, x=x, y=y, driver="ESRI Shapefile", **kwargs)
         print("Shapefile saved to " + out_shp)
 
-    def csv_to_geojson(in_csv, out_geojson, x='longitude', y='latitude'):
+    def csv_to_geojson(self, in_csv, out_geojson, x='longitude', y='latitude', **kwargs):
         '''Converts a csv file to a geojson file.
         Args:
             in_csv (str): The input csv file.
             out_geojson (str): The output geojson file.
             x (str, optional): The name of the x column. Defaults to 'longitude'.
-            y (str, optional): The name of the y column. Defaults to 'latitude'.'''
-        import pandas as pd
-        import geopandas as gpd
-        from shapely.geometry import Point
-        df = pd.read_csv(in_csv)
-        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df[x], df[y]))
-        gdf.to_file(out_geojson, driver='GeoJSON')
+            y (str, optional): The name of the y column. Defaults to 'latitude'.
+            kwargs: Keyword arguments to pass to csv_to_file.'''
+        self.csv_to_file(in_csv, out_geojson, x=x, y=y, driver="GeoJSON", **kwargs)
         print("GeoJSON saved to " + out_geojson)
 
-    def csv_to_markercluster(self, in_csv, x='longitude', y='latitude'):
+    def csv_to_file(self, in_csv, out_file, x='longitude', y='latitude', driver=None, chunk_bytes=64 << 20,
+                    processes=None):
+        '''Converts a csv file to a vector file, streaming it in chunks so memory use stays flat.
+        Args:
+            in_csv (str): The input csv file.
+            out_file (str): The output file (.shp, .geojson, .geojsonl/.geojsons, .fgb or .parquet).
+            x (str, optional): The name of the x column. Defaults to 'longitude'.
+            y (str, optional): The name of the y column. Defaults to 'latitude'.
+            driver (str, optional): The output driver, e.g. 'GeoJSONSeq', 'FlatGeobuf' or 'GeoParquet'.
+                Defaults to None (inferred from the file extension).
+            chunk_bytes (int, optional): The approximate size of each CSV chunk in bytes. Defaults to 64 MiB.
+            processes (int, optional): The number of worker processes used to parse and encode chunks.
+                Defaults to None (no pool).'''
+        from .points import csv_to_file
+        csv_to_file(in_csv, out_file, x=x, y=y, driver=driver, chunk_bytes=chunk_bytes, processes=processes)
+
+    def csv_to_markercluster(self, in_csv, x='longitude', y='latitude', density=False, **kwargs):
         '''Converts a csv file to a marker cluster layer and adds it to the map.
+
+        The points are clustered in the kernel (see add_clusters), so only the
+        clusters in view are sent to the map no matter how many rows the file has.
+        With density set, the points are drawn as heatmap tiles instead (see add_density).
         Args:
             in_csv (str): The input csv file.
             x (str, optional): The name of the x column. Defaults to 'longitude'.
-            y (str, optional): The name of the y column. Defaults to 'latitude'.'''
-        import pandas as pd
-        import geopandas as gpd
-        from shapely.geometry import Point
-        from ipyleaflet import MarkerCluster
-        df = pd.read_csv(in_csv)
-        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df[x], df[y]))
-        marker_cluster = MarkerCluster(markers=[ipyleaflet.Marker(location=[point.y, point.x]) for point in gdf['geometry'].tolist()])
-        self.add_layer(marker_cluster)
+            y (str, optional): The name of the y column. Defaults to 'latitude'.
+            density (bool, optional): Whether to add a density heatmap instead of clusters. Defaults to False.
+            kwargs: Keyword arguments to pass to add_clusters or add_density.'''
+        from .points import read_points
+        lon, lat, _ = read_points(in_csv, x=x, y=y)
+        if density:
+            layer = self.add_density(lon, lat, **kwargs)
+            print("Density heatmap added to map")
+            return layer
+        layer = self.add_clusters(lon, lat, **kwargs)
         print("Marker cluster added to map")
+        return layer
+
+    def csv_to_density(self, in_csv, x='longitude', y='latitude', **kwargs):
+        '''Converts a csv file to a point density heatmap and adds it to the map.
+        Args:
+            in_csv (str): The input csv file.
+            x (str, optional): The name of the x column. Defaults to 'longitude'.
+            y (str, optional): The name of the y column. Defaults to 'latitude'.
+            kwargs: Keyword arguments to pass to add_density.'''
+        return self.csv_to_markercluster(in_csv, x=x, y=y, density=True, **kwargs)
+
+    def add_density(self, lon, lat, name='Density', weights=None, colormap='magma', max_zoom=16, opacity=0.8,
+                    **kwargs):
+        '''Adds a point density heatmap that is rendered in the kernel.
+
+        The points are binned into PNG tiles by the local tile server, so the
+        map only ever receives image tiles however many points there are.
+        Args:
+            lon (array-like): The point longitudes.
+            lat (array-like): The point latitudes.
+            name (str, optional): The name of the layer. Defaults to 'Density'.
+            weights (array-like, optional): The point weights. Defaults to None (each point counts once).
+            colormap (str, optional): The colormap (see maplab.raster.COLORMAPS). Defaults to 'magma'.
+            max_zoom (int, optional): The highest zoom rendered; deeper zooms are upscaled. Defaults to 16.
+            opacity (float, optional): The layer opacity. Defaults to 0.8.
+            kwargs: Keyword arguments to pass to add_tile_layer.
+
+        Returns:
+            ipyleaflet.TileLayer: The density layer. Its tiler is available as layer.tiler.'''
+        from .points import add_density_source
+
+        tiler, url = add_density_source(lon, lat, weights=weights, colormap=colormap, max_zoom=max_zoom)
+        kwargs.setdefault("proxy", False)
+        layer = self.add_tile_layer(url, name=name, opacity=opacity, max_native_zoom=max_zoom, **kwargs)
+        layer.tiler = tiler
+        return layer
+
+    def add_clusters(self, lon, lat, name='Clusters', radius=60, max_zoom=16, **kwargs):
+        '''Adds a point cluster layer that is computed in the kernel.
+
+        A hierarchical cluster index is built once for all zoom levels, and
+        only the clusters and single points in the visible tiles are sent to
+        the map, updating as it is panned and zoomed.
+        Args:
+            lon (array-like): The point longitudes.
+            lat (array-like): The point latitudes.
+            name (str, optional): The name of the layer. Defaults to 'Clusters'.
+            radius (int, optional): The cluster radius in pixels. Defaults to 60.
+            max_zoom (int, optional): The zoom above which points are no longer clustered. Defaults to 16.
+            kwargs: Keyword arguments to pass to the GeoJSON layer.
+
+        Returns:
+            ipyleaflet.GeoJSON: The cluster layer.'''
+        from .points import ClusterIndex, ClusterLayer
+
+        index = ClusterIndex(lon, lat, radius=radius, max_zoom=max_zoom)
+        clusters = ClusterLayer(index, name=name, **kwargs)
+        self.add_layer(clusters.layer)
+        clusters.link(self)
+        return clusters.layer
+
+
+# NLCD land cover WMS services by year: (url, layers).
+NLCD_LAYERS = {
+    2001: ('https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2001_Land_Cover_L48/wms?', 'NLCD_2001_Land_Cover'),
+    2004: ('https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2004_Land_Cover_L48/wms?', 'NLCD_2004_Land_Cover'),
+    2006: ('https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2006_Land_Cover_L48/wms?', 'NLCD_2006_Land_Cover'),
+    2008: ('https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2008_Land_Cover_L48/wms?', 'NLCD_2008_Land_Cover'),
+    2019: ('https://www.mrlc.gov/geoserver/mrlc_display/NLCD_2019_Land_Cover_L48/wms?', 'NLCD_2019_Land_Cover_L48'),
+}
 
 
 ##  Practice with functions
@@ -593,77 +1195,129 @@ def random_string(length, upper=False, digits=False):
 #####  Converting Census Data formatting to a format that will join with the city socioeconomic database
 
 
-def excel_to_dataframe(excel_file, sheet_name, index_col=None):
+def excel_to_dataframe(excel_file, sheet_name, index_col=None, usecols=None, categories=None, cache=True):
     """Converts an excel file to a dataframe.
 
+    With cache set, the parsed sheet is saved as Parquet and reused until the
+    file changes (see maplab.tables.read_excel_cached).
+
     Args:
         excel_file (str): The excel file to convert.
         sheet_name (str): The name of the sheet to convert.
         index_col (str, optional): The column to use as the index. Defaults to None.
+        usecols (list, optional): The columns to read. Defaults to None (all).
+        categories (list, optional): Columns to store as categoricals, e.g. city or county names.
+            Defaults to None.
+        cache (bool, optional): Whether to use the Parquet cache. Defaults to True.
 
     Returns:
         pandas.DataFrame: The dataframe.
     """
-    return pandas.read_excel(excel_file, sheet_name=sheet_name, index_col=index_col)
+    import pandas as pd
+
+    from .tables import compact_dtypes, read_excel_cached
 
-def copy_columns_to_index(df, columns):
+    if not cache or not isinstance(sheet_name, (str, int)):
+        df = pd.read_excel(excel_file, sheet_name=sheet_name, index_col=index_col, usecols=usecols)
+        if isinstance(df, pd.DataFrame):
+            compact_dtypes(df, categories)
+        return df
+
+    return read_excel_cached(excel_file, sheet_name, index_col=index_col, usecols=usecols, categories=categories)
+
+def copy_columns_to_index(df, columns, inplace=True):
     """Copies the values of the given columns to the index.
 
     Args:
         df (pandas.DataFrame): The dataframe to copy the columns from.
         columns (list): The columns to copy to the index.
+        inplace (bool, optional): Whether to modify the dataframe instead of a shallow copy. Defaults to True.
 
     Returns:
         pandas.DataFrame: The dataframe with the columns copied to the index.
     """
-    for column in columns:
-        df[column] = df.index
-    return df
+    from .tables import TextPipeline
+
+    return TextPipeline().copy_index(columns).apply(df, inplace=inplace)
 
-def edit_city_names(df, phrase):
+def edit_city_names(df, phrase, columns=None, inplace=False):
     """Edits the dataframe values by entering a string to remove from the right side of the city name.
 
+    Each distinct name is edited once (see maplab.tables.TextPipeline).
+
     Args:
-        df (pandas.DataFrame): The dataframe to edit.
+        df (pandas.Series | pandas.DataFrame): The city names, or a dataframe with name columns.
         phrase (str): The string to remove from the right side of the county name.
+        columns (list, optional): The columns to edit when df is a dataframe. Defaults to None.
+        inplace (bool, optional): Whether to edit the dataframe columns in place. Defaults to False.
 
     Returns:
         pandas.DataFrame: The dataframe with the city names edited.
     """
-    df = df.str.replace(phrase, "")
-    return df
+    from .tables import TextPipeline
+
+    return TextPipeline().remove(phrase).apply(df, columns=columns, inplace=inplace)
+
+def aggregate_by_county(df, county_column, agg_column, agg_func, processes=None, **kwargs):
+    """Aggregates the values of one or more columns by county.
 
-def aggregate_by_county(df, county_column, agg_column, agg_func):
-    """Aggregates the values of a column by county.
+    Every column and function is computed in one chunked pass (see
+    maplab.tables.aggregate), so the data can also be a CSV or Parquet file
+    that does not fit in memory.
 
     Args:
-        df (pandas.DataFrame): The dataframe to aggregate.
+        df (pandas.DataFrame | str): The dataframe to aggregate, or a CSV or Parquet file.
         county_column (str): The name of the county column.
-        agg_column (str): The name of the column to aggregate.
-        agg_func (str): The aggregation function to use.
+        agg_column (str | list): The name(s) of the column(s) to aggregate.
+        agg_func (str | list): The aggregation function(s) to use: "sum", "count", "mean", "min", "max",
+            "median" or a quantile in [0, 1]. Quantiles of dataframes are exact; those of files are
+            approximated from sketches. Other functions are passed to pandas for dataframes.
+        processes (int, optional): The number of worker processes for files. Defaults to None (no pool).
+        kwargs: Keyword arguments to pass to maplab.tables.aggregate.
 
     Returns:
-        pandas.DataFrame: The aggregated dataframe.
+        pandas.Series: The aggregated values, or a pandas.DataFrame with a "<column>_<function>" column
+            per aggregate when several columns or functions are given.
     """
-    return df.groupby(county_column)[agg_column].agg(agg_func)
+    from .tables import AGGREGATES, aggregate
 
-def join_shapefile_to_dataframe(df, shapefile, index_column, join_column):
+    columns = agg_column if isinstance(agg_column, list) else [agg_column]
+    funcs = agg_func if isinstance(agg_func, list) else [agg_func]
+    supported = all(f in AGGREGATES or f == "median" or isinstance(f, float) for f in funcs)
+    if not supported and not isinstance(df, str):
+        return df.groupby(county_column)[agg_column].agg(agg_func)
+
+    result = aggregate(df, county_column, [(c, f) for c in columns for f in funcs], processes=processes, **kwargs)
+    if isinstance(agg_column, list) or isinstance(agg_func, list):
+        return result
+    return result.iloc[:, 0].rename(agg_column)
+
+def join_shapefile_to_dataframe(df, shapefile, index_column, join_column, columns=None, cache=True):
     """Joins a shapefile to a dataframe.
 
+    With cache set, the shapefile is read once into an indexed GeoParquet
+    store and later joins reuse it (see maplab.tables.read_vector_cached).
+
     Args:
         df (pandas.DataFrame): The dataframe to join.
         shapefile (str): The shapefile to join.
         index_column (str): The column to use as the index.
         join_column (str): The column to join on.
+        columns (list, optional): The shapefile columns to keep. Defaults to None (all).
+        cache (bool, optional): Whether to use the cached store. Defaults to True.
 
     Returns:
         geopandas.GeoDataFrame: The joined dataframe.
     """
-    gdf = geopandas.read_file(shapefile)
-    gdf = gdf.set_index(index_column)
-    gdf[join_column] = gdf.index
-    gdf = gdf.join(df, on=join_column)
-    return gdf
+    import geopandas as gpd
+    from .tables import join_indexed, read_vector_cached
+
+    if cache:
+        gdf = read_vector_cached(shapefile, columns=columns, index=index_column)
+    else:
+        gdf = gpd.read_file(shapefile, columns=None if columns is None else [*columns, index_column])
+        gdf = gdf.set_index(index_column)
+    return join_indexed(gdf, df, join_column)
 
 def columns_to_list(df, columns):
     """Converts the values of the given columns to a list.
@@ -675,6 +1329,6 @@ def columns_to_list(df, columns):
     Returns:
         pandas.DataFrame: The dataframe with the columns converted to lists.
     """
-    for column in columns:
-        df[column] = df[column].str.split(", ")
-    return df
+    from .tables import TextPipeline
+
+    return TextPipeline().split(", ").apply(df, columns=columns, inplace=True)
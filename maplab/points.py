@@ -0,0 +1,650 @@
+"""Point layer helpers shared by the map classes."""
+
+import math
+
+MAX_LATITUDE = 85.0511287798
+
+
+def lonlat_to_mercator(lon, lat):
+    """Projects longitudes and latitudes to normalized web mercator coordinates.
+
+    Args:
+        lon (numpy.ndarray): The longitudes.
+        lat (numpy.ndarray): The latitudes.
+
+    Returns:
+        tuple: The x and y coordinates in [0, 1], with y growing southwards.
+    """
+    import numpy as np
+
+    lat = np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(lon, dtype="float64") + 180.0) / 360.0
+    s = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return x, y
+
+
+def mercator_to_lonlat(x, y):
+    """Converts normalized web mercator coordinates back to longitudes and latitudes.
+
+    Args:
+        x (numpy.ndarray): The x coordinates in [0, 1].
+        y (numpy.ndarray): The y coordinates in [0, 1].
+
+    Returns:
+        tuple: The longitudes and latitudes.
+    """
+    import numpy as np
+
+    lon = np.asarray(x) * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * np.asarray(y)))))
+    return lon, lat
+
+
+def _coordinates(x, y):
+    """Coerces coordinate columns to float64 and flags the valid lon/lat pairs."""
+    import numpy as np
+    import pandas as pd
+
+    x = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64")
+    y = pd.to_numeric(y, errors="coerce").to_numpy(dtype="float64")
+    valid = np.isfinite(x) & np.isfinite(y) & (np.abs(x) <= 180) & (np.abs(y) <= 90)
+    return x, y, valid
+
+
+def read_points(in_csv, x="longitude", y="latitude", columns=(), chunksize=1_000_000, dtype="float64"):
+    """Reads point coordinates (and optional attribute columns) from a CSV file.
+
+    Only the coordinate and requested columns are parsed, in chunks. Rows with
+    missing, non-numeric or out of range coordinates are dropped, and text
+    attributes are stored as categoricals.
+
+    Args:
+        in_csv (str): The input csv file.
+        x (str, optional): The name of the x (longitude) column. Defaults to 'longitude'.
+        y (str, optional): The name of the y (latitude) column. Defaults to 'latitude'.
+        columns (list, optional): The attribute columns to keep. None keeps every column. Defaults to ().
+        chunksize (int, optional): The number of rows to parse at a time. Defaults to 1,000,000.
+        dtype (str, optional): The dtype of the coordinate arrays. Defaults to 'float64'.
+
+    Returns:
+        tuple: The contiguous x and y arrays and a DataFrame of the attributes (None if no columns were requested).
+    """
+    import numpy as np
+    import pandas as pd
+
+    usecols = None if columns is None else list(dict.fromkeys([x, y, *columns]))
+    xs, ys, frames = [], [], []
+
+    for chunk in pd.read_csv(in_csv, usecols=usecols, chunksize=chunksize):
+        cx, cy, valid = _coordinates(chunk[x], chunk[y])
+        xs.append(cx[valid].astype(dtype))
+        ys.append(cy[valid].astype(dtype))
+        if columns is None:
+            frames.append(chunk[valid])
+        elif columns:
+            frames.append(chunk.loc[valid, list(columns)])
+
+    if not xs:
+        return np.empty(0, dtype=dtype), np.empty(0, dtype=dtype), None
+
+    attributes = None
+    if frames:
+        attributes = pd.concat(frames, ignore_index=True)
+        for column in attributes.columns:
+            if pd.api.types.is_object_dtype(attributes[column]) or pd.api.types.is_string_dtype(attributes[column]):
+                attributes[column] = attributes[column].astype("category")
+
+    return np.concatenate(xs), np.concatenate(ys), attributes
+
+
+DRIVERS = {
+    ".shp": "ESRI Shapefile",
+    ".geojson": "GeoJSON",
+    ".json": "GeoJSON",
+    ".geojsonl": "GeoJSONSeq",
+    ".geojsons": "GeoJSONSeq",
+    ".fgb": "FlatGeobuf",
+    ".parquet": "GeoParquet",
+    ".geoparquet": "GeoParquet",
+}
+
+
+def _encode_csv_range(in_csv, start, end, columns, dtypes, x, y):
+    """Parses a byte range of a CSV file into an Arrow table with a WKB point geometry column."""
+    import io
+
+    import pandas as pd
+    import pyarrow as pa
+    import shapely
+
+    with open(in_csv, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if data.strip():
+        try:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=dtypes)
+        except ValueError as e:
+            raise ValueError(f"Bytes {start}-{end} of '{in_csv}' do not match the column types of the first "
+                             f"rows: {e}") from None
+    else:
+        df = pd.DataFrame(columns=columns).astype(dtypes)
+
+    cx, cy, valid = _coordinates(df[x], df[y])
+    df = df.assign(**{x: cx, y: cy})[valid]
+    geometry = shapely.to_wkb(shapely.points(cx[valid], cy[valid]))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.append_column("geometry", pa.array(geometry, type=pa.binary()))
+
+
+def csv_to_file(in_csv, out_file, x="longitude", y="latitude", driver=None, chunk_bytes=64 << 20, processes=None):
+    """Converts a csv file of points to a vector file, streaming it in chunks.
+
+    The CSV is split into line-aligned chunks that are parsed and encoded one
+    at a time (or in a process pool) and appended to the output, so peak
+    memory depends on the chunk size, not on the size of the file.
+    Coordinates are always stored as floats. Other columns are stored as
+    floats when their first non-empty values are numbers and as text
+    otherwise. Rows with missing or out of range coordinates are skipped.
+    Quoted values containing line breaks are not supported. The output is
+    written to a temporary path and only moved into place once complete.
+
+    Args:
+        in_csv (str): The input csv file.
+        out_file (str): The output file (.shp, .geojson, .geojsonl/.geojsons, .fgb or .parquet).
+        x (str, optional): The name of the x column. Defaults to 'longitude'.
+        y (str, optional): The name of the y column. Defaults to 'latitude'.
+        driver (str, optional): The output driver, e.g. 'GeoJSONSeq', 'FlatGeobuf' or 'GeoParquet'.
+            Defaults to None (inferred from the file extension).
+        chunk_bytes (int, optional): The approximate size of each CSV chunk in bytes. Defaults to 64 MiB.
+        processes (int, optional): The number of worker processes used to parse and encode chunks.
+            Defaults to None (no pool).
+    """
+    import os
+    import shutil
+    import tempfile
+    from itertools import chain
+
+    import pandas as pd
+    import pyarrow as pa
+
+    from .chunks import csv_ranges, imap_bounded
+
+    if driver is None:
+        ext = os.path.splitext(out_file)[1].lower()
+        if ext not in DRIVERS:
+            raise ValueError(f"Cannot infer the output format of '{out_file}'. Please specify a driver.")
+        driver = DRIVERS[ext]
+
+    sample = pd.read_csv(in_csv, nrows=10000)
+    columns = list(sample.columns)
+    # Integer and boolean columns may hold fractions or text further down, and coordinates are
+    # coerced to floats anyway, so only float64 and text types are used and every chunk casts cleanly.
+    dtypes = {}
+    for column, values in sample.items():
+        numeric = pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype)
+        dtypes[column] = "float64" if numeric and values.notna().any() and column not in (x, y) else "str"
+
+    ranges = list(csv_ranges(in_csv, chunk_bytes)) or [(0, 0)]
+    tasks = ((in_csv, start, end, columns, dtypes, x, y) for start, end in ranges)
+    tables = imap_bounded(_encode_csv_range, tasks, processes)
+    first = next(tables)
+    schema = first.schema
+    errors = []
+
+    def cast(tables):
+        # pyogrio reports errors raised while reading the batches as a RuntimeError; keep the original.
+        try:
+            for table in tables:
+                yield table.cast(schema)
+        except Exception as e:
+            errors.append(e)
+            raise
+
+    tables = cast(chain([first], tables))
+
+    # Write into a temporary directory next to the output (shapefiles have sidecar files) and
+    # move the files into place on success, so a failure never leaves a partial output.
+    out_file = os.path.abspath(out_file)
+    tmp_dir = tempfile.mkdtemp(prefix=".maplab-", dir=os.path.dirname(out_file))
+    tmp_file = os.path.join(tmp_dir, os.path.basename(out_file))
+    try:
+        if driver == "GeoParquet":
+            import json
+
+            import pyarrow.parquet as pq
+
+            geo = {
+                "version": "1.0.0",
+                "primary_column": "geometry",
+                "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point"]}},
+            }
+            schema = schema.with_metadata({b"geo": json.dumps(geo).encode()})
+            with pq.ParquetWriter(tmp_file, schema) as writer:
+                for table in tables:
+                    writer.write_table(table.replace_schema_metadata(schema.metadata))
+        else:
+            import pyogrio
+            from pyproj import CRS
+
+            options = {"SPATIAL_INDEX": "YES"} if driver == "FlatGeobuf" else {}
+            batches = (batch for table in tables for batch in table.to_batches())
+            pyogrio.write_arrow(
+                pa.RecordBatchReader.from_batches(schema, batches),
+                tmp_file,
+                driver=driver,
+                geometry_name="geometry",
+                geometry_type="Point",
+                crs=CRS.from_epsg(4326).to_wkt(),
+                layer_options=options,
+            )
+
+        for name in os.listdir(tmp_dir):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(os.path.dirname(out_file), name))
+    except Exception:
+        if errors:
+            raise errors[0] from None
+        raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class ClusterIndex:
+    """A hierarchical point clustering index computed once for all zoom levels.
+
+    Points are grouped on a grid whose cells are ``radius`` pixels wide at each
+    zoom level. Every level is built from the level below it, so the whole
+    pyramid costs one sort per zoom level and clusters nest across levels.
+    Each level is kept sorted by x so a viewport query only touches the
+    clusters in its x range.
+
+    Args:
+        lon (array-like): The point longitudes.
+        lat (array-like): The point latitudes.
+        radius (int, optional): The cluster radius in pixels. Defaults to 60.
+        min_zoom (int, optional): The lowest zoom level to cluster. Defaults to 0.
+        max_zoom (int, optional): The highest zoom level to cluster; above it points are shown individually. Defaults to 16.
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+    """
+
+    def __init__(self, lon, lat, radius=60, min_zoom=0, max_zoom=16, tile_size=256) -> None:
+        import numpy as np
+
+        self.radius = radius
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.tile_size = tile_size
+
+        x, y = lonlat_to_mercator(lon, lat)
+        ids = np.arange(len(x))
+        self.levels = {max_zoom + 1: self._sort(x, y, np.ones(len(x), dtype="int64"), ids)}
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            self.levels[zoom] = self._cluster(self.levels[zoom + 1], zoom)
+
+    @staticmethod
+    def _sort(x, y, count, ids):
+        import numpy as np
+
+        order = np.argsort(x, kind="stable")
+        return {"x": x[order], "y": y[order], "count": count[order], "id": ids[order]}
+
+    def _cluster(self, level, zoom):
+        import numpy as np
+
+        if not len(level["x"]):
+            return level
+
+        cell = self.radius / (self.tile_size * 2 ** zoom)
+        n = int(math.ceil(1 / cell)) + 1
+        keys = np.floor(level["y"] / cell).astype("int64") * n + np.floor(level["x"] / cell).astype("int64")
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+        count = level["count"][order]
+        total = np.add.reduceat(count, starts)
+        x = np.add.reduceat(level["x"][order] * count, starts) / total
+        y = np.add.reduceat(level["y"][order] * count, starts) / total
+        ids = np.minimum.reduceat(level["id"][order], starts)
+        return self._sort(x, y, total, ids)
+
+    def level(self, zoom):
+        """Returns the level used for a (possibly fractional) zoom.
+
+        Args:
+            zoom (float): The map zoom level.
+
+        Returns:
+            int: The level.
+        """
+        return min(max(int(math.floor(zoom)), self.min_zoom), self.max_zoom + 1)
+
+    def query(self, zoom, bounds):
+        """Returns the clusters and single points inside the bounds at a zoom level.
+
+        Args:
+            zoom (float): The map zoom level.
+            bounds (tuple): The area as ((south, west), (north, east)).
+
+        Returns:
+            dict: Arrays of lon, lat, count and id. For single points id is the point's row number.
+        """
+        import numpy as np
+
+        level = self.levels[self.level(zoom)]
+        (south, west), (north, east) = bounds
+        x0, y0 = lonlat_to_mercator(west, north)
+        x1, y1 = lonlat_to_mercator(east, south)
+
+        lo = np.searchsorted(level["x"], x0, side="left")
+        hi = np.searchsorted(level["x"], x1, side="right")
+        sel = np.arange(lo, hi)[(level["y"][lo:hi] >= y0) & (level["y"][lo:hi] <= y1)]
+
+        lon, lat = mercator_to_lonlat(level["x"][sel], level["y"][sel])
+        return {"lon": lon, "lat": lat, "count": level["count"][sel], "id": level["id"][sel]}
+
+
+def tile_bounds(bounds, zoom):
+    """Expands bounds to the edges of the XYZ tiles covering them.
+
+    Args:
+        bounds (tuple): The area as ((south, west), (north, east)).
+        zoom (int): The tile zoom level.
+
+    Returns:
+        tuple: The tile-aligned bounds as ((south, west), (north, east)).
+    """
+    (south, west), (north, east) = bounds
+    n = 2 ** zoom
+    x0, y0 = lonlat_to_mercator(west, north)
+    x1, y1 = lonlat_to_mercator(east, south)
+    tx0, ty0 = max(math.floor(x0 * n), 0), max(math.floor(y0 * n), 0)
+    tx1, ty1 = min(math.floor(x1 * n) + 1, n), min(math.floor(y1 * n) + 1, n)
+    (w, e), (nn, s) = mercator_to_lonlat([tx0 / n, tx1 / n], [ty0 / n, ty1 / n])
+    return ((float(s), float(w)), (float(nn), float(e)))
+
+
+class ClusterLayer:
+    """Shows a ClusterIndex on a map, sending only the clusters in the visible tiles.
+
+    The layer is a single GeoJSON layer whose data is replaced when the set
+    of visible tiles or the zoom level changes.
+
+    Args:
+        index (ClusterIndex): The cluster index.
+        name (str, optional): The name of the layer. Defaults to "Clusters".
+        kwargs: Keyword arguments to pass to the GeoJSON layer.
+    """
+
+    def __init__(self, index, name="Clusters", **kwargs) -> None:
+        import ipyleaflet
+
+        self.index = index
+        self.key = None
+        kwargs.setdefault("point_style", {"radius": 6, "color": "#3388ff", "fillOpacity": 0.7, "weight": 1})
+        self.layer = ipyleaflet.GeoJSON(data={"type": "FeatureCollection", "features": []}, name=name, **kwargs)
+        self.stats = {"updates": 0, "features_sent": 0}
+
+    def features(self, zoom, bounds):
+        """Returns the GeoJSON features of the clusters in the bounds.
+
+        Args:
+            zoom (float): The map zoom level.
+            bounds (tuple): The area as ((south, west), (north, east)).
+
+        Returns:
+            list: The GeoJSON point features.
+        """
+        import numpy as np
+
+        hits = self.index.query(zoom, bounds)
+        radius = np.where(hits["count"] > 1, 10 + 4 * np.log10(hits["count"]), 6).round(1)
+
+        features = []
+        for lon, lat, count, id, r in zip(hits["lon"].tolist(), hits["lat"].tolist(), hits["count"].tolist(),
+                                          hits["id"].tolist(), radius.tolist()):
+            properties = {"count": count, "style": {"radius": r}} if count > 1 else {"id": id}
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": properties,
+            })
+        return features
+
+    def update(self, zoom, bounds):
+        """Sends the clusters of the tiles covering the bounds if they changed.
+
+        Args:
+            zoom (float): The map zoom level.
+            bounds (tuple): The viewport as ((south, west), (north, east)).
+        """
+        level = self.index.level(zoom)
+        area = tile_bounds(bounds, max(int(math.floor(zoom)), 0))
+        if (level, area) == self.key:
+            return
+        self.key = (level, area)
+
+        features = self.features(zoom, area)
+        self.layer.data = {"type": "FeatureCollection", "features": features}
+        self.stats["updates"] += 1
+        self.stats["features_sent"] += len(features)
+
+    def link(self, m):
+        """Updates the clusters whenever the map is panned or zoomed.
+
+        Args:
+            m (ipyleaflet.Map): The map to observe.
+        """
+        from .vector import estimate_bounds
+
+        def on_change(change):
+            if m.bounds:
+                self.update(m.zoom, m.bounds)
+
+        self.update(m.zoom, m.bounds or estimate_bounds(m.center, m.zoom))
+        m.observe(on_change, names=["bounds", "zoom"])
+        self.unlink = lambda: m.unobserve(on_change, names=["bounds", "zoom"])
+
+
+def _part1by1(v):
+    """Spreads the low 32 bits of v so that there is a zero bit between each of them."""
+    import numpy as np
+
+    v = v.astype("uint64") & np.uint64(0xFFFFFFFF)
+    for shift, mask in [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)]:
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(x, y):
+    """Interleaves the bits of integer x and y coordinates into Z-order keys.
+
+    Args:
+        x (numpy.ndarray): The integer x coordinates (up to 32 bits).
+        y (numpy.ndarray): The integer y coordinates (up to 32 bits).
+
+    Returns:
+        numpy.ndarray: The uint64 keys.
+    """
+    import numpy as np
+
+    return _part1by1(np.asarray(x)) | (_part1by1(np.asarray(y)) << np.uint64(1))
+
+
+class DensityTiler:
+    """Renders point density (heatmap) tiles in the kernel.
+
+    Points are binned to pixels at the highest zoom and sorted by their
+    Z-order key, which makes the pixels of any tile a contiguous range found
+    with a binary search. Coarser levels are pre-aggregated every few zoom
+    levels, so rendering a tile costs O(pixels with points in the tile)
+    instead of O(all points). Each tile is a 2D histogram colored on a log
+    scale against the densest pixel at that zoom, and rendered tiles are
+    kept in an LRU.
+
+    Args:
+        lon (array-like): The point longitudes.
+        lat (array-like): The point latitudes.
+        weights (array-like, optional): The point weights. Defaults to None (each point counts once).
+        max_zoom (int, optional): The highest zoom rendered; higher zooms are upscaled by the map. Defaults to 16.
+        colormap (str, optional): The colormap (see maplab.raster.COLORMAPS). Defaults to "magma".
+        level_step (int, optional): The number of zoom levels between pre-aggregated levels. Defaults to 3.
+        max_bytes (int, optional): The size of the rendered tile cache. Defaults to 64 MiB.
+    """
+
+    TILE_BITS = 8
+
+    def __init__(self, lon, lat, weights=None, max_zoom=16, colormap="magma", level_step=3,
+                 max_bytes=64 << 20) -> None:
+        import numpy as np
+
+        from .raster import colormap_lut
+        from .tiles import LRUCache
+
+        self.max_zoom = max_zoom
+        self.lut = colormap_lut(colormap)
+        self.cache = LRUCache(max_bytes)
+        self.vmax = {}
+
+        bits = max_zoom + self.TILE_BITS
+        scale = 2 ** bits
+        x, y = lonlat_to_mercator(lon, lat)
+        px = np.clip((x * scale).astype("int64"), 0, scale - 1)
+        py = np.clip((y * scale).astype("int64"), 0, scale - 1)
+        keys = morton(px, py)
+        weights = np.ones(len(keys)) if weights is None else np.asarray(weights, dtype="float64")
+
+        order = np.argsort(keys, kind="stable")
+        self.levels = {bits: self._reduce(keys[order], weights[order])}
+        for level in range(bits - level_step, self.TILE_BITS - 1, -level_step):
+            keys, counts = self.levels[min(self.levels)]
+            shift = np.uint64(2 * (min(self.levels) - level))
+            self.levels[level] = self._reduce(keys >> shift, counts)
+
+        # Maps the Z-order key of a pixel inside a tile to its row-major index.
+        local = np.arange(2 ** self.TILE_BITS)
+        lx, ly = np.meshgrid(local, local)
+        self.pixel_index = np.empty(4 ** self.TILE_BITS, dtype="int64")
+        self.pixel_index[morton(lx.ravel(), ly.ravel()).astype("int64")] = (ly * 2 ** self.TILE_BITS + lx).ravel()
+
+    @staticmethod
+    def _reduce(keys, counts):
+        """Sums the counts of equal consecutive keys."""
+        import numpy as np
+
+        if not len(keys):
+            return keys, counts
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return keys[starts], np.add.reduceat(counts, starts)
+
+    def _level(self, z):
+        """Returns the coarsest stored level that still resolves the pixels of zoom z."""
+        bits = z + self.TILE_BITS
+        return min(level for level in self.levels if level >= bits)
+
+    def max_density(self, z):
+        """Returns the largest pixel count at a zoom level.
+
+        Args:
+            z (int): The zoom level.
+
+        Returns:
+            float: The largest count.
+        """
+        if z not in self.vmax:
+            import numpy as np
+
+            level = self._level(z)
+            keys, counts = self.levels[level]
+            _, counts = self._reduce(keys >> np.uint64(2 * (level - z - self.TILE_BITS)), counts)
+            self.vmax[z] = float(counts.max()) if len(counts) else 1.0
+        return self.vmax[z]
+
+    def histogram(self, z, x, y):
+        """Returns the per-pixel counts of a tile.
+
+        Args:
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            numpy.ndarray: A (256, 256) float array.
+        """
+        import numpy as np
+
+        size = 2 ** self.TILE_BITS
+        level = self._level(z)
+        keys, counts = self.levels[level]
+
+        shift = 2 * (level - z)
+        tile = int(morton(np.array([x]), np.array([y]))[0])
+        lo = np.searchsorted(keys, np.uint64(tile << shift), side="left")
+        hi = np.searchsorted(keys, np.uint64((tile + 1) << shift), side="left")
+
+        local = (keys[lo:hi] >> np.uint64(shift - 2 * self.TILE_BITS)) - np.uint64(tile << (2 * self.TILE_BITS))
+        pixels = self.pixel_index[local.astype("int64")]
+        return np.bincount(pixels, weights=counts[lo:hi], minlength=size * size).reshape(size, size)
+
+    def render(self, z, x, y):
+        """Renders a density tile.
+
+        Args:
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The PNG tile, or None if the tile has no points.
+        """
+        import numpy as np
+
+        from .raster import encode_png
+
+        if z > self.max_zoom:
+            return None
+        hist = self.histogram(z, x, y)
+        if not hist.any():
+            return None
+
+        value = np.log1p(hist) / np.log1p(self.max_density(z))
+        index = np.clip(value * 255, 0, 255).astype("uint8")
+        rgba = np.empty(hist.shape + (4,), dtype="uint8")
+        rgba[..., :3] = self.lut[index]
+        rgba[..., 3] = np.where(hist > 0, np.clip(96 + value * 159, 0, 255), 0).astype("uint8")
+        return encode_png(rgba)
+
+    def __call__(self, z, x, y):
+        key = (z, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.render(z, x, y)
+            if data is not None:
+                self.cache.put(key, data)
+        return data
+
+
+def add_density_source(lon, lat, server=None, **kwargs):
+    """Registers a point density heatmap on the local tile server.
+
+    Args:
+        lon (array-like): The point longitudes.
+        lat (array-like): The point latitudes.
+        server (TileServer, optional): The tile server. Defaults to None (the shared server).
+        kwargs: Keyword arguments to pass to DensityTiler.
+
+    Returns:
+        tuple: The DensityTiler and its XYZ URL template.
+    """
+    import uuid
+
+    from .tiles import get_tile_server
+
+    server = server or get_tile_server()
+    tiler = DensityTiler(lon, lat, **kwargs)
+    return tiler, server.add_source("density-" + uuid.uuid4().hex[:12], tiler)
@@ -0,0 +1,286 @@
+"""Raster tile rendering helpers."""
+
+import math
+import struct
+import threading
+import zlib
+
+from .tiles import WEB_MERCATOR_HALF, LRUCache, get_tile_server, mercator_tile_bounds
+
+# Colormaps as (position, (r, g, b)) control points, interpolated linearly.
+COLORMAPS = {
+    "gray": [(0.0, (0, 0, 0)), (1.0, (255, 255, 255))],
+    "viridis": [
+        (0.0, (68, 1, 84)), (0.25, (59, 82, 139)), (0.5, (33, 145, 140)),
+        (0.75, (94, 201, 98)), (1.0, (253, 231, 37)),
+    ],
+    "magma": [
+        (0.0, (0, 0, 4)), (0.25, (81, 18, 124)), (0.5, (183, 55, 121)),
+        (0.75, (252, 137, 97)), (1.0, (252, 253, 191)),
+    ],
+    "terrain": [
+        (0.0, (51, 51, 153)), (0.15, (0, 153, 255)), (0.25, (0, 204, 102)),
+        (0.5, (255, 255, 153)), (0.75, (128, 92, 84)), (1.0, (255, 255, 255)),
+    ],
+    "ylorrd": [
+        (0.0, (255, 255, 204)), (0.25, (254, 217, 118)), (0.5, (253, 141, 60)),
+        (0.75, (227, 26, 28)), (1.0, (128, 0, 38)),
+    ],
+}
+
+
+def colormap_lut(name, n=256):
+    """Returns a lookup table of n RGB colors for a colormap.
+
+    Args:
+        name (str): The colormap name (see COLORMAPS).
+        n (int, optional): The number of colors. Defaults to 256.
+
+    Returns:
+        numpy.ndarray: An (n, 3) uint8 array.
+    """
+    import numpy as np
+
+    if name not in COLORMAPS:
+        raise ValueError(f"Colormap '{name}' not found. Available colormaps: {', '.join(COLORMAPS)}.")
+    stops = COLORMAPS[name]
+    pos = np.array([p for p, _ in stops])
+    rgb = np.array([c for _, c in stops], dtype="float64")
+    t = np.linspace(0, 1, n)
+    return np.stack([np.interp(t, pos, rgb[:, i]) for i in range(3)], axis=1).round().astype("uint8")
+
+
+def encode_png(rgba):
+    """Encodes an RGBA image as a PNG.
+
+    Args:
+        rgba (numpy.ndarray): A (height, width, 4) uint8 array.
+
+    Returns:
+        bytes: The PNG data.
+    """
+    import numpy as np
+
+    height, width = rgba.shape[:2]
+    # Each scanline starts with filter type 0 (none).
+    raw = np.concatenate([np.zeros((height, 1), dtype="uint8"), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_rgba(data, mask, rescale=None, colormap=None):
+    """Renders band data to an RGBA image.
+
+    Args:
+        data (numpy.ndarray): A (bands, height, width) array with 1 or 3+ bands.
+        mask (numpy.ndarray): A (height, width) array that is nonzero where the data is valid.
+        rescale (list, optional): The (min, max) range mapped to 0-255, one pair or one pair per band.
+            Defaults to None (no rescaling).
+        colormap (str, optional): The colormap applied to single-band data. Defaults to None (gray).
+
+    Returns:
+        numpy.ndarray: A (height, width, 4) uint8 array.
+    """
+    import numpy as np
+
+    data = data.astype("float64")
+    if rescale is not None:
+        ranges = rescale if isinstance(rescale[0], (list, tuple)) else [rescale] * len(data)
+        for i, (lo, hi) in enumerate(ranges[:len(data)]):
+            data[i] = (data[i] - lo) / ((hi - lo) or 1) * 255
+    data = np.clip(np.nan_to_num(data), 0, 255).astype("uint8")
+
+    height, width = data.shape[1:]
+    rgba = np.empty((height, width, 4), dtype="uint8")
+    if len(data) >= 3:
+        rgba[..., :3] = np.moveaxis(data[:3], 0, -1)
+    else:
+        rgba[..., :3] = colormap_lut(colormap or "gray")[data[0]]
+    rgba[..., 3] = np.where(mask, 255, 0)
+    return rgba
+
+
+class COGTiler:
+    """Renders XYZ tiles from a Cloud-Optimized GeoTIFF with rasterio.
+
+    Tiles are read from a WarpedVRT to EPSG:3857 at the native resolution of
+    the dataset, with a window covering the tile and an output shape of the
+    tile size. The decimated read lets GDAL pick the overview that matches
+    the tile's zoom, so only the blocks of that overview covering the tile
+    are read (with HTTP range requests for remote files). Rendered tiles are
+    kept in an in-memory LRU.
+
+    Args:
+        path (str): The path or URL of the COG.
+        bands (list, optional): The 1-based band indexes to render. Defaults to None (first band, or the
+            first three for RGB imagery).
+        rescale (list, optional): The (min, max) range mapped to 0-255. Defaults to None (2nd-98th
+            percentiles of the lowest overview, or no rescaling for 8-bit data).
+        colormap (str, optional): The colormap for single-band rendering. Defaults to None (gray).
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+        max_bytes (int, optional): The size of the rendered tile cache. Defaults to 64 MiB.
+    """
+
+    def __init__(self, path, bands=None, rescale=None, colormap=None, tile_size=256, max_bytes=64 << 20) -> None:
+        import rasterio
+        from rasterio.warp import transform_bounds
+
+        self.path = path
+        self.src = rasterio.open(path)
+        self.lock = threading.Lock()
+        self.tile_size = tile_size
+        self.colormap = colormap
+        self.cache = LRUCache(max_bytes)
+
+        if bands is None:
+            bands = [1, 2, 3] if self.src.count >= 3 and self.src.dtypes[0] == "uint8" else [1]
+        self.bands = list(bands)
+
+        if rescale is None and self.src.dtypes[0] != "uint8":
+            rescale = self.statistics()
+        self.rescale = rescale
+
+        b = transform_bounds(self.src.crs, "EPSG:3857", *self.src.bounds)
+        self.mercator_bounds = (
+            max(b[0], -WEB_MERCATOR_HALF), max(b[1], -WEB_MERCATOR_HALF),
+            min(b[2], WEB_MERCATOR_HALF), min(b[3], WEB_MERCATOR_HALF),
+        )
+        self.bounds = transform_bounds(self.src.crs, "EPSG:4326", *self.src.bounds)
+
+        from rasterio.enums import Resampling
+        from rasterio.vrt import WarpedVRT
+
+        self.vrt = WarpedVRT(self.src, crs="EPSG:3857", resampling=Resampling.bilinear)
+
+    def statistics(self, max_size=1024):
+        """Returns the 2nd and 98th percentiles of each band from a decimated read.
+
+        Args:
+            max_size (int, optional): The largest dimension of the decimated read. Defaults to 1024.
+
+        Returns:
+            list: One (min, max) pair per rendered band.
+        """
+        import numpy as np
+
+        scale = max(self.src.width, self.src.height) / max_size
+        shape = (max(int(self.src.height / max(scale, 1)), 1), max(int(self.src.width / max(scale, 1)), 1))
+        with self.lock:
+            data = self.src.read(self.bands, out_shape=(len(self.bands), *shape), masked=True)
+
+        ranges = []
+        for band in data:
+            values = band.compressed()
+            values = values[np.isfinite(values)]
+            if values.size:
+                ranges.append(tuple(np.percentile(values, [2, 98]).tolist()))
+            else:
+                ranges.append((0.0, 1.0))
+        return ranges
+
+    def info(self):
+        """Returns a summary of the dataset.
+
+        Returns:
+            dict: The bounds (in EPSG:4326), band count, dtype and rendering settings.
+        """
+        return {
+            "bounds": list(self.bounds),
+            "count": self.src.count,
+            "dtype": self.src.dtypes[0],
+            "bands": self.bands,
+            "rescale": self.rescale,
+            "colormap": self.colormap,
+        }
+
+    def render(self, z, x, y):
+        """Renders a tile.
+
+        Args:
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The PNG tile, or None if the tile does not overlap the dataset.
+        """
+        import numpy as np
+        from rasterio.enums import Resampling
+        from rasterio.errors import WindowError
+        from rasterio.windows import Window, from_bounds
+
+        minx, miny, maxx, maxy = mercator_tile_bounds(z, x, y)
+        bx0, by0, bx1, by1 = self.mercator_bounds
+        if minx >= bx1 or maxx <= bx0 or miny >= by1 or maxy <= by0:
+            return None
+
+        # The tile in native VRT pixels, and the part of it that is inside the dataset.
+        size = self.tile_size
+        tile = from_bounds(minx, miny, maxx, maxy, self.vrt.transform)
+        try:
+            window = tile.intersection(Window(0, 0, self.vrt.width, self.vrt.height))
+        except WindowError:
+            return None
+        scale = size / tile.width, size / tile.height
+        col0 = int(round((window.col_off - tile.col_off) * scale[0]))
+        row0 = int(round((window.row_off - tile.row_off) * scale[1]))
+        col1 = min(int(round((window.col_off + window.width - tile.col_off) * scale[0])), size)
+        row1 = min(int(round((window.row_off + window.height - tile.row_off) * scale[1])), size)
+        if col1 <= col0 or row1 <= row0:
+            return None
+
+        shape = (row1 - row0, col1 - col0)
+        data = np.zeros((len(self.bands), size, size), dtype=self.src.dtypes[0])
+        mask = np.zeros((size, size), dtype="uint8")
+        with self.lock:
+            data[:, row0:row1, col0:col1] = self.vrt.read(
+                self.bands, window=window, out_shape=(len(self.bands), *shape), resampling=Resampling.bilinear
+            )
+            mask[row0:row1, col0:col1] = self.vrt.dataset_mask(window=window, out_shape=shape)
+
+        if not mask.any():
+            return None
+        return encode_png(render_rgba(data, mask, self.rescale, self.colormap))
+
+    def __call__(self, z, x, y):
+        key = (z, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.render(z, x, y)
+            if data is not None:
+                self.cache.put(key, data)
+        return data
+
+    def close(self):
+        """Closes the dataset."""
+        self.vrt.close()
+        self.src.close()
+
+
+def add_cog_source(path, server=None, **kwargs):
+    """Registers a COG on the local tile server.
+
+    Args:
+        path (str): The path or URL of the COG.
+        server (TileServer, optional): The tile server. Defaults to None (the shared server).
+        kwargs: Keyword arguments to pass to COGTiler.
+
+    Returns:
+        tuple: The COGTiler and its XYZ URL template.
+    """
+    import hashlib
+
+    server = server or get_tile_server()
+    tiler = COGTiler(path, **kwargs)
+    key = repr((path, sorted(kwargs.items())))
+    name = "cog-" + hashlib.sha1(key.encode()).hexdigest()[:12]
+    return tiler, server.add_source(name, tiler)
@@ -0,0 +1,192 @@
+"""Pooled HTTP helpers for remote raster services."""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_loop = None
+_client = None
+_lock = threading.Lock()
+
+
+def _event_loop():
+    """Returns the background event loop used for HTTP requests, starting it on first use."""
+    import asyncio
+
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="maplab-http", daemon=True).start()
+    return _loop
+
+
+def run_async(coro):
+    """Runs a coroutine on the background event loop and waits for its result.
+
+    The loop runs in its own thread, so this also works inside Jupyter where
+    an event loop is already running.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+
+    Returns:
+        object: The result of the coroutine.
+    """
+    import asyncio
+
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+
+def get_async_client():
+    """Returns the shared, connection-pooled httpx.AsyncClient.
+
+    Returns:
+        httpx.AsyncClient: The client. It must only be used on the background event loop.
+    """
+    import httpx
+
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            headers={"User-Agent": "maplab"},
+        )
+    return _client
+
+
+class MetadataCache:
+    """A least recently used cache of JSON metadata with a time to live, persisted to disk.
+
+    Args:
+        path (str, optional): The JSON file backing the cache. Defaults to None (~/.cache/maplab/metadata.json).
+        ttl (float, optional): The number of seconds an entry stays valid. Defaults to 86400 (one day).
+        max_entries (int, optional): The maximum number of entries. Defaults to 1024.
+    """
+
+    def __init__(self, path=None, ttl=86400, max_entries=1024) -> None:
+        from .tiles import default_cache_dir
+
+        self.path = path or default_cache_dir("metadata.json")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+        try:
+            with open(self.path) as f:
+                for key, entry in json.load(f):
+                    self.entries[key] = entry
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key):
+        """Returns a cached value if it has not expired.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            object: The cached value, or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry["time"] > self.ttl:
+                self.entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["value"]
+
+    def put(self, key, value):
+        """Stores a value and saves the cache to disk.
+
+        Args:
+            key (str): The key.
+            value (object): A JSON-serializable value.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = {"time": time.time(), "value": value}
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp, self.path)
+
+
+_metadata_cache = None
+
+
+def get_metadata_cache():
+    """Returns the shared metadata cache, creating it on first use.
+
+    Returns:
+        MetadataCache: The cache.
+    """
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+    return _metadata_cache
+
+
+async def _get_json(url, params=None):
+    r = await get_async_client().get(url, params=params)
+    r.raise_for_status()
+    return r.json()
+
+
+async def _cog_metadata(url, endpoint):
+    import asyncio
+
+    info, tilejson = await asyncio.gather(
+        _get_json(f"{endpoint}/cog/info", {"url": url}),
+        _get_json(f"{endpoint}/cog/tilejson.json", {"url": url}),
+    )
+    return {"bounds": info["bounds"], "tiles": tilejson["tiles"]}
+
+
+def cog_metadata(urls, endpoint="https://titiler.xyz", cache=None):
+    """Returns the bounds and tile URLs of COGs from a TiTiler server.
+
+    The info and tilejson requests of every COG that is not in the cache are
+    sent concurrently over the shared connection pool, and the results are
+    memoized on disk.
+
+    Args:
+        urls (list): The COG URLs.
+        endpoint (str, optional): The TiTiler endpoint. Defaults to "https://titiler.xyz".
+        cache (MetadataCache, optional): The metadata cache. Defaults to None (the shared cache).
+
+    Returns:
+        list: One dict with "bounds" and "tiles" per URL.
+    """
+    import asyncio
+
+    cache = cache or get_metadata_cache()
+    keys = [f"{endpoint}|{url}" for url in urls]
+    results = [cache.get(key) for key in keys]
+    missing = sorted({url for url, result in zip(urls, results) if result is None})
+
+    if missing:
+        async def fetch_all():
+            return await asyncio.gather(*[_cog_metadata(url, endpoint) for url in missing])
+
+        fetched = dict(zip(missing, run_async(fetch_all())))
+        for url, metadata in fetched.items():
+            cache.put(f"{endpoint}|{url}", metadata)
+        # The cache may already have evicted or expired what was just put, so use the fetched values.
+        results = [result or fetched[url] for url, result in zip(urls, results)]
+
+    return results
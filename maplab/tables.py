@@ -0,0 +1,588 @@
+"""Tabular data helpers for the census preparation functions."""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# Sidecar files that are part of a shapefile.
+SHAPEFILE_PARTS = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+# Bumped whenever the cached files change meaning, so older entries are not reused.
+CACHE_VERSION = 2
+
+_stores = OrderedDict()
+
+
+def file_key(path, *parts):
+    """Returns a cache key for a file that changes whenever the file does.
+
+    Args:
+        path (str | list): The file path, or the paths of the files making up a dataset.
+        parts: Other values that distinguish cache entries (e.g. the sheet name).
+
+    Returns:
+        str: The key, derived from the absolute paths, sizes, modification times and parts.
+    """
+    files = []
+    for p in [path] if isinstance(path, str) else path:
+        stat = os.stat(p)
+        files.append([os.path.abspath(p), stat.st_size, stat.st_mtime_ns])
+    key = json.dumps([files, *parts], default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def dataset_files(path):
+    """Returns the files a vector dataset is made of, e.g. the .shp, .shx, .dbf and .prj of a shapefile.
+
+    Args:
+        path (str): The dataset path.
+
+    Returns:
+        list: The existing files.
+    """
+    stem, ext = os.path.splitext(path)
+    if ext.lower() != ".shp":
+        return [path]
+    return [path] + [stem + e for e in SHAPEFILE_PARTS[1:] if os.path.exists(stem + e)]
+
+
+def compact_dtypes(df, categories=None):
+    """Converts the given columns to categoricals.
+
+    Args:
+        df (pandas.DataFrame): The dataframe, modified in place.
+        categories (list, optional): The columns to convert. Defaults to None (none).
+
+    Returns:
+        pandas.DataFrame: The dataframe.
+    """
+    for column in categories or []:
+        if column in df.columns and df[column].dtype != "category":
+            df[column] = df[column].astype("category")
+    return df
+
+
+def excel_cache_file(excel_file, sheet_name=0, index_col=None, usecols=None, categories=None, cache_dir=None):
+    """Returns the Parquet copy of an Excel sheet, creating it if the sheet has not been cached yet.
+
+    The sheet is parsed with openpyxl in read-only mode, only the requested
+    columns are kept and the columns listed in categories are stored as categoricals.
+
+    Args:
+        excel_file (str): The Excel file.
+        sheet_name (str | int, optional): The sheet name or position. Defaults to 0.
+        index_col (str | int, optional): The column to use as the index. Defaults to None.
+        usecols (list, optional): The columns to read. Defaults to None (all).
+        categories (list, optional): Columns stored as categoricals. Defaults to None.
+        cache_dir (str, optional): The cache directory. Defaults to None (~/.cache/maplab/tables).
+
+    Returns:
+        str: The path of the Parquet file.
+    """
+    import pandas as pd
+
+    from .tiles import default_cache_dir
+
+    cache_dir = cache_dir or default_cache_dir("tables")
+    key = file_key(excel_file, sheet_name, index_col, usecols, categories, CACHE_VERSION)
+    path = os.path.join(cache_dir, f"{key}.parquet")
+    if not os.path.exists(path):
+        df = pd.read_excel(excel_file, sheet_name=sheet_name, index_col=index_col, usecols=usecols)
+        compact_dtypes(df, categories)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def read_excel_cached(excel_file, sheet_name=0, index_col=None, usecols=None, categories=None, cache_dir=None):
+    """Reads an Excel sheet through a Parquet cache.
+
+    The first read parses the workbook and saves the sheet as Parquet (see
+    excel_cache_file). Later reads of the same, unchanged file and sheet load
+    the Parquet file memory-mapped instead of parsing the workbook.
+
+    Args:
+        excel_file (str): The Excel file.
+        sheet_name (str | int, optional): The sheet name or position. Defaults to 0.
+        index_col (str | int, optional): The column to use as the index. Defaults to None.
+        usecols (list, optional): The columns to read. Defaults to None (all).
+        categories (list, optional): Columns stored as categoricals. Defaults to None.
+        cache_dir (str, optional): The cache directory. Defaults to None (~/.cache/maplab/tables).
+
+    Returns:
+        pandas.DataFrame: The sheet.
+    """
+    import pandas as pd
+
+    path = excel_cache_file(excel_file, sheet_name, index_col, usecols, categories, cache_dir)
+    return pd.read_parquet(path, memory_map=True)
+
+
+def read_vector_cached(path, columns=None, index=None, cache_dir=None, max_entries=8):
+    """Reads a vector dataset through a GeoParquet cache and an in-memory store.
+
+    The first read keeps only the requested columns, sets the key index and
+    saves the result as GeoParquet, so later sessions skip parsing the
+    source. Within a session the indexed GeoDataFrame is kept in memory, and
+    its hash index is reused by every join.
+
+    Args:
+        path (str): The vector dataset, e.g. a shapefile.
+        columns (list, optional): The attribute columns to keep. Defaults to None (all).
+        index (str, optional): The column to index the features by. Defaults to None.
+        cache_dir (str, optional): The cache directory. Defaults to None (~/.cache/maplab/tables).
+        max_entries (int, optional): The number of datasets kept in memory. Defaults to 8.
+
+    Returns:
+        geopandas.GeoDataFrame: The features. It is shared between calls and must not be modified in place.
+    """
+    import geopandas as gpd
+
+    from .tiles import default_cache_dir
+
+    key = file_key(dataset_files(path), columns, index)
+    if key in _stores:
+        _stores.move_to_end(key)
+        return _stores[key]
+
+    cache_dir = cache_dir or default_cache_dir("tables")
+    parquet = os.path.join(cache_dir, f"{key}.parquet")
+    if os.path.exists(parquet):
+        gdf = gpd.read_parquet(parquet)
+    else:
+        if columns is not None:
+            columns = list(dict.fromkeys(list(columns) + ([index] if index else [])))
+        gdf = gpd.read_file(path, columns=columns)
+        if index:
+            gdf = gdf.set_index(index)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{parquet}.{os.getpid()}.tmp"
+        gdf.to_parquet(tmp)
+        os.replace(tmp, parquet)
+
+    _stores[key] = gdf
+    while len(_stores) > max_entries:
+        _stores.popitem(last=False)
+    return gdf
+
+
+def join_indexed(gdf, df, join_column=None):
+    """Left-joins a dataframe to indexed features by matching the dataframe index to the feature index.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The features, indexed by the join key (see read_vector_cached).
+        df (pandas.DataFrame): The dataframe, indexed by the same key.
+        join_column (str, optional): A column to add holding the key of each feature. Defaults to None.
+
+    Returns:
+        geopandas.GeoDataFrame: The features with the dataframe columns.
+    """
+    import pandas as pd
+
+    overlap = gdf.columns.intersection(df.columns)
+    if join_column is not None and join_column in df.columns:
+        overlap = overlap.append(pd.Index([join_column]))
+    if len(overlap):
+        raise ValueError(f"Columns overlap: {', '.join(map(str, overlap))}.")
+
+    left = gdf if join_column is None else gdf.assign(**{join_column: gdf.index})
+    if not df.index.is_unique:
+        return left.join(df)
+    # A hash lookup of each feature key; the geometry column is not copied.
+    return pd.concat([left, df.reindex(gdf.index)], axis=1)
+
+
+# The partial statistics each aggregate is computed from, and how partials combine.
+AGGREGATES = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "mean": ["sum", "count"],
+    "min": ["min"],
+    "max": ["max"],
+}
+COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def _aggregate_plan(aggs):
+    """Normalizes aggregates to (column, function) pairs, with quantiles as floats."""
+    if isinstance(aggs, dict):
+        aggs = [(c, f) for c, funcs in aggs.items() for f in (funcs if isinstance(funcs, (list, tuple)) else [funcs])]
+    plan = []
+    for column, func in aggs:
+        if func == "median":
+            func = 0.5
+        if not (func in AGGREGATES or (isinstance(func, float) and 0 <= func <= 1)):
+            raise ValueError(f"Aggregate '{func}' is not supported. Use {', '.join(AGGREGATES)}, 'median' or a quantile.")
+        plan.append((column, func))
+    return plan
+
+
+def _aggregate_name(column, func):
+    return f"{column}_{func}" if isinstance(func, str) else f"{column}_q{func * 100:g}"
+
+
+def _compress_sketch(sketch, size):
+    """Compresses weighted value samples to at most size points per (group, column).
+
+    Values are bucketed by their cumulative weight within the group and each
+    bucket is replaced by its weighted mean, so merging and compressing
+    sketches keeps the quantiles within about 1/size of the exact ones.
+    """
+    import numpy as np
+
+    keys = list(sketch.columns[:-2])
+    sketch = sketch.sort_values(keys + ["value"], kind="stable")
+    groups = sketch.groupby(keys, sort=False, observed=True)["weight"]
+    center = groups.cumsum() - sketch["weight"] / 2
+    bucket = np.floor(center / groups.transform("sum") * size)
+    sketch = sketch.assign(value=sketch["value"] * sketch["weight"], bucket=bucket)
+    out = sketch.groupby(keys + ["bucket"], sort=False, observed=True)[["value", "weight"]].sum()
+    out["value"] /= out["weight"]
+    return out.reset_index().drop(columns="bucket")
+
+
+def _partial_aggregate(df, by, plan, sketch_size):
+    """Computes the mergeable partial aggregates of a chunk."""
+    import pandas as pd
+
+    stats = {}
+    for column, func in plan:
+        for stat in AGGREGATES.get(func, []):
+            stats[f"{column}|{stat}"] = (column, stat)
+    grouped = df.groupby(by, sort=False, observed=True)
+    partial = grouped.agg(**stats) if stats else None
+
+    sketches = []
+    for column in dict.fromkeys(c for c, f in plan if not isinstance(f, str)):
+        values = df[by + [column]].dropna().rename(columns={column: "value"})
+        values.insert(len(by), "column", column)
+        values["weight"] = 1.0
+        sketches.append(_compress_sketch(values, sketch_size))
+    sketch = pd.concat(sketches, ignore_index=True) if sketches else None
+    return partial, sketch
+
+
+def _merge_partials(a, b, by, sketch_size):
+    """Combines two partial aggregates."""
+    import pandas as pd
+
+    if a is None:
+        return b
+    partial = None
+    if a[0] is not None:
+        both = pd.concat([a[0], b[0]])
+        combine = {name: COMBINE[name.rsplit("|", 1)[1]] for name in both.columns}
+        partial = both.groupby(level=by, sort=False, observed=True).agg(combine)
+    sketch = None
+    if a[1] is not None:
+        sketch = _compress_sketch(pd.concat([a[1], b[1]], ignore_index=True), sketch_size)
+    return partial, sketch
+
+
+def _sketch_quantile(sketch, by, column, q):
+    """Interpolates a quantile of each group from a sketch."""
+    import numpy as np
+    import pandas as pd
+
+    values = sketch[sketch["column"] == column]
+    result = {}
+    for key, group in values.groupby(by, sort=False, observed=True):
+        group = group.sort_values("value")
+        w = group["weight"].to_numpy()
+        center = np.cumsum(w) - w / 2
+        target = center[0] + q * (center[-1] - center[0])
+        result[key[0] if len(by) == 1 else key] = np.interp(target, center, group["value"].to_numpy())
+    return pd.Series(result, dtype="float64")
+
+
+def _read_chunk(task, columns, dtypes):
+    """Reads one chunk of a source: a CSV byte range or a Parquet row group."""
+    import io
+
+    import pandas as pd
+
+    kind, path, *where = task
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.ParquetFile(path).read_row_group(where[0], columns=columns)
+        return table.to_pandas()
+
+    start, end, names = where
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if not data.strip():
+        return pd.DataFrame(columns=columns).astype(dtypes)
+    # Every column is read as text so a value unlike the sampled rows cannot fail the read;
+    # numeric columns are then coerced, turning unparsable values into missing ones.
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=columns, dtype="str")
+    for column, dtype in dtypes.items():
+        if dtype == "float64":
+            chunk[column] = pd.to_numeric(chunk[column], errors="coerce").astype("float64")
+    return chunk
+
+
+def _aggregate_task(task, columns, dtypes, by, plan, sketch_size):
+    return _partial_aggregate(_read_chunk(task, columns, dtypes), by, plan, sketch_size)
+
+
+def _aggregate_tasks(source, columns, chunk_bytes):
+    """Splits a CSV or Parquet file into chunks and infers the CSV column types.
+
+    The sampled rows only decide whether a column is numeric: numeric columns
+    are read as float64 and the rest as text, types that hold any later value.
+    The integer columns are returned too, so integer group keys can be restored.
+    """
+    import pandas as pd
+
+    if source.lower().endswith((".parquet", ".geoparquet")):
+        import pyarrow.parquet as pq
+
+        return [("parquet", source, i) for i in range(pq.ParquetFile(source).num_row_groups)], None, []
+
+    from .chunks import csv_ranges
+
+    sample = pd.read_csv(source, nrows=10000)
+    names = list(sample.columns)
+    dtypes = {}
+    for column in columns:
+        values = sample[column]
+        numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        dtypes[column] = "float64" if numeric and values.notna().any() else "str"
+    integers = [c for c in columns if pd.api.types.is_integer_dtype(sample[c])]
+    tasks = [("csv", source, start, end, names) for start, end in csv_ranges(source, chunk_bytes)]
+    return tasks, dtypes, integers
+
+
+def aggregate(source, by, aggs, chunk_bytes=64 << 20, chunk_rows=1_000_000, processes=None, sketch_size=256):
+    """Computes many grouped aggregates in one pass over a table, chunk by chunk.
+
+    Each chunk is reduced to mergeable partial statistics per group (sums,
+    non-null counts, minimums, maximums and, for files, compressed quantile
+    sketches) that are combined as the chunks complete, so memory depends on the
+    number of groups rather than the number of rows. CSV byte ranges and
+    Parquet row groups can be reduced in a process pool.
+
+    Example:
+        aggregate("census.csv", "County", {"Population": ["sum", "mean"], "Income": ["median", 0.9]})
+
+    Args:
+        source (pandas.DataFrame | str): The table: a DataFrame, or a CSV or Parquet file. Use
+            excel_cache_file to aggregate an Excel sheet from its Parquet copy.
+        by (str | list): The group column(s).
+        aggs (dict | list): The aggregates, as {column: function(s)} or (column, function) pairs. Functions are
+            "sum", "count", "mean", "min", "max", "median" or a quantile in [0, 1].
+        chunk_bytes (int, optional): The size of each CSV chunk in bytes. Defaults to 64 MiB.
+        chunk_rows (int, optional): The number of rows per chunk of a DataFrame. Defaults to 1,000,000.
+        processes (int, optional): The number of worker processes for file sources. Defaults to None (no pool).
+        sketch_size (int, optional): The number of points kept per group for the quantiles of file sources;
+            the quantile error is about 1/sketch_size of the group's values. Quantiles of DataFrames are
+            exact. Defaults to 256.
+
+    Returns:
+        pandas.DataFrame: One row per group and one "<column>_<function>" column per aggregate
+            (quantiles are named like "<column>_q90").
+    """
+    import pandas as pd
+
+    by = [by] if isinstance(by, str) else list(by)
+    plan = _aggregate_plan(aggs)
+    columns = list(dict.fromkeys(by + [c for c, _ in plan]))
+
+    merged = None
+    exact = {}
+    integers = []
+    if isinstance(source, pd.DataFrame):
+        # The rows are in memory, so quantiles are computed exactly instead of from sketches.
+        grouped = source.groupby(by, sort=False, observed=True)
+        exact = {(c, f): grouped[c].quantile(f) for c, f in plan if not isinstance(f, str)}
+        stats = [(c, f) for c, f in plan if isinstance(f, str)]
+        for start in range(0, max(len(source), 1), chunk_rows) if stats else []:
+            chunk = source.iloc[start:start + chunk_rows][columns]
+            merged = _merge_partials(merged, _partial_aggregate(chunk, by, stats, sketch_size), by, sketch_size)
+    else:
+        from .chunks import imap_bounded
+
+        tasks, dtypes, integers = _aggregate_tasks(source, columns, chunk_bytes)
+        args = ((task, columns, dtypes, by, plan, sketch_size) for task in tasks)
+        for partial in imap_bounded(_aggregate_task, args, processes):
+            merged = _merge_partials(merged, partial, by, sketch_size)
+
+    partial, sketch = merged if merged is not None else (None, None)
+    result = {}
+    for column, func in plan:
+        name = _aggregate_name(column, func)
+        if (column, func) in exact:
+            result[name] = exact[column, func]
+        elif func == "mean":
+            result[name] = partial[f"{column}|sum"] / partial[f"{column}|count"]
+        elif isinstance(func, str):
+            result[name] = partial[f"{column}|{func}"]
+        else:
+            result[name] = _sketch_quantile(sketch, by, column, func)
+
+    out = pd.DataFrame(result)
+    if len(by) == 1:
+        out.index.name = by[0]
+    else:
+        out.index.names = by
+    # Integer keys were read as floats; restore them when every key is still whole.
+    keys = out.index.to_frame(index=False)
+    for key in [k for k in by if k in integers]:
+        if len(keys) and (keys[key] % 1 == 0).all():
+            keys[key] = keys[key].astype("int64")
+    out.index = pd.MultiIndex.from_frame(keys) if len(by) > 1 else pd.Index(keys[by[0]], name=by[0])
+    return out.sort_index()
+
+
+class TextPipeline:
+    """A reusable sequence of text cleaning steps applied to the distinct values of columns.
+
+    The steps are declared once and run together over the unique values of
+    each column (the categories of a categorical column), and the results
+    are mapped back to the rows through the value codes. Repeated values,
+    such as city and county names, are therefore only processed once.
+
+    Example:
+        pipeline = TextPipeline().strip_suffix(" city").strip().copy_index(["Name"])
+        pipeline.apply(df, columns=["City"], inplace=True)
+    """
+
+    def __init__(self) -> None:
+        self.steps = []
+        self.index_columns = []
+
+    def remove(self, phrase):
+        """Adds a step removing every occurrence of a phrase (not a regular expression).
+
+        Args:
+            phrase (str): The text to remove.
+
+        Returns:
+            TextPipeline: The pipeline.
+        """
+        self.steps.append(("replace", (phrase, ""), {"regex": False}))
+        return self
+
+    def strip_suffix(self, suffix):
+        """Adds a step removing a suffix from the end of the values.
+
+        Args:
+            suffix (str): The suffix.
+
+        Returns:
+            TextPipeline: The pipeline.
+        """
+        self.steps.append(("removesuffix", (suffix,), {}))
+        return self
+
+    def strip(self):
+        """Adds a step removing leading and trailing whitespace.
+
+        Returns:
+            TextPipeline: The pipeline.
+        """
+        self.steps.append(("strip", (), {}))
+        return self
+
+    def split(self, sep=", "):
+        """Adds a step splitting the values into lists. It must be the last text step.
+
+        Args:
+            sep (str, optional): The separator (not a regular expression). Defaults to ", ".
+
+        Returns:
+            TextPipeline: The pipeline.
+        """
+        self.steps.append(("split", (sep,), {"regex": False}))
+        return self
+
+    def copy_index(self, columns):
+        """Adds a step copying the index of a DataFrame to columns.
+
+        Args:
+            columns (list): The columns to create or overwrite.
+
+        Returns:
+            TextPipeline: The pipeline.
+        """
+        self.index_columns.extend(columns)
+        return self
+
+    def transform(self, values):
+        """Runs the text steps over values.
+
+        Args:
+            values (pandas.Series): The values, typically distinct ones.
+
+        Returns:
+            pandas.Series: The transformed values.
+        """
+        for method, args, kwargs in self.steps:
+            values = getattr(values.str, method)(*args, **kwargs)
+        return values
+
+    def apply_series(self, series):
+        """Runs the text steps over a Series, processing each distinct value once.
+
+        Args:
+            series (pandas.Series): The values.
+
+        Returns:
+            pandas.Series: The transformed values. Categorical input stays categorical unless it is split.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not self.steps:
+            return series
+        splits = self.steps[-1][0] == "split"
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), pd.Series(series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series)
+            uniques = pd.Series(uniques, dtype=series.dtype)
+
+        done = self.transform(uniques.astype("object") if splits else uniques)
+        if isinstance(series.dtype, pd.CategoricalDtype) and not splits:
+            new_codes, categories = pd.factorize(done)
+            if len(new_codes):
+                codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)], -1)
+            values = pd.Categorical.from_codes(codes, categories=categories)
+            return pd.Series(values, index=series.index, name=series.name)
+
+        values = done.array.take(codes, allow_fill=True)
+        if splits:
+            # Each row gets its own list, so changing one row's list leaves the others alone.
+            copies = np.empty(len(values), dtype="object")
+            copies[:] = [list(v) if isinstance(v, list) else v for v in values]
+            values = copies
+        return pd.Series(values, index=series.index, name=series.name, dtype=done.dtype, copy=False)
+
+    def apply(self, data, columns=None, inplace=False):
+        """Runs the pipeline over a Series or the columns of a DataFrame.
+
+        Args:
+            data (pandas.Series | pandas.DataFrame): The data.
+            columns (list, optional): The DataFrame columns to transform. Defaults to None (none).
+            inplace (bool, optional): Whether to replace the DataFrame columns in place instead of copying
+                the frame. Defaults to False.
+
+        Returns:
+            pandas.Series | pandas.DataFrame: The transformed data.
+        """
+        import pandas as pd
+
+        if isinstance(data, pd.Series):
+            return self.apply_series(data)
+
+        df = data if inplace else data.copy(deep=False)
+        for column in columns or []:
+            df[column] = self.apply_series(df[column])
+        for column in self.index_columns:
+            df[column] = df.index
+        return df
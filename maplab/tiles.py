@@ -0,0 +1,571 @@
+"""Local tile serving and caching helpers."""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+WEB_MERCATOR_HALF = 20037508.342789244
+
+
+def default_cache_dir(*parts):
+    """Returns a directory under the maplab cache directory (~/.cache/maplab or $MAPLAB_CACHE_DIR).
+
+    Args:
+        parts (str): Subdirectories to append.
+
+    Returns:
+        str: The directory path.
+    """
+    root = os.environ.get("MAPLAB_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "maplab")
+    return os.path.join(root, *parts)
+
+
+def content_type(data):
+    """Guesses the content type of an encoded tile from its first bytes.
+
+    Args:
+        data (bytes): The tile data.
+
+    Returns:
+        str: The MIME type.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def mercator_tile_bounds(z, x, y):
+    """Returns the bounds of an XYZ tile in EPSG:3857 meters.
+
+    Args:
+        z (int): The tile zoom.
+        x (int): The tile column.
+        y (int): The tile row.
+
+    Returns:
+        tuple: The bounds as (minx, miny, maxx, maxy).
+    """
+    size = 2 * WEB_MERCATOR_HALF / 2 ** z
+    minx = -WEB_MERCATOR_HALF + x * size
+    maxy = WEB_MERCATOR_HALF - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def wms_tile_url(url, layers, format="image/png", transparent=True, styles="", version="1.1.1", tile_size=256):
+    """Builds an XYZ-style URL template for a WMS GetMap request in EPSG:3857.
+
+    The template contains a {bbox} placeholder that TileProxy fills with the
+    bounds of each tile, so WMS layers can go through the tile cache.
+
+    Args:
+        url (str): The URL of the WMS service.
+        layers (str): The WMS layers.
+        format (str, optional): The image format. Defaults to 'image/png'.
+        transparent (bool, optional): Whether the image is transparent. Defaults to True.
+        styles (str, optional): The WMS styles. Defaults to ''.
+        version (str, optional): The WMS version. Defaults to '1.1.1'.
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+
+    Returns:
+        str: The URL template.
+    """
+    from urllib.parse import urlencode
+
+    srs = "crs" if version.startswith("1.3") else "srs"
+    params = urlencode({
+        "service": "WMS", "request": "GetMap", "version": version, "layers": layers, "styles": styles,
+        "format": format, "transparent": str(transparent).lower(), srs: "EPSG:3857",
+        "width": tile_size, "height": tile_size,
+    })
+    sep = "" if url.endswith(("?", "&")) else ("&" if "?" in url else "?")
+    return f"{url}{sep}{params}&bbox={{bbox}}"
+
+
+def neighbors(z, x, y, max_zoom=22):
+    """Returns the tiles around a tile: its ring at the same zoom, its parent and its children.
+
+    Args:
+        z (int): The tile zoom.
+        x (int): The tile column.
+        y (int): The tile row.
+        max_zoom (int, optional): The highest zoom to include. Defaults to 22.
+
+    Returns:
+        list: The (z, x, y) tuples.
+    """
+    n = 2 ** z
+    tiles = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            tile = (z, (x + dx) % n, y + dy)
+            if 0 <= y + dy < n and tile != (z, x, y) and tile not in tiles:
+                tiles.append(tile)
+    if z > 0:
+        tiles.append((z - 1, x // 2, y // 2))
+    if z < max_zoom:
+        tiles.extend((z + 1, 2 * x + dx, 2 * y + dy) for dx in (0, 1) for dy in (0, 1))
+    return tiles
+
+
+class LRUCache:
+    """A thread-safe, least recently used in-memory cache bounded by the total size of its values.
+
+    Args:
+        max_bytes (int, optional): The maximum total size of the cached values. Defaults to 64 MiB.
+        sizeof (callable, optional): Returns the size of a value. Defaults to len.
+    """
+
+    def __init__(self, max_bytes=64 << 20, sizeof=len) -> None:
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Returns a cached value and marks it as recently used.
+
+        Args:
+            key (hashable): The key.
+            default (object, optional): The value returned on a miss. Defaults to None.
+
+        Returns:
+            object: The cached value or the default.
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.stats["misses"] += 1
+                return default
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self.entries[key][0]
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used values if the cache is full.
+
+        Args:
+            key (hashable): The key.
+            value (object): The value.
+
+        Returns:
+            list: The (key, value) pairs that were evicted.
+        """
+        size = self.sizeof(value)
+        evicted = []
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old, (old_value, old_size) = self.entries.popitem(last=False)
+                self.size -= old_size
+                self.stats["evictions"] += 1
+                evicted.append((old, old_value))
+        return evicted
+
+    def clear(self):
+        """Removes every value from the cache."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class TileCache:
+    """A size-bounded, least recently used tile cache on disk.
+
+    Tiles are stored as ``<directory>/<source>/<z>/<x>/<y>``. The access order
+    is kept in the file modification times, so the LRU order survives
+    restarts and the cache can be shared between sessions.
+
+    Args:
+        directory (str, optional): The cache directory. Defaults to None (~/.cache/maplab/tiles).
+        max_bytes (int, optional): The maximum total size of the cached tiles. Defaults to 1 GiB.
+    """
+
+    def __init__(self, directory=None, max_bytes=1 << 30) -> None:
+        self.directory = directory or default_cache_dir("tiles")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    found.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(found):
+            self.entries[path] = size
+            self.size += size
+        with self.lock:
+            self._evict()
+
+    def path(self, source, z, x, y):
+        return os.path.join(self.directory, source, str(z), str(x), str(y))
+
+    def __contains__(self, key):
+        return self.path(*key) in self.entries
+
+    def get(self, source, z, x, y):
+        """Returns a cached tile and marks it as recently used.
+
+        Args:
+            source (str): The tile source name.
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The tile data, or None if the tile is not cached.
+        """
+        path = self.path(source, z, x, y)
+        with self.lock:
+            if path not in self.entries:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(path)
+            self.stats["hits"] += 1
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self.lock:
+                self.size -= self.entries.pop(path, 0)
+            return None
+
+    def put(self, source, z, x, y, data):
+        """Stores a tile, evicting the least recently used tiles if the cache is full.
+
+        Args:
+            source (str): The tile source name.
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+            data (bytes): The tile data.
+        """
+        path = self.path(source, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self.lock:
+            self.size += len(data) - self.entries.pop(path, 0)
+            self.entries[path] = len(data)
+            self.stats["writes"] += 1
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.entries:
+            path, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class TileProxy:
+    """A tile source that fetches tiles from an upstream XYZ URL through a TileCache.
+
+    Args:
+        url (str): The upstream URL template with {z}, {x} and {y} (and optionally {s}), or with {bbox}
+            for WMS GetMap requests in EPSG:3857 (see wms_tile_url).
+        cache (TileCache): The cache to read from and write to.
+        offline (bool, optional): Whether to only serve cached tiles. Defaults to False.
+        prefetch (bool, optional): Whether to fetch the neighbors of each tile fetched from
+            upstream in the background. Defaults to True.
+        max_zoom (int, optional): The highest zoom to prefetch. Defaults to 22.
+    """
+
+    _executor = None
+    _client = None
+
+    def __init__(self, url, cache, offline=False, prefetch=True, max_zoom=22) -> None:
+        self.url = url.replace("{s}", "a").replace("{r}", "")
+        self.name = hashlib.sha1(self.url.encode()).hexdigest()[:12]
+        self.cache = cache
+        self.offline = offline
+        self.prefetch = prefetch
+        self.max_zoom = max_zoom
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.stats = {"fetched": 0, "prefetched": 0, "errors": 0}
+
+    @classmethod
+    def client(cls):
+        import httpx
+
+        if cls._client is None:
+            cls._client = httpx.Client(timeout=30, follow_redirects=True, headers={"User-Agent": "maplab"})
+        return cls._client
+
+    def fetch(self, z, x, y):
+        """Downloads a tile from the upstream server and caches it.
+
+        Args:
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The tile data, or None if the request failed.
+        """
+        try:
+            url = self.url.replace("{z}", str(z)).replace("{x}", str(x)).replace("{y}", str(y))
+            if "{bbox}" in url:
+                url = url.replace("{bbox}", ",".join(f"{v:.6f}" for v in mercator_tile_bounds(z, x, y)))
+            r = self.client().get(url)
+            r.raise_for_status()
+        except Exception:
+            self.stats["errors"] += 1
+            return None
+        self.cache.put(self.name, z, x, y, r.content)
+        self.stats["fetched"] += 1
+        return r.content
+
+    def _prefetch(self, z, x, y):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if TileProxy._executor is None:
+            TileProxy._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="maplab-prefetch")
+
+        def run(tile):
+            try:
+                if (self.name, *tile) not in self.cache and self.fetch(*tile) is not None:
+                    self.stats["prefetched"] += 1
+            finally:
+                with self.lock:
+                    self.pending.discard(tile)
+
+        for tile in neighbors(z, x, y, self.max_zoom):
+            with self.lock:
+                if tile in self.pending or (self.name, *tile) in self.cache:
+                    continue
+                self.pending.add(tile)
+            TileProxy._executor.submit(run, tile)
+
+    def __call__(self, z, x, y):
+        data = self.cache.get(self.name, z, x, y)
+        if data is not None or self.offline:
+            return data
+        data = self.fetch(z, x, y)
+        # Neighbors are only queued on a miss: a cache hit means this area was already visited.
+        if data is not None and self.prefetch:
+            self._prefetch(z, x, y)
+        return data
+
+
+class TileServer:
+    """A small localhost HTTP server for XYZ tiles.
+
+    Tile sources are callables taking (z, x, y) and returning the encoded
+    tile as bytes (or None when there is no tile). Each source is served at
+    ``http://<host>:<port>/tiles/<name>/{z}/{x}/{y}``. JSON endpoints are
+    callables taking the query parameters as a dict, served at
+    ``http://<host>:<port>/api/<name>``. The server runs in a
+    daemon thread, so the map must be displayed by a browser on the same
+    machine as the kernel.
+
+    Args:
+        host (str, optional): The interface to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on. Defaults to 0 (any free port).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0) -> None:
+        self.host = host
+        self.port = port
+        self.sources = {}
+        self.endpoints = {}
+        self.httpd = None
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "not_found": 0}
+
+    def add_source(self, name, source):
+        """Registers a tile source and returns its URL template.
+
+        Args:
+            name (str): The source name used in the URL.
+            source (callable): A function of (z, x, y) returning the tile bytes or None.
+
+        Returns:
+            str: The XYZ URL template of the source.
+        """
+        self.sources[name] = source
+        self.start()
+        return f"http://{self.host}:{self.port}/tiles/{name}/{{z}}/{{x}}/{{y}}"
+
+    def add_endpoint(self, name, fn):
+        """Registers a JSON endpoint and returns its URL.
+
+        Args:
+            name (str): The endpoint name used in the URL.
+            fn (callable): A function of the query parameters (a dict of str) returning a JSON-serializable value.
+
+        Returns:
+            str: The URL of the endpoint.
+        """
+        self.endpoints[name] = fn
+        self.start()
+        return f"http://{self.host}:{self.port}/api/{name}"
+
+    def api(self, name, query):
+        fn = self.endpoints.get(name)
+        self.stats["requests"] += 1
+        if fn is None:
+            self.stats["not_found"] += 1
+            return None
+        return json.dumps(fn(query)).encode()
+
+    def remove_source(self, name):
+        """Unregisters a tile source.
+
+        Args:
+            name (str): The source name.
+        """
+        self.sources.pop(name, None)
+
+    def tile(self, name, z, x, y):
+        source = self.sources.get(name)
+        self.stats["requests"] += 1
+        data = source(z, x, y) if source is not None else None
+        if data is None:
+            self.stats["not_found"] += 1
+        return data
+
+    def start(self):
+        """Starts the server thread if it is not running yet."""
+        with self.lock:
+            if self.httpd is None:
+                self._start()
+
+    def _start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qsl
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                parts = path.strip("/").split("/")
+                data = None
+                if len(parts) == 2 and parts[0] == "api":
+                    data = server.api(parts[1], dict(parse_qsl(query)))
+                    if data is not None:
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(data)))
+                        self.send_header("Access-Control-Allow-Origin", "*")
+                        self.end_headers()
+                        self.wfile.write(data)
+                        return
+                elif len(parts) == 5 and parts[0] == "tiles":
+                    try:
+                        z, x, y = int(parts[2]), int(parts[3]), int(parts[4].split(".")[0])
+                        data = server.tile(parts[1], z, x, y)
+                    except ValueError:
+                        data = None
+
+                if data is None:
+                    self.send_response(404)
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type(data))
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Cache-Control", "max-age=3600")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="maplab-tiles", daemon=True).start()
+
+    def stop(self):
+        """Stops the server."""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+_server = None
+_cache = None
+
+
+def get_tile_server():
+    """Returns the shared tile server, creating it on first use.
+
+    Returns:
+        TileServer: The tile server.
+    """
+    global _server
+    if _server is None:
+        _server = TileServer()
+    return _server
+
+
+def get_tile_cache(directory=None, max_bytes=1 << 30):
+    """Returns the shared on-disk tile cache, creating it on first use.
+
+    Args:
+        directory (str, optional): The cache directory. Defaults to None (~/.cache/maplab/tiles).
+        max_bytes (int, optional): The maximum total size of the cached tiles. Defaults to 1 GiB.
+
+    Returns:
+        TileCache: The tile cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = TileCache(directory, max_bytes)
+    return _cache
+
+
+def proxy_tile_url(url, offline=False, prefetch=True, cache=None, server=None):
+    """Routes an XYZ URL template through the local caching tile proxy.
+
+    Args:
+        url (str): The upstream URL template.
+        offline (bool, optional): Whether to only serve tiles that are already cached. Defaults to False.
+        prefetch (bool, optional): Whether to prefetch the neighbors of requested tiles. Defaults to True.
+        cache (TileCache, optional): The cache to use. Defaults to None (the shared cache).
+        server (TileServer, optional): The server to use. Defaults to None (the shared server).
+
+    Returns:
+        str: The local URL template.
+    """
+    server = server or get_tile_server()
+    proxy = TileProxy(url, cache or get_tile_cache(), offline=offline, prefetch=prefetch)
+    name = proxy.name + ("-offline" if offline else "")
+    if name not in server.sources:
+        server.add_source(name, proxy)
+    return server.add_source(name, server.sources[name])
@@ -0,0 +1,1000 @@
+"""Vector helpers shared by the map classes."""
+
+import math
+
+
+def pixel_size(zoom, tile_size=256):
+    """Returns the width of one screen pixel in degrees of longitude at a zoom level.
+
+    Args:
+        zoom (float): The web map zoom level.
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+
+    Returns:
+        float: The pixel size in degrees.
+    """
+    return 360.0 / (tile_size * 2 ** zoom)
+
+
+def zoom_precision(zoom):
+    """Returns the number of decimals needed to place coordinates within a tenth of a pixel.
+
+    Args:
+        zoom (float): The web map zoom level.
+
+    Returns:
+        int: The number of decimal places to keep.
+    """
+    return min(max(math.ceil(math.log10(10 / pixel_size(zoom))), 0), 15)
+
+
+def to_wgs84(gdf):
+    """Reprojects a GeoDataFrame to EPSG:4326 if it has another CRS.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+
+    Returns:
+        geopandas.GeoDataFrame: The GeoDataFrame in EPSG:4326.
+    """
+    if gdf.crs is not None and not gdf.crs.equals("EPSG:4326"):
+        gdf = gdf.to_crs("EPSG:4326")
+    return gdf
+
+
+def estimate_bounds(center, zoom, width=1024, height=512, tile_size=256):
+    """Estimates the map bounds before the frontend has reported them.
+
+    Args:
+        center (list): The map center as [lat, lon].
+        zoom (float): The map zoom level.
+        width (int, optional): The assumed map width in pixels. Defaults to 1024.
+        height (int, optional): The assumed map height in pixels. Defaults to 512.
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+
+    Returns:
+        tuple: The bounds as ((south, west), (north, east)).
+    """
+    lat, lon = center
+    size = pixel_size(zoom, tile_size)
+    dx, dy = width * size / 2, height * size / 2
+    return ((max(lat - dy, -90.0), max(lon - dx, -180.0)), (min(lat + dy, 90.0), min(lon + dx, 180.0)))
+
+
+def simplify_gdf(gdf, zoom, tolerance=1.0, precision=None):
+    """Simplifies the geometries of a GeoDataFrame for display at a zoom level.
+
+    Geometries are simplified with a tolerance of ``tolerance`` screen pixels
+    (preserving topology) and their coordinates are rounded to the precision
+    that is visible at that zoom.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame in EPSG:4326.
+        zoom (float): The web map zoom level.
+        tolerance (float, optional): The simplification tolerance in pixels. Defaults to 1.0.
+        precision (int, optional): The number of decimals to keep. Defaults to None (derived from the zoom).
+
+    Returns:
+        geopandas.GeoDataFrame: A shallow copy of the GeoDataFrame with simplified geometries.
+    """
+    import numpy as np
+    import shapely
+
+    if precision is None:
+        precision = zoom_precision(zoom)
+
+    geoms = gdf.geometry.values
+    if tolerance:
+        geoms = shapely.simplify(geoms, tolerance * pixel_size(zoom), preserve_topology=True)
+    geoms = shapely.transform(geoms, lambda coords: np.round(coords, precision))
+
+    out = gdf.copy(deep=False)
+    out[gdf.geometry.name] = geoms
+    return out
+
+
+def content_hash(gdf):
+    """Returns a hash of the contents of a GeoDataFrame: its geometries, attributes, index and columns.
+
+    Geometries are hashed through their WKB and attributes through pandas'
+    vectorized row hashes, which is much faster than serializing them.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+
+    Returns:
+        str: The hex digest.
+    """
+    import hashlib
+    import json
+
+    import numpy as np
+    import pandas as pd
+    import shapely
+
+    wkb = shapely.to_wkb(gdf.geometry.values)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(json.dumps([gdf.geometry.name, [[str(c), str(t)] for c, t in gdf.dtypes.items()]]).encode())
+    h.update(np.fromiter((0 if b is None else len(b) for b in wkb), dtype=np.int64, count=len(wkb)).tobytes())
+    h.update(b"".join(b for b in wkb if b is not None))
+
+    attributes = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    try:
+        hashes = pd.util.hash_pandas_object(attributes, index=True)
+    except TypeError:
+        # Unhashable values, e.g. lists, are hashed through their text.
+        hashes = pd.util.hash_pandas_object(attributes.astype(str), index=True)
+    h.update(hashes.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def geojson_nbytes(gdf):
+    """Estimates the memory taken by the GeoJSON dict of a GeoDataFrame.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+
+    Returns:
+        int: The approximate size in bytes (about 112 bytes per coordinate pair and 100 per property).
+    """
+    import shapely
+
+    coords = int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+    return coords * 112 + len(gdf) * (len(gdf.columns) * 100 + 400)
+
+
+class GeoJSONCache:
+    """A cache of GeoDataFrame GeoJSON payloads, keyed by the content hash of the data.
+
+    Serializing with __geo_interface__ builds a Python object for every
+    coordinate and is the most expensive step of adding vector data to a map.
+    Payloads are kept in a least recently used cache bounded by their
+    estimated size, so adding the same data again (re-running a cell, or
+    showing it on both map backends) skips it. With spill=True, payloads
+    evicted from memory are pickled to disk, which loads several times
+    faster than serializing again, and disk entries survive kernel restarts.
+
+    The returned payloads are shared between callers and must not be modified in place.
+
+    Args:
+        max_bytes (int, optional): The maximum estimated size of the payloads kept in memory. Defaults to 256 MiB.
+        spill (bool, optional): Whether to keep evicted payloads on disk. Defaults to False.
+        directory (str, optional): The spill directory. Defaults to None (~/.cache/maplab/geojson).
+        max_disk_bytes (int, optional): The maximum total size of the spilled payloads. Defaults to 1 GiB.
+    """
+
+    def __init__(self, max_bytes=256 << 20, spill=False, directory=None, max_disk_bytes=1 << 30) -> None:
+        from .tiles import LRUCache, default_cache_dir
+
+        self.memory = LRUCache(max_bytes, sizeof=lambda entry: entry[1])
+        self.spill = spill
+        self.directory = directory or default_cache_dir("geojson")
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "spilled": 0}
+
+    def path(self, key):
+        import os
+
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, gdf):
+        """Returns the GeoJSON FeatureCollection of a GeoDataFrame, serializing it on first use.
+
+        Args:
+            gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+
+        Returns:
+            dict: The GeoJSON, as gdf.__geo_interface__ would return it.
+        """
+        key = content_hash(gdf)
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        data = self._load(key) if self.spill else None
+        if data is not None:
+            self.stats["disk_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            data = gdf.__geo_interface__
+        self._put(key, data, geojson_nbytes(gdf))
+        return data
+
+    def _put(self, key, data, nbytes):
+        for old, (old_data, _) in self.memory.put(key, (data, nbytes)):
+            if self.spill:
+                self._dump(old, old_data)
+
+    def _load(self, key):
+        import os
+        import pickle
+
+        try:
+            with open(self.path(key), "rb") as f:
+                data = pickle.load(f)
+            os.utime(self.path(key))
+            return data
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _dump(self, key, data):
+        import os
+        import pickle
+
+        path = self.path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.stats["spilled"] += 1
+
+        # Keep the spill directory under its limit, removing the least recently used payloads first.
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".pickle")]
+        files = sorted((os.stat(p).st_mtime, os.path.getsize(p), p) for p in files)
+        total = sum(size for _, size, _ in files)
+        for _, size, old in files:
+            if total <= self.max_disk_bytes or old == path:
+                break
+            os.remove(old)
+            total -= size
+
+    def clear(self):
+        """Removes every payload from memory (spilled payloads stay on disk)."""
+        self.memory.clear()
+
+
+_geojson_cache = None
+
+
+def get_geojson_cache(max_bytes=256 << 20, spill=False, directory=None):
+    """Returns the shared GeoJSON cache, creating it on first use.
+
+    Args:
+        max_bytes (int, optional): The maximum estimated size of the payloads kept in memory. Defaults to 256 MiB.
+        spill (bool, optional): Whether to keep evicted payloads on disk. Defaults to False.
+        directory (str, optional): The spill directory. Defaults to None (~/.cache/maplab/geojson).
+
+    Returns:
+        GeoJSONCache: The GeoJSON cache.
+    """
+    global _geojson_cache
+    if _geojson_cache is None:
+        _geojson_cache = GeoJSONCache(max_bytes, spill=spill, directory=directory)
+    return _geojson_cache
+
+
+def to_geojson(gdf, cache=True):
+    """Returns the GeoJSON FeatureCollection of a GeoDataFrame through the shared GeoJSON cache.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+        cache (bool, optional): Whether to use the cache. Defaults to True.
+
+    Returns:
+        dict: The GeoJSON. It may be shared with other layers and must not be modified in place.
+    """
+    if not cache:
+        return gdf.__geo_interface__
+    return get_geojson_cache().get(gdf)
+
+
+class LevelOfDetail:
+    """Caches zoom-dependent simplifications of a GeoDataFrame.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame to display.
+        tolerance (float, optional): The simplification tolerance in pixels. Defaults to 1.0.
+        max_zoom (int, optional): The zoom above which the full-detail band is used. Defaults to 18.
+    """
+
+    def __init__(self, gdf, tolerance=1.0, max_zoom=18) -> None:
+        self.gdf = to_wgs84(gdf)
+        self.tolerance = tolerance
+        self.max_zoom = max_zoom
+        self.cache = {}
+
+    def band(self, zoom):
+        """Returns the zoom band used for a (possibly fractional) zoom level.
+
+        Args:
+            zoom (float): The map zoom level.
+
+        Returns:
+            int: The zoom band.
+        """
+        return min(max(int(round(zoom)), 0), self.max_zoom)
+
+    def geojson(self, zoom):
+        """Returns the GeoJSON for a zoom level, simplifying it on first use.
+
+        Args:
+            zoom (float): The map zoom level.
+
+        Returns:
+            dict: The GeoJSON FeatureCollection.
+        """
+        band = self.band(zoom)
+        if band not in self.cache:
+            simplified = simplify_gdf(self.gdf, band, tolerance=self.tolerance)
+            self.cache[band] = to_geojson(simplified)
+        return self.cache[band]
+
+    def link(self, m, layer):
+        """Swaps the data of a GeoJSON layer whenever the map zoom band changes.
+
+        Args:
+            m (ipyleaflet.Map): The map to observe.
+            layer (ipyleaflet.GeoJSON): The layer to update.
+        """
+
+        def on_zoom(change):
+            if self.band(change["new"]) != self.band(change["old"]):
+                layer.data = self.geojson(change["new"])
+
+        m.observe(on_zoom, names="zoom")
+        self.unlink = lambda: m.unobserve(on_zoom, names="zoom")
+
+
+class ViewportCuller:
+    """Displays only the parts of a GeoDataFrame that are near the map viewport.
+
+    Features are bucketed into grid cells by the center of their bounding box,
+    and an STRtree over the cell extents selects the cells that intersect the
+    padded viewport. Each cell is a GeoJSON layer inside a LayerGroup, so
+    panning only sends the cells that come into view and drops the ones that
+    leave it. Cell layers are kept in an LRU so revisiting an area does not
+    resend its features.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame to display.
+        name (str, optional): The name of the layer group. Defaults to "GeoDataFrame".
+        cell_size (float, optional): The grid cell size in degrees. Defaults to None (1/32 of the data extent).
+        padding (float, optional): The fraction of the viewport size to add on each side. Defaults to 0.25.
+        max_cells (int, optional): The number of cell layers to keep alive. Defaults to 256.
+        kwargs: Keyword arguments to pass to each cell GeoJSON layer.
+    """
+
+    def __init__(self, gdf, name="GeoDataFrame", cell_size=None, padding=0.25, max_cells=256, **kwargs) -> None:
+        from collections import OrderedDict
+
+        import ipyleaflet
+        import numpy as np
+        import shapely
+
+        self.gdf = to_wgs84(gdf)
+        self.padding = padding
+        self.max_cells = max_cells
+        self.kwargs = kwargs
+        self.layer = ipyleaflet.LayerGroup(name=name)
+        self.cells = OrderedDict()
+        self.visible = set()
+        self.stats = {"updates": 0, "cells_added": 0, "cells_removed": 0, "features_sent": 0}
+
+        bounds = shapely.bounds(self.gdf.geometry.values)
+        valid = ~np.isnan(bounds).any(axis=1)
+        if not valid.any():
+            # Nothing to show: no cells, and a tree that never matches.
+            self.cell_size = cell_size or 1.0
+            self.members = []
+            self.tree = shapely.STRtree([])
+            return
+
+        minx, miny = np.nanmin(bounds[:, 0]), np.nanmin(bounds[:, 1])
+        if cell_size is None:
+            extent = max(np.nanmax(bounds[:, 2]) - minx, np.nanmax(bounds[:, 3]) - miny)
+            cell_size = extent / 32 or 1.0
+        self.cell_size = cell_size
+
+        cx = (bounds[:, 0] + bounds[:, 2]) / 2
+        cy = (bounds[:, 1] + bounds[:, 3]) / 2
+        col = np.floor((np.where(valid, cx, minx) - minx) / cell_size).astype(np.int64)
+        row = np.floor((np.where(valid, cy, miny) - miny) / cell_size).astype(np.int64)
+        keys = row * (col.max() + 1) + col
+
+        # Sort features by cell so each cell is a contiguous slice.
+        order = np.argsort(keys[valid], kind="stable")
+        rows = np.flatnonzero(valid)[order]
+        keys = keys[rows]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.members = np.split(rows, starts[1:])
+
+        b = bounds[rows]
+        extents = np.column_stack([
+            np.minimum.reduceat(b[:, 0], starts),
+            np.minimum.reduceat(b[:, 1], starts),
+            np.maximum.reduceat(b[:, 2], starts),
+            np.maximum.reduceat(b[:, 3], starts),
+        ]) if len(rows) else np.empty((0, 4))
+        self.tree = shapely.STRtree(shapely.box(*extents.T))
+
+    def query(self, bounds):
+        """Returns the cells that intersect the padded bounds.
+
+        Args:
+            bounds (tuple): The viewport as ((south, west), (north, east)).
+
+        Returns:
+            set: The indices of the intersecting cells.
+        """
+        import shapely
+
+        (south, west), (north, east) = bounds
+        dx, dy = (east - west) * self.padding, (north - south) * self.padding
+        box = shapely.box(west - dx, south - dy, east + dx, north + dy)
+        return set(self.tree.query(box).tolist())
+
+    def cell_layer(self, cell):
+        """Returns the GeoJSON layer of a cell, creating it on first use.
+
+        Args:
+            cell (int): The cell index.
+
+        Returns:
+            ipyleaflet.GeoJSON: The cell layer.
+        """
+        import ipyleaflet
+
+        if cell in self.cells:
+            self.cells.move_to_end(cell)
+            return self.cells[cell]
+
+        rows = self.members[cell]
+        layer = ipyleaflet.GeoJSON(data=to_geojson(self.gdf.iloc[rows]), **self.kwargs)
+        self.cells[cell] = layer
+        self.stats["features_sent"] += len(rows)
+
+        for old in list(self.cells):
+            if len(self.cells) <= self.max_cells:
+                break
+            if old not in self.visible and old != cell:
+                self.cells.pop(old).close()
+        return layer
+
+    def update(self, bounds):
+        """Shows the cells near the given bounds and hides the others.
+
+        Args:
+            bounds (tuple): The viewport as ((south, west), (north, east)).
+        """
+        wanted = self.query(bounds)
+        added, removed = wanted - self.visible, self.visible - wanted
+
+        with self.layer.hold_sync():
+            for cell in removed:
+                self.layer.remove_layer(self.cells[cell])
+            self.visible = wanted
+            for cell in sorted(added):
+                self.layer.add_layer(self.cell_layer(cell))
+
+        self.stats["updates"] += 1
+        self.stats["cells_added"] += len(added)
+        self.stats["cells_removed"] += len(removed)
+
+    def link(self, m):
+        """Updates the visible cells whenever the map bounds change.
+
+        Args:
+            m (ipyleaflet.Map): The map to observe.
+        """
+
+        def on_bounds(change):
+            if change["new"]:
+                self.update(change["new"])
+
+        self.update(m.bounds or estimate_bounds(m.center, m.zoom))
+        m.observe(on_bounds, names="bounds")
+        self.unlink = lambda: m.unobserve(on_bounds, names="bounds")
+
+
+def _hex_to_rgb(color):
+    """Converts a "#rrggbb" or "#rgb" color to an (r, g, b) tuple."""
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    if len(color) != 6:
+        raise ValueError(f"Color '#{color}' is not a hex color.")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def attributes_html(record):
+    """Formats feature attributes as an HTML table for a popup.
+
+    Args:
+        record (dict): The attribute names and values.
+
+    Returns:
+        str: The HTML table.
+    """
+    import html
+
+    rows = "".join(
+        f"<tr><th style='text-align:left;padding-right:8px'>{html.escape(str(k))}</th>"
+        f"<td>{html.escape(str(v))}</td></tr>"
+        for k, v in record.items()
+    )
+    return f"<table>{rows}</table>"
+
+
+# The predicate p' such that p(feature, geometry) == p'(geometry, feature), for the predicates
+# selections support. "contains_properly" is left out: its inverse has no STRtree predicate.
+INVERSE_PREDICATES = {
+    "intersects": "intersects",
+    "overlaps": "overlaps",
+    "crosses": "crosses",
+    "touches": "touches",
+    "within": "contains",
+    "contains": "within",
+    "covered_by": "covers",
+    "covers": "covered_by",
+}
+
+
+def tree_predicate(predicate):
+    """Returns the STRtree predicate that selects the features satisfying a predicate with a geometry.
+
+    Args:
+        predicate (str): The predicate the features must satisfy with the geometry.
+
+    Returns:
+        str: The predicate to query the tree with.
+    """
+    if predicate not in INVERSE_PREDICATES:
+        raise ValueError(f"Predicate '{predicate}' is not supported. Use one of {', '.join(INVERSE_PREDICATES)}.")
+    return INVERSE_PREDICATES[predicate]
+
+
+def drawn_geometry(geo_json):
+    """Converts a shape drawn with ipyleaflet.DrawControl to a shapely geometry.
+
+    Circles arrive as a point with a radius in meters and are turned into
+    polygons.
+
+    Args:
+        geo_json (dict): The GeoJSON Feature of the drawn shape.
+
+    Returns:
+        shapely.Geometry: The geometry in EPSG:4326.
+    """
+    import shapely
+    from pyproj import Transformer
+
+    geometry = shapely.geometry.shape(geo_json["geometry"])
+    radius = geo_json.get("properties", {}).get("style", {}).get("radius")
+    if geometry.geom_type == "Point" and radius:
+        # Web mercator stretches distances by 1 / cos(latitude).
+        scale = 1 / math.cos(math.radians(geometry.y))
+        forward = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+        backward = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        circle = shapely.Point(forward.transform(geometry.x, geometry.y)).buffer(radius * scale, quad_segs=32)
+        geometry = shapely.transform(circle, lambda xy: list(zip(*backward.transform(*xy.T))))
+    return geometry
+
+
+class FeatureIndex:
+    """Finds the features of a vector layer under a location with an STRtree.
+
+    The tree is built on the first query, so layers that are never clicked
+    cost nothing. Because attributes are looked up in the kernel, they do not
+    need to be sent to the map with the geometries.
+
+    Args:
+        data (geopandas.GeoDataFrame | dict): The features, as a GeoDataFrame or a GeoJSON FeatureCollection.
+    """
+
+    def __init__(self, data) -> None:
+        self.data = data
+        self.gdf = None
+        self.tree = None
+
+    def build(self):
+        """Builds the spatial index if it does not exist yet."""
+        if self.tree is None:
+            import geopandas as gpd
+            import shapely
+
+            gdf = self.data
+            if isinstance(gdf, dict):
+                gdf = gpd.GeoDataFrame.from_features(gdf, crs="EPSG:4326")
+            self.gdf = to_wgs84(gdf)
+            self.tree = shapely.STRtree(self.gdf.geometry.values)
+            self.data = None
+
+    def identify(self, lon, lat, zoom=None, tolerance=3):
+        """Returns the features under a location.
+
+        Args:
+            lon (float): The longitude.
+            lat (float): The latitude.
+            zoom (float, optional): The map zoom, used to widen the search by tolerance pixels for lines and
+                points. Defaults to None (exact hits only).
+            tolerance (float, optional): The search distance in pixels. Defaults to 3.
+
+        Returns:
+            geopandas.GeoDataFrame: The matching rows.
+        """
+        import shapely
+
+        self.build()
+        point = shapely.Point(lon, lat)
+        if zoom is None:
+            hits = self.tree.query(point, predicate="intersects")
+        else:
+            hits = self.tree.query(point, predicate="dwithin", distance=tolerance * pixel_size(zoom))
+        return self.gdf.iloc[sorted(hits.tolist())]
+
+    def select(self, geometry, predicate="intersects"):
+        """Returns the features that match a spatial predicate with a geometry.
+
+        The tree narrows the features down to those whose bounding boxes
+        intersect the geometry, and the exact predicate is only evaluated for
+        them.
+
+        Args:
+            geometry (shapely.Geometry): The selection geometry in EPSG:4326.
+            predicate (str, optional): The predicate the features must satisfy with the geometry, e.g.
+                "intersects", "within" or "contains". Defaults to "intersects".
+
+        Returns:
+            geopandas.GeoDataFrame: The matching rows.
+        """
+        self.build()
+        # STRtree predicates are evaluated as predicate(geometry, feature).
+        hits = self.tree.query(geometry, predicate=tree_predicate(predicate))
+        return self.gdf.iloc[sorted(hits.tolist())]
+
+
+class VectorTiler:
+    """Renders the features of a GeoDataFrame as XYZ raster tiles in the kernel.
+
+    The geometries stay in the kernel in web mercator with an STRtree over
+    them. Each tile only rasterizes the features the tree returns for its
+    extent, simplified to the tile's pixel size, so the browser receives
+    plain PNG tiles and its memory does not grow with the number of
+    features. Rendered tiles are kept in an LRU. The same tree answers
+    identify queries (see FeatureIndex).
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame to render.
+        style (dict, optional): The Leaflet path style: "color", "weight", "opacity", "fillColor" and
+            "fillOpacity". Defaults to None (the Leaflet defaults).
+        radius (float, optional): The radius of point features in pixels. Defaults to 4.
+        tile_size (int, optional): The tile size in pixels. Defaults to 256.
+        max_bytes (int, optional): The size of the rendered tile cache. Defaults to 64 MiB.
+    """
+
+    def __init__(self, gdf, style=None, radius=4, tile_size=256, max_bytes=64 << 20) -> None:
+        import shapely
+
+        from .tiles import LRUCache
+
+        if gdf.crs is None:
+            gdf = gdf.set_crs("EPSG:4326")
+        self.gdf = gdf
+        self.geometries = gdf.geometry.to_crs("EPSG:3857").values
+        self.tree = shapely.STRtree(self.geometries)
+        self.radius = radius
+        self.tile_size = tile_size
+        self.cache = LRUCache(max_bytes)
+
+        style = {"color": "#3388ff", "weight": 3, "opacity": 1.0, "fillOpacity": 0.2, **(style or {})}
+        style.setdefault("fillColor", style["color"])
+        self.style = style
+
+    def render(self, z, x, y):
+        """Renders a tile.
+
+        Args:
+            z (int): The tile zoom.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The PNG tile, or None if no feature touches the tile.
+        """
+        import numpy as np
+        import shapely
+        from rasterio.features import rasterize
+        from rasterio.transform import from_bounds
+
+        from .raster import encode_png
+        from .tiles import mercator_tile_bounds
+
+        size = self.tile_size
+        minx, miny, maxx, maxy = mercator_tile_bounds(z, x, y)
+        pixel = (maxx - minx) / size
+        pad = (self.style["weight"] / 2 + self.radius) * pixel
+        hits = self.tree.query(shapely.box(minx - pad, miny - pad, maxx + pad, maxy + pad))
+        if not len(hits):
+            return None
+
+        geoms = shapely.simplify(self.geometries[np.sort(hits)], pixel / 2)
+        kind = shapely.get_type_id(geoms)
+        points = (kind == 0) | (kind == 4)
+        geoms[points] = shapely.buffer(geoms[points], self.radius * pixel)
+        areas = (kind == 3) | (kind == 6) | points
+        lines = shapely.boundary(geoms[areas]).tolist() + geoms[(kind == 1) | (kind == 2) | (kind == 5)].tolist()
+
+        transform = from_bounds(minx, miny, maxx, maxy, size, size)
+        rgba = np.zeros((size, size, 4), dtype="uint8")
+        if areas.any() and self.style["fillOpacity"] > 0:
+            mask = rasterize(geoms[areas].tolist(), (size, size), transform=transform, dtype="uint8") > 0
+            rgba[mask] = (*_hex_to_rgb(self.style["fillColor"]), round(255 * self.style["fillOpacity"]))
+
+        lines = [g for g in lines if g is not None and not g.is_empty]
+        if lines and self.style["weight"] > 0 and self.style["opacity"] > 0:
+            if self.style["weight"] > 1:
+                lines = shapely.buffer(lines, self.style["weight"] * pixel / 2).tolist()
+            mask = rasterize(lines, (size, size), transform=transform, all_touched=True, dtype="uint8") > 0
+            rgba[mask] = (*_hex_to_rgb(self.style["color"]), round(255 * self.style["opacity"]))
+
+        if not rgba[..., 3].any():
+            return None
+        return encode_png(rgba)
+
+    def __call__(self, z, x, y):
+        key = (z, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.render(z, x, y)
+            if data is not None:
+                self.cache.put(key, data)
+        return data
+
+    def identify(self, lon, lat, zoom=None, tolerance=3):
+        """Returns the features under a location.
+
+        Args:
+            lon (float): The longitude.
+            lat (float): The latitude.
+            zoom (float, optional): The map zoom, used to widen the search by tolerance pixels for lines and
+                points. Defaults to None (exact hits only).
+            tolerance (float, optional): The search distance in pixels. Defaults to 3.
+
+        Returns:
+            geopandas.GeoDataFrame: The matching rows.
+        """
+        import shapely
+        from pyproj import Transformer
+
+        point = shapely.Point(Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True).transform(lon, lat))
+        if zoom is None:
+            hits = self.tree.query(point, predicate="intersects")
+        else:
+            distance = tolerance * 2 * 20037508.342789244 / (self.tile_size * 2 ** zoom)
+            hits = self.tree.query(point, predicate="dwithin", distance=distance)
+        return self.gdf.iloc[sorted(hits.tolist())]
+
+    def select(self, geometry, predicate="intersects"):
+        """Returns the features that match a spatial predicate with a geometry (see FeatureIndex.select).
+
+        Args:
+            geometry (shapely.Geometry): The selection geometry in EPSG:4326.
+            predicate (str, optional): The spatial predicate. Defaults to "intersects".
+
+        Returns:
+            geopandas.GeoDataFrame: The matching rows.
+        """
+        import shapely
+        from pyproj import Transformer
+
+        forward = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+        geometry = shapely.transform(geometry, lambda xy: list(zip(*forward.transform(*xy.T))))
+        hits = self.tree.query(geometry, predicate=tree_predicate(predicate))
+        return self.gdf.iloc[sorted(hits.tolist())]
+
+
+def add_vector_tile_source(gdf, server=None, **kwargs):
+    """Registers a GeoDataFrame on the local tile server as raster tiles.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): The GeoDataFrame.
+        server (TileServer, optional): The tile server. Defaults to None (the shared server).
+        kwargs: Keyword arguments to pass to VectorTiler.
+
+    Returns:
+        tuple: The VectorTiler and its XYZ URL template.
+    """
+    import uuid
+
+    from .tiles import get_tile_server
+
+    server = server or get_tile_server()
+    tiler = VectorTiler(gdf, **kwargs)
+    return tiler, server.add_source("vector-" + uuid.uuid4().hex[:12], tiler)
+
+
+GEOMETRY_TYPES = {
+    "Point", "MultiPoint", "LineString", "MultiLineString",
+    "Polygon", "MultiPolygon", "GeometryCollection",
+}
+
+
+class _JSONStream:
+    """Decodes consecutive JSON values from a file without reading all of it."""
+
+    def __init__(self, f, chunk_size) -> None:
+        import json
+
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+        self.buf += data
+
+    def peek(self):
+        """Skips whitespace and record separators and returns the next character ('' at the end)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n\x1e":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self.fill(self.chunk_size)
+
+    def take(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Invalid GeoJSON: expected one of {chars!r} but found {c!r}.")
+        self.pos += 1
+        return c
+
+    def value(self):
+        import json
+
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value that ends exactly at the end of the buffer may be a truncated number.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def items(self, close):
+        """Yields once per member of a container, consuming the separators up to ``close``."""
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.take("," + close) == close:
+                return
+
+
+def _stream_features(f, chunk_size):
+    stream = _JSONStream(f, chunk_size)
+
+    # Each top-level value is a FeatureCollection, a Feature or a geometry,
+    # which covers regular GeoJSON as well as GeoJSONSeq and newline-delimited files.
+    while stream.peek():
+        stream.take("{")
+        obj = {}
+        for _ in stream.items("}"):
+            key = stream.value()
+            stream.take(":")
+            if key == "features":
+                stream.take("[")
+                for _ in stream.items("]"):
+                    yield stream.value()
+            else:
+                obj[key] = stream.value()
+
+        if obj.get("type") == "Feature":
+            yield obj
+        elif obj.get("type") in GEOMETRY_TYPES:
+            yield {"type": "Feature", "geometry": obj, "properties": {}}
+
+
+def geometry_bounds(geometry):
+    """Returns the bounding box of a GeoJSON geometry.
+
+    Args:
+        geometry (dict): The GeoJSON geometry.
+
+    Returns:
+        tuple: The bounds as (minx, miny, maxx, maxy), or None for empty geometries.
+    """
+    xs, ys = [], []
+
+    def walk(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            xs.append(coords[0])
+            ys.append(coords[1])
+        else:
+            for c in coords:
+                walk(c)
+
+    def visit(geom):
+        if not geom:
+            return
+        if geom["type"] == "GeometryCollection":
+            for g in geom["geometries"]:
+                visit(g)
+        else:
+            walk(geom["coordinates"])
+
+    visit(geometry)
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def iter_geojson(path, bbox=None, properties=None, max_features=None, chunk_size=1 << 20):
+    """Reads the features of a GeoJSON file one at a time.
+
+    Regular GeoJSON, GeoJSONSeq and newline-delimited GeoJSON are supported.
+    Only one feature is decoded at a time, so memory use does not depend on
+    the size of the file.
+
+    Args:
+        path (str): The path to the GeoJSON file.
+        bbox (tuple, optional): Only keep features intersecting (minx, miny, maxx, maxy). Defaults to None.
+        properties (list, optional): The properties to keep. Defaults to None (all properties).
+        max_features (int, optional): The maximum number of features to read. Defaults to None.
+        chunk_size (int, optional): The number of characters to read at a time. Defaults to 1 MiB.
+
+    Yields:
+        dict: The GeoJSON features.
+    """
+    if max_features is not None and max_features <= 0:
+        return
+    if properties is not None:
+        properties = set(properties)
+
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for feature in _stream_features(f, chunk_size):
+            if bbox is not None:
+                bounds = feature.get("bbox") or geometry_bounds(feature.get("geometry"))
+                if bounds is None:
+                    continue
+                # 3D bboxes are [minx, miny, minz, maxx, maxy, maxz].
+                minx, miny, maxx, maxy = bounds if len(bounds) == 4 else (bounds[0], bounds[1], bounds[3], bounds[4])
+                if minx > bbox[2] or maxx < bbox[0] or miny > bbox[3] or maxy < bbox[1]:
+                    continue
+
+            if properties is not None:
+                props = feature.get("properties") or {}
+                feature["properties"] = {k: v for k, v in props.items() if k in properties}
+
+            yield feature
+            count += 1
+            if max_features is not None and count >= max_features:
+                return
+
+
+def read_geojson(path, bbox=None, properties=None, max_features=None):
+    """Reads a GeoJSON file into a FeatureCollection, streaming and filtering its features.
+
+    Args:
+        path (str): The path to the GeoJSON, GeoJSONSeq or newline-delimited GeoJSON file.
+        bbox (tuple, optional): Only keep features intersecting (minx, miny, maxx, maxy). Defaults to None.
+        properties (list, optional): The properties to keep. Defaults to None (all properties).
+        max_features (int, optional): The maximum number of features to read. Defaults to None.
+
+    Returns:
+        dict: The GeoJSON FeatureCollection.
+    """
+    features = list(iter_geojson(path, bbox=bbox, properties=properties, max_features=max_features))
+    return {"type": "FeatureCollection", "features": features}
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.choropleth` module."""
+
+
+import unittest
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from maplab import choropleth, maplab
+
+
+class TestChoropleth(unittest.TestCase):
+    """Tests for `maplab.choropleth` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.gdf = gpd.GeoDataFrame(
+            {
+                "pop": [1.0, 2.0, 3.0, 10.0, 11.0, 12.0, np.nan],
+                "income": [7.0, 6.0, 5.0, 4.0, 3.0, 2.0, 1.0],
+            },
+            geometry=[shapely.box(i, 0, i + 1, 1) for i in range(7)],
+            crs="EPSG:4326",
+        )
+
+    def test_classify(self):
+        """Test the breaks of each scheme and that missing values get class -1."""
+        values = self.gdf["pop"]
+        classes, bins = choropleth.classify(values, "natural_breaks", k=2)
+        self.assertEqual(bins.tolist(), [3.0, 12.0])
+        self.assertEqual(classes.tolist(), [0, 0, 0, 1, 1, 1, -1])
+
+        _, bins = choropleth.classify(values, "equal_interval", k=2)
+        self.assertEqual(bins.tolist(), [6.5, 12.0])
+        classes, bins = choropleth.classify(values, "quantile", k=3)
+        self.assertEqual(np.bincount(classes[classes >= 0]).tolist(), [2, 2, 2])
+        with self.assertRaises(ValueError):
+            choropleth.classify(values, "unknown")
+
+    def test_natural_breaks(self):
+        """Test that natural breaks separate well-spaced clusters."""
+        rng = np.random.default_rng(1)
+        values = np.concatenate([rng.normal(mean, 1, 50) for mean in [0, 100, 200]])
+        bins = choropleth.natural_breaks(values, k=3)
+        self.assertEqual(len(bins), 3)
+        self.assertEqual(np.bincount(np.searchsorted(bins, values)).tolist(), [50, 50, 50])
+
+    def test_add_choropleth(self):
+        """Test that styles are embedded per feature and restyling keeps the geometries."""
+        m = maplab.Map()
+        layer = m.add_choropleth(self.gdf, "pop", scheme="natural_breaks", k=2)
+        self.assertIsNone(layer.style_callback)
+        self.assertEqual(layer.style, {})
+        features = layer.data["features"]
+        fills = [feature["properties"]["style"]["fillColor"] for feature in features]
+        self.assertEqual(len(set(fills[:3])), 1)
+        self.assertNotEqual(fills[0], fills[3])
+        self.assertEqual(fills[-1], "#cccccc")
+        self.assertIn(layer, m.layers)
+        self.assertEqual(layer.choropleth.legend.title, "pop")
+
+        layer.choropleth.restyle("income")
+        restyled = layer.data["features"]
+        self.assertIs(restyled[0]["geometry"], features[0]["geometry"])
+        self.assertNotEqual(restyled[0]["properties"]["style"], features[0]["properties"]["style"])
+        self.assertEqual(layer.choropleth.legend.title, "income")
+        self.assertEqual(len(layer.choropleth.legend.legend), 2)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.chunks` module."""
+
+
+import operator
+import os
+import tempfile
+import unittest
+
+from maplab import chunks
+
+
+class TestChunks(unittest.TestCase):
+    """Tests for `maplab.chunks` module."""
+
+    def test_csv_ranges(self):
+        """Test that the ranges cover every row after the header and end on line breaks."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rows.csv")
+            with open(path, "w") as f:
+                f.write("a,b\n" + "".join(f"{i},{i * i}\n" for i in range(100)))
+            with open(path, "rb") as f:
+                data = f.read()
+
+            ranges = list(chunks.csv_ranges(path, 50))
+            self.assertGreater(len(ranges), 1)
+            self.assertEqual(b"".join(data[start:end] for start, end in ranges), data[4:])
+            self.assertTrue(all(data[end - 1:end] == b"\n" for _, end in ranges))
+
+    def test_imap_bounded(self):
+        """Test that results come back in task order with and without a pool."""
+        tasks = [(i, i) for i in range(20)]
+        expected = [i * i for i in range(20)]
+        self.assertEqual(list(chunks.imap_bounded(operator.mul, tasks)), expected)
+        self.assertEqual(list(chunks.imap_bounded(operator.mul, iter(tasks), processes=2)), expected)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.events` module."""
+
+
+import time
+import unittest
+
+from maplab import events, maplab
+
+
+class TestEvents(unittest.TestCase):
+    """Tests for `maplab.events` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.now = 0.0
+        self.m = maplab.Map()
+        self.dispatcher = events.EventDispatcher(self.m, clock=lambda: self.now)
+        self.calls = []
+
+    def send(self, event_type, x):
+        self.m._handle_leaflet_event(None, {"event": "interaction", "type": event_type, "x": x}, [])
+
+    def handler(self, **event):
+        self.calls.append(event["x"])
+
+    def test_throttle_latest(self):
+        """Test that a throttled handler gets the first event and the last one of the window."""
+        self.dispatcher.on("mousemove", self.handler, throttle=10)
+        for x in range(5):
+            self.send("mousemove", x)
+        self.assertEqual(self.calls, [0])
+        self.dispatcher.flush()
+        self.assertEqual(self.calls, [0, 4])
+        self.assertEqual(self.dispatcher.stats["mousemove"], {"received": 5, "handled": 2, "dropped": 3})
+
+    def test_throttle_drop(self):
+        """Test that a throttled handler without latest drops events inside the window."""
+        self.dispatcher.on("mousemove", self.handler, throttle=1, latest=False)
+        self.send("mousemove", 0)
+        self.send("mousemove", 1)
+        self.now = 2
+        self.send("mousemove", 2)
+        self.assertEqual(self.calls, [0, 2])
+        self.assertEqual(self.dispatcher.stats["mousemove"]["dropped"], 1)
+
+    def test_throttle_order(self):
+        """Test that an event pending from an elapsed window is not delivered after a newer one."""
+        self.dispatcher.on("mousemove", self.handler, throttle=0.05)
+        self.send("mousemove", 0)
+        self.send("mousemove", 1)
+        self.now = 1
+        self.send("mousemove", 2)
+        time.sleep(0.2)
+        self.assertEqual(self.calls, [0, 2])
+        self.assertEqual(self.dispatcher.stats["mousemove"], {"received": 3, "handled": 2, "dropped": 1})
+
+    def test_debounce(self):
+        """Test that a debounced handler only receives the last event once events stop."""
+        self.dispatcher.on("click", self.handler, debounce=0.05)
+        for x in range(3):
+            self.send("click", x)
+        self.assertEqual(self.calls, [])
+        time.sleep(0.2)
+        self.assertEqual(self.calls, [2])
+
+        self.dispatcher.off("click", self.handler)
+        self.send("click", 3)
+        self.assertEqual(self.calls, [2])
+
+    def test_swipe_control(self):
+        """Test that dragging the swipe control moves the split with throttled updates."""
+        m = maplab.Map()
+        control = m.add_swipe_control("a/{z}/{x}/{y}", "b/{z}/{x}/{y}", "topright", throttle=10)
+
+        def send(event_type, x):
+            m._handle_leaflet_event(None, {"event": "interaction", "type": event_type, "containerPoint": [x, 0]}, [])
+
+        send("mousedown", 0)
+        for x in range(1, 11):
+            send("mousemove", x * 10)
+        m.events.flush()
+        send("mouseup", 100)
+        self.assertAlmostEqual(control.split_position, 50 + 100 / 1024 * 100)
+        self.assertEqual(m.events.stats["mousemove"]["handled"], 2)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.geocoder` module."""
+
+
+import json
+import os
+import unittest
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+from maplab import geocoder, maplab
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "docs", "examples", "data")
+
+
+class TestGeocoder(unittest.TestCase):
+    """Tests for `maplab.geocoder` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.geocoder = geocoder.Geocoder(os.path.join(DATA, "world_cities.csv"), columns=["sov_a3"])
+
+    def test_normalize_names(self):
+        """Test that accents, case and spacing are ignored."""
+        self.assertEqual(list(geocoder.normalize_names(["  São   Paulo", "SAO PAULO", None])), ["sao paulo"] * 2 + [""])
+
+    def test_search(self):
+        """Test that prefix matches are ranked by population."""
+        results = self.geocoder.search("San", limit=3)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r["name"].lower().startswith("san") for r in results))
+        populations = [r["population"] for r in results]
+        self.assertEqual(populations, sorted(populations, reverse=True))
+        others = [r for r in self.geocoder.search("san", limit=1000) if r not in results]
+        self.assertLessEqual(max(r["population"] for r in others), populations[-1])
+        self.assertEqual(self.geocoder.search("qqq"), [])
+
+    def test_geocode(self):
+        """Test batch geocoding of a spreadsheet column."""
+        cities = pd.read_excel(os.path.join(DATA, "CityNames.xlsx"))["City"]
+        result = self.geocoder.geocode(cities)
+        self.assertEqual(len(result), len(cities))
+        self.assertTrue(result.index.equals(cities.index))
+        self.assertGreater(result["latitude"].notna().sum(), 0)
+
+        result = self.geocoder.geocode(["new york", "Nowhere"])
+        self.assertEqual(result["sov_a3"].iloc[0], "USA")
+        self.assertAlmostEqual(result["latitude"].iloc[0], 40.75, places=1)
+        self.assertTrue(pd.isna(result["latitude"].iloc[1]))
+
+    def test_search_control(self):
+        """Test that the search control can query the local endpoint."""
+        m = maplab.Map()
+        control = m.add_search_control(geocoder=self.geocoder)
+        url = control.url.replace("{s}", urllib.parse.quote("paris"))
+        with urllib.request.urlopen(url) as r:
+            results = json.load(r)
+        self.assertEqual(results[0]["display_name"], "Paris")
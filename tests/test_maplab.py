@@ -3,10 +3,19 @@
 """Tests for `maplab` package."""
 
 
+import os
+import subprocess
+import sys
 import unittest
 
 from maplab import maplab
 
+# Cold ``import maplab`` budget in seconds. Override with MAPLAB_IMPORT_BUDGET
+# on slow CI machines.
+IMPORT_BUDGET = float(os.environ.get("MAPLAB_IMPORT_BUDGET", "0.5"))
+
+HEAVY_MODULES = ["ipyleaflet", "pandas", "geopandas", "openpyxl", "folium"]
+
 
 class TestMaplab(unittest.TestCase):
     """Tests for `maplab` package."""
@@ -19,3 +28,101 @@ class TestMaplab(unittest.TestCase):
 
     def test_000_something(self):
         """Test something."""
+
+    def test_001_import_is_lazy(self):
+        """Test that a cold ``import maplab`` stays within budget and loads no heavy dependencies."""
+        code = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import maplab\n"
+            "print(time.perf_counter() - start)\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        elapsed, loaded = float(out[0]), out[1] if len(out) > 1 else ""
+
+        self.assertEqual(loaded, "")
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_002_lazy_attributes(self):
+        """Test that package attributes resolve to the maplab module on first use."""
+        import maplab as package
+
+        self.assertIs(package.Map, maplab.Map)
+        self.assertIs(package.excel_to_dataframe, maplab.excel_to_dataframe)
+        self.assertIn("Map", package.__all__)
+        with self.assertRaises(AttributeError):
+            package.does_not_exist
+
+    def test_002_lazy_submodules(self):
+        """Test that every submodule resolves on a fresh ``import maplab``."""
+        import pkgutil
+
+        import maplab as package
+
+        names = sorted(m.name for m in pkgutil.iter_modules(package.__path__))
+        code = f"import maplab\nfor name in {names!r}:\n    getattr(maplab, name).__name__\n"
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        self.assertTrue(set(names) <= set(dir(package)))
+
+    def test_003_batch(self):
+        """Test that layer changes inside a batch are sent as one update."""
+        import ipyleaflet
+
+        m = maplab.Map()
+        sent = []
+        m.send_state = lambda key=None: sent.append(key)
+
+        before = len(m.layers)
+        layers = [ipyleaflet.TileLayer(url=f"https://tiles/{i}/{{z}}/{{x}}/{{y}}.png") for i in range(5)]
+        with m.batch() as stats:
+            m.add_layers(layers[:3])
+            m.add_tile_layer(layers[3].url, name="four")
+            m.add_layers(layers[4:])
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(stats["changes"], 5)
+        self.assertEqual(stats["messages_sent"], 1)
+        self.assertEqual(stats["messages_saved"], 4)
+        self.assertGreater(stats["bytes_saved"], stats["bytes_sent"])
+        self.assertEqual(len(m.layers), before + 5)
+
+        with m.batch() as stats:
+            m.add_tile_layer(layers[0].url, name="six")
+            m.add_fullscreen_control()
+        self.assertEqual(len(sent), 2)
+        self.assertEqual((stats["changes"], stats["messages_sent"], stats["messages_saved"]), (2, 1, 1))
+        with m.batch() as stats:
+            pass
+        self.assertEqual((stats["messages_sent"], stats["messages_saved"]), (0, 0))
+
+    def test_004_basemaps(self):
+        """Test basemap lookup and that switching basemaps reuses a bounded pool of layers."""
+        m = maplab.Map()
+        self.assertEqual(m.add_basemap("Esri.WorldImagery").name, "Esri.WorldImagery")
+        self.assertEqual(m.add_basemap("OpenStreetMap").name, "OpenStreetMap.Mapnik")
+        with self.assertRaises(ValueError):
+            m.add_basemap("NotABasemap")
+
+        before = len(m.layers)
+        for basemap in ["ROADMAP", "SATELLITE", "ROADMAP", "TERRAIN", "OpenStreetMap", "SATELLITE"]:
+            layer = m.set_basemap(basemap, pool_size=2)
+        self.assertEqual(len(m.layers), before + 2)
+        self.assertEqual([l.visible for l in m.layers[before:]], [False, True])
+        self.assertIs(m.basemap_pool.active, layer)
+        self.assertEqual(m.basemap_pool.stats["hits"], 1)
+
+    def test_005_landcover_timeseries(self):
+        """Test that the NLCD slider only toggles the opacity of pre-registered epochs."""
+        m = maplab.Map()
+        group = m.add_landcover_timeseries(year=2006, cache=False)
+        layers = list(group.layers)
+        self.assertEqual([l.opacity for l in layers], [0, 0, 1, 0, 0])
+        self.assertEqual([l.visible for l in layers], [False, True, True, True, False])
+
+        group.slider.value = 2019
+        self.assertEqual(list(group.layers), layers)
+        self.assertEqual([l.opacity for l in layers], [0, 0, 0, 0, 1])
+        self.assertEqual([l.visible for l in layers], [False, False, False, True, True])
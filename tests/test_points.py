@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.points` module."""
+
+
+import unittest
+
+import numpy as np
+
+from maplab import maplab, points
+
+
+class TestPoints(unittest.TestCase):
+    """Tests for `maplab.points` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        rng = np.random.default_rng(0)
+        self.lon = rng.uniform(-90, -80, 10000)
+        self.lat = rng.uniform(30, 40, 10000)
+
+    def test_mercator_round_trip(self):
+        """Test that projecting to mercator and back is lossless."""
+        x, y = points.lonlat_to_mercator(self.lon, self.lat)
+        lon, lat = points.mercator_to_lonlat(x, y)
+        np.testing.assert_allclose(lon, self.lon)
+        np.testing.assert_allclose(lat, self.lat)
+
+    def test_read_points(self):
+        """Test that bad coordinates are dropped and only requested columns are kept."""
+        import os
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "points.csv")
+            with open(path, "w") as f:
+                f.write("name,longitude,latitude,value\n")
+                f.write("a,-83.9,35.9,1\nb,,35.0,2\nc,abc,1,3\nd,200,10,4\ne,-86.7,36.1,5\n")
+
+            lon, lat, attributes = points.read_points(path, chunksize=2)
+            np.testing.assert_allclose(lon, [-83.9, -86.7])
+            np.testing.assert_allclose(lat, [35.9, 36.1])
+            self.assertIsNone(attributes)
+
+            _, _, attributes = points.read_points(path, columns=["name"], dtype="float32")
+            self.assertEqual(list(attributes.columns), ["name"])
+            self.assertEqual(list(attributes["name"]), ["a", "e"])
+            self.assertEqual(attributes["name"].dtype, "category")
+
+    def test_csv_to_file(self):
+        """Test that chunked conversion keeps every valid row in each output format."""
+        import os
+        import tempfile
+
+        import geopandas as gpd
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "points.csv")
+            with open(path, "w") as f:
+                f.write("id,name,longitude,latitude\n")
+                f.write("".join(f"{i},n{i},{self.lon[i]},{self.lat[i]}\n" for i in range(500)))
+                f.write("500,bad,,35\n")
+
+            for ext in ["shp", "geojsonl", "fgb", "parquet"]:
+                out = os.path.join(tmp, f"points.{ext}")
+                points.csv_to_file(path, out, chunk_bytes=1000)
+                gdf = gpd.read_parquet(out) if ext == "parquet" else gpd.read_file(out)
+                self.assertEqual(len(gdf), 500)
+                self.assertEqual(sorted(gdf["id"]), list(range(500)))
+
+    def test_csv_to_file_types(self):
+        """Test that values after the sampled rows widen cleanly or fail without a partial output."""
+        import os
+        import tempfile
+
+        import geopandas as gpd
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "points.csv")
+            rows = "".join(f"{i},{i % 2},-84,35\n" for i in range(10000))
+            with open(path, "w") as f:
+                f.write("id,flag,longitude,latitude\n" + rows + "10000,1.5,-84.25,35.5\n")
+            out = os.path.join(tmp, "points.parquet")
+            points.csv_to_file(path, out, chunk_bytes=50000)
+            gdf = gpd.read_parquet(out)
+            self.assertEqual(len(gdf), 10001)
+            self.assertEqual(gdf["flag"].iloc[-1], 1.5)
+            self.assertEqual(gdf["longitude"].iloc[-1], -84.25)
+
+            with open(path, "a") as f:
+                f.write("10001,unknown,-84,35\n")
+            for ext in ["parquet", "shp"]:
+                out = os.path.join(tmp, f"bad.{ext}")
+                with self.assertRaises(ValueError):
+                    points.csv_to_file(path, out, chunk_bytes=50000)
+                self.assertFalse(os.path.exists(out))
+            self.assertEqual(sorted(os.listdir(tmp)), ["points.csv", "points.parquet"])
+
+    def test_cluster_index(self):
+        """Test that every level accounts for all points and low zooms have fewer clusters."""
+        index = points.ClusterIndex(self.lon, self.lat, max_zoom=12)
+        world = ((-85, -180), (85, 180))
+        for zoom in [0, 4, 8, 13]:
+            self.assertEqual(index.query(zoom, world)["count"].sum(), len(self.lon))
+        self.assertLess(len(index.query(2, world)["count"]), len(index.query(8, world)["count"]))
+        self.assertEqual(len(index.query(13, world)["count"]), len(self.lon))
+
+        hits = index.query(13, ((35, -85), (36, -84)))
+        inside = (self.lon >= -85) & (self.lon <= -84) & (self.lat >= 35) & (self.lat <= 36)
+        self.assertEqual(sorted(hits["id"].tolist()), np.flatnonzero(inside).tolist())
+
+    def test_add_clusters(self):
+        """Test that the map only receives the clusters in view."""
+        m = maplab.Map(center=[35, -85], zoom=5)
+        layer = m.add_clusters(self.lon, self.lat)
+        features = layer.data["features"]
+        self.assertLess(len(features), len(self.lon))
+        self.assertEqual(sum(f["properties"].get("count", 1) for f in features), len(self.lon))
+
+    def test_add_clusters_empty(self):
+        """Test that a cluster layer without points is empty instead of failing."""
+        empty = np.array([], dtype="float64")
+        self.assertEqual(len(points.ClusterIndex(empty, empty).query(3, ((-85, -180), (85, 180)))["id"]), 0)
+        layer = maplab.Map().add_clusters(empty, empty)
+        self.assertEqual(layer.data["features"], [])
+
+    def test_density_tiles(self):
+        """Test that density tiles count exactly the points inside them."""
+        tiler = points.DensityTiler(self.lon, self.lat, max_zoom=10)
+        x, y = points.lonlat_to_mercator(self.lon, self.lat)
+        for z in [0, 5, 10]:
+            tx, ty = np.floor(x * 2 ** z).astype(int), np.floor(y * 2 ** z).astype(int)
+            inside = (tx == tx[0]) & (ty == ty[0])
+            hist = tiler.histogram(z, tx[0], ty[0])
+            self.assertEqual(hist.sum(), inside.sum())
+            px = np.floor((x[inside] * 2 ** z - tx[0]) * 256).astype(int)
+            py = np.floor((y[inside] * 2 ** z - ty[0]) * 256).astype(int)
+            self.assertEqual(hist[py[0], px[0]], ((px == px[0]) & (py == py[0])).sum())
+
+        png = tiler(5, tx[0] // 32, ty[0] // 32)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertIsNone(tiler(5, 0, 0))
+        self.assertIsNone(tiler(11, 0, 0))
+
+    def test_add_density(self):
+        """Test that the density layer is served by the local tile server."""
+        import urllib.request
+
+        m = maplab.Map(center=[35, -85], zoom=5)
+        layer = m.add_density(self.lon, self.lat)
+        self.assertIn(layer, m.layers)
+        x, y = points.lonlat_to_mercator(-85, 35)
+        url = layer.url.replace("{z}", "5").replace("{x}", str(int(x * 32))).replace("{y}", str(int(y * 32)))
+        with urllib.request.urlopen(url) as r:
+            self.assertEqual(r.headers["Content-Type"], "image/png")
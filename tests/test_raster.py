@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.raster` module."""
+
+
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+from maplab import maplab, raster
+
+
+def decode_png(data):
+    """Decodes the RGBA PNGs written by raster.encode_png."""
+    width, height = struct.unpack(">II", data[16:24])
+    idat = data[41:-16]
+    raw = np.frombuffer(zlib.decompress(idat), dtype="uint8").reshape(height, width * 4 + 1)
+    return raw[:, 1:].reshape(height, width, 4)
+
+
+class TestRaster(unittest.TestCase):
+    """Tests for `maplab.raster` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        import rasterio
+        from rasterio.transform import from_bounds
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "dem.tif")
+        data = np.linspace(0, 1000, 512 * 512, dtype="float32").reshape(512, 512)
+        profile = {
+            "driver": "GTiff", "width": 512, "height": 512, "count": 1, "dtype": "float32",
+            "crs": "EPSG:4326", "transform": from_bounds(-90, 30, -80, 40, 512, 512),
+            "tiled": True, "blockxsize": 256, "blockysize": 256, "nodata": -1,
+        }
+        with rasterio.open(self.path, "w", **profile) as dst:
+            dst.write(data, 1)
+            dst.build_overviews([2, 4])
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self.tmp.cleanup()
+
+    def test_encode_png(self):
+        """Test that encoded PNGs round trip."""
+        rgba = np.random.default_rng(0).integers(0, 255, (8, 16, 4), dtype="uint8")
+        np.testing.assert_array_equal(decode_png(raster.encode_png(rgba)), rgba)
+
+    def test_cog_tiler(self):
+        """Test rendering, transparency outside the data and the tile cache."""
+        tiler = raster.COGTiler(self.path, colormap="viridis")
+        np.testing.assert_allclose(tiler.bounds, (-90, 30, -80, 40))
+        self.assertLess(tiler.rescale[0][0], tiler.rescale[0][1])
+
+        tile = decode_png(tiler(4, 4, 6))
+        self.assertEqual(tile.shape, (256, 256, 4))
+        self.assertTrue((tile[..., 3] == 255).any())
+        self.assertTrue((tile[..., 3] == 0).any())
+
+        self.assertIsNone(tiler(4, 12, 6))
+        tiler(4, 4, 6)
+        self.assertEqual(tiler.cache.stats["hits"], 1)
+        tiler.close()
+
+    def test_cog_tiler_overviews(self):
+        """Test that low zoom tiles are read from an overview and high zoom tiles from full resolution."""
+        import rasterio
+        from rasterio.enums import Resampling
+        from rasterio.transform import from_bounds
+
+        path = os.path.join(self.tmp.name, "overviews.tif")
+        profile = {
+            "driver": "GTiff", "width": 2048, "height": 2048, "count": 1, "dtype": "uint8",
+            "crs": "EPSG:4326", "transform": from_bounds(-90, 30, -80, 40, 2048, 2048),
+            "tiled": True, "blockxsize": 256, "blockysize": 256,
+        }
+        # The overviews hold 200 and the full resolution data 10, so each tile shows where it was read from.
+        with rasterio.open(path, "w", **profile) as dst:
+            dst.write(np.full((2048, 2048), 200, dtype="uint8"), 1)
+            dst.build_overviews([2, 4, 8, 16], Resampling.nearest)
+        with rasterio.open(path, "r+") as dst:
+            dst.write(np.full((2048, 2048), 10, dtype="uint8"), 1)
+
+        tiler = raster.COGTiler(path, colormap="gray")
+        low = decode_png(tiler(4, 4, 6))
+        self.assertEqual(set(low[low[..., 3] == 255, 0].tolist()), {200})
+        high = decode_png(tiler(10, 264, 408))
+        self.assertEqual(set(high[high[..., 3] == 255, 0].tolist()), {10})
+        tiler.close()
+
+    def test_add_raster(self):
+        """Test that add_raster points at the local tile server."""
+        m = maplab.Map()
+        layer = m.add_raster(self.path, colormap="terrain")
+        self.assertTrue(layer.url.startswith("http://127.0.0.1:"))
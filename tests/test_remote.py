@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.remote` module."""
+
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from maplab import maplab, remote
+
+
+class TiTiler(BaseHTTPRequestHandler):
+    """A stand-in TiTiler server that answers /cog/info and /cog/tilejson.json slowly."""
+
+    requests = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with TiTiler.lock:
+            TiTiler.requests.append(self.path)
+            TiTiler.active += 1
+            TiTiler.max_active = max(TiTiler.max_active, TiTiler.active)
+        time.sleep(0.1)
+
+        parsed = urlparse(self.path)
+        url = parse_qs(parsed.query)["url"][0]
+        if parsed.path == "/cog/info":
+            body = {"bounds": [-90, 30, -80, 40]}
+        else:
+            body = {"tiles": [f"http://tiles/{os.path.basename(url)}/{{z}}/{{x}}/{{y}}"]}
+        data = json.dumps(body).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with TiTiler.lock:
+            TiTiler.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRemote(unittest.TestCase):
+    """Tests for `maplab.remote` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), TiTiler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cache = remote.MetadataCache(os.path.join(self.tmp.name, "metadata.json"))
+        TiTiler.requests, TiTiler.max_active = [], 0
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_cog_metadata(self):
+        """Test that requests run concurrently and results are memoized on disk."""
+        urls = [f"https://data/{i}.tif" for i in range(4)]
+        results = remote.cog_metadata(urls, endpoint=self.endpoint, cache=self.cache)
+        self.assertEqual(len(TiTiler.requests), 8)
+        self.assertGreater(TiTiler.max_active, 2)
+        self.assertEqual(results[2]["tiles"][0], "http://tiles/2.tif/{z}/{x}/{y}")
+
+        remote.cog_metadata(urls[:2], endpoint=self.endpoint, cache=self.cache)
+        reloaded = remote.MetadataCache(self.cache.path)
+        remote.cog_metadata(urls, endpoint=self.endpoint, cache=reloaded)
+        self.assertEqual(len(TiTiler.requests), 8)
+
+    def test_cog_metadata_evicted(self):
+        """Test that metadata is returned even when the cache cannot keep it."""
+        urls = [f"https://data/{i}.tif" for i in range(3)]
+        for cache in [remote.MetadataCache(self.cache.path, max_entries=1),
+                      remote.MetadataCache(self.cache.path, ttl=0)]:
+            results = remote.cog_metadata(urls, endpoint=self.endpoint, cache=cache)
+            tiles = [result["tiles"][0] for result in results]
+            self.assertEqual(tiles, [f"http://tiles/{i}.tif/{{z}}/{{x}}/{{y}}" for i in range(3)])
+
+    def test_metadata_cache_ttl(self):
+        """Test that expired entries are dropped."""
+        cache = remote.MetadataCache(self.cache.path, ttl=0)
+        cache.put("a", {"x": 1})
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("a"))
+
+    def test_add_rasters(self):
+        """Test adding several rasters through a TiTiler endpoint."""
+        remote._metadata_cache = self.cache
+        self.addCleanup(setattr, remote, "_metadata_cache", None)
+        m = maplab.Map()
+        layers = m.add_rasters(["https://data/a.tif", "https://data/b.tif"], titiler_endpoint=self.endpoint)
+        self.assertEqual([layer.name for layer in layers], ["Raster 1", "Raster 2"])
+        self.assertEqual(layers[1].url, "http://tiles/b.tif/{z}/{x}/{y}")
+        m.add_raster("https://data/a.tif", titiler_endpoint=self.endpoint)
+        self.assertEqual(len(TiTiler.requests), 4)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.tables` module."""
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from maplab import maplab, tables
+
+
+class TestTables(unittest.TestCase):
+    """Tests for `maplab.tables` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.xlsx = os.path.join(self.tmp.name, "census.xlsx")
+        self.df = pd.DataFrame({
+            "City": ["Knoxville", "Maryville", "Alcoa", "Oak Ridge"],
+            "County": ["Knox County", "Blount County", "Blount County", "Anderson County"],
+            "Population": [190740, 31907, 10978, 31402],
+        })
+        self.df.to_excel(self.xlsx, sheet_name="Sheet1", index=False)
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self.tmp.cleanup()
+
+    def read(self, **kwargs):
+        return tables.read_excel_cached(self.xlsx, "Sheet1", cache_dir=self.cache_dir, **kwargs)
+
+    def test_read_excel_cached(self):
+        """Test that the second read comes from Parquet with compact dtypes."""
+        first = self.read(usecols=["City", "County"], categories=["City"])
+        self.assertEqual(list(first.columns), ["City", "County"])
+        self.assertEqual(str(first["City"].dtype), "category")
+        self.assertEqual(first["County"].nunique(), 3)
+
+        with mock.patch("pandas.read_excel", side_effect=AssertionError("workbook parsed again")):
+            second = self.read(usecols=["City", "County"], categories=["City"])
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_cache_invalidation(self):
+        """Test that changing the workbook or the sheet options misses the cache."""
+        self.read()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.read(index_col="City")
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        self.df.assign(Population=0).to_excel(self.xlsx, sheet_name="Sheet1", index=False)
+        os.utime(self.xlsx, ns=(0, 10 ** 9))
+        self.assertEqual(self.read()["Population"].sum(), 0)
+
+    def test_excel_to_dataframe(self):
+        """Test that the map helper reads the same data with or without the cache."""
+        with mock.patch.dict(os.environ, {"MAPLAB_CACHE_DIR": self.cache_dir}):
+            cached = maplab.excel_to_dataframe(self.xlsx, "Sheet1", index_col="City")
+        plain = maplab.excel_to_dataframe(self.xlsx, "Sheet1", index_col="City", cache=False)
+        pd.testing.assert_frame_equal(cached, plain)
+        self.assertNotEqual(str(cached["County"].dtype), "category")
+        cached.loc[cached.index[0], "County"] = "Anderson"
+
+        with mock.patch.dict(os.environ, {"MAPLAB_CACHE_DIR": self.cache_dir}):
+            cached = maplab.excel_to_dataframe(self.xlsx, "Sheet1", categories=["County"])
+        plain = maplab.excel_to_dataframe(self.xlsx, "Sheet1", categories=["County"], cache=False)
+        pd.testing.assert_frame_equal(cached, plain)
+        self.assertEqual(str(cached["County"].dtype), "category")
+
+    def test_join_shapefile_to_dataframe(self):
+        """Test that cached joins match the old path and do not re-read the shapefile."""
+        import geopandas as gpd
+        import shapely
+
+        shp = os.path.join(self.tmp.name, "cities.shp")
+        gpd.GeoDataFrame(
+            self.df[["City"]], geometry=shapely.points(range(4), range(4)), crs="EPSG:4326",
+        ).to_file(shp)
+        values = self.df.set_index("City")[["Population"]].iloc[::-1].iloc[1:]
+
+        expected = gpd.read_file(shp).set_index("City")
+        expected["NAME"] = expected.index
+        expected = expected.join(values, on="NAME")
+
+        with mock.patch.dict(os.environ, {"MAPLAB_CACHE_DIR": self.cache_dir}):
+            joined = maplab.join_shapefile_to_dataframe(values, shp, "City", "NAME")
+            pd.testing.assert_frame_equal(pd.DataFrame(joined), pd.DataFrame(expected))
+            self.assertTrue(pd.isna(joined.loc["Oak Ridge", "Population"]))
+
+            with mock.patch("geopandas.read_file", side_effect=AssertionError("shapefile read again")):
+                again = maplab.join_shapefile_to_dataframe(values, shp, "City", "NAME")
+            pd.testing.assert_frame_equal(pd.DataFrame(again), pd.DataFrame(joined))
+
+            tables._stores.clear()
+            with mock.patch("geopandas.read_file", side_effect=AssertionError("shapefile read again")):
+                maplab.join_shapefile_to_dataframe(values, shp, "City", "NAME")
+            self.assertTrue(any(name.endswith(".parquet") for name in os.listdir(os.path.join(self.cache_dir, "tables"))))
+
+        with self.assertRaises(ValueError):
+            tables.join_indexed(expected, values)
+
+    def test_aggregate(self):
+        """Test that chunked aggregates match pandas, from a dataframe and from files."""
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "County": rng.choice(["Knox", "Blount", "Anderson", "Sevier"], 5000),
+            "Population": rng.integers(0, 1000, 5000),
+            "Income": rng.normal(50000, 10000, 5000),
+        })
+        df.loc[::9, "Income"] = np.nan
+        grouped = df.groupby("County")
+        aggs = {"Population": ["sum", "count", "min", "max"], "Income": ["mean", "median"]}
+
+        csv = os.path.join(self.tmp.name, "records.csv")
+        df.to_csv(csv, index=False)
+        parquet = os.path.join(self.tmp.name, "records.parquet")
+        df.to_parquet(parquet, row_group_size=1000)
+
+        for source, kwargs in [(df, {"chunk_rows": 700}), (csv, {"chunk_bytes": 20000, "processes": 2}), (parquet, {})]:
+            out = tables.aggregate(source, "County", aggs, **kwargs)
+            self.assertEqual(list(out.columns), ["Population_sum", "Population_count", "Population_min",
+                                                 "Population_max", "Income_mean", "Income_q50"])
+            self.assertEqual(out["Population_sum"].tolist(), grouped["Population"].sum().tolist())
+            self.assertEqual(out["Population_count"].tolist(), grouped["Population"].count().tolist())
+            self.assertEqual(out["Population_max"].tolist(), grouped["Population"].max().tolist())
+            np.testing.assert_allclose(out["Income_mean"], grouped["Income"].mean())
+            np.testing.assert_allclose(out["Income_q50"], grouped["Income"].median(), rtol=0.01)
+
+        exact = tables.aggregate(df, "County", {"Income": ["median", 0.9]}, chunk_rows=700)
+        np.testing.assert_array_equal(exact["Income_q50"], grouped["Income"].median())
+        np.testing.assert_array_equal(exact["Income_q90"], grouped["Income"].quantile(0.9))
+        median = maplab.aggregate_by_county(df, "County", "Income", "median")
+        pd.testing.assert_series_equal(median, grouped["Income"].median())
+
+        small = tables.aggregate(df.iloc[:100], "County", [("Income", 0.25)])
+        np.testing.assert_allclose(small["Income_q25"], df.iloc[:100].groupby("County")["Income"].quantile(0.25))
+
+        with self.assertRaises(ValueError):
+            tables.aggregate(df, "County", [("Income", "std")])
+
+    def test_aggregate_late_types(self):
+        """Test that CSV values unlike the sampled rows are aggregated instead of failing the read."""
+        df = pd.DataFrame({"County": [1, 2] * 10001, "Pop": list(range(20002))})
+        lines = df.to_csv(index=False).splitlines()
+        lines[20001] = "1,2.5"
+        lines.append("2,")
+        lines.append("3,n/a")
+        csv = os.path.join(self.tmp.name, "late.csv")
+        with open(csv, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        expected = pd.read_csv(csv, na_values=["n/a"]).groupby("County")["Pop"].agg(["sum", "count"])
+        out = tables.aggregate(csv, "County", {"Pop": ["sum", "count"]}, chunk_bytes=4096)
+        self.assertEqual(out.index.tolist(), [1, 2, 3])
+        self.assertEqual(out["Pop_sum"].tolist(), expected["sum"].tolist())
+        self.assertEqual(out["Pop_count"].tolist(), expected["count"].tolist())
+
+    def test_aggregate_by_county(self):
+        """Test that the census helper keeps its single aggregate result and accepts several."""
+        series = maplab.aggregate_by_county(self.df, "County", "Population", "sum")
+        pd.testing.assert_series_equal(series, self.df.groupby("County")["Population"].agg("sum"))
+        std = maplab.aggregate_by_county(self.df, "County", "Population", "std")
+        pd.testing.assert_series_equal(std, self.df.groupby("County")["Population"].agg("std"))
+        many = maplab.aggregate_by_county(self.df, "County", "Population", ["sum", "mean"])
+        self.assertEqual(many.loc["Blount County"].tolist(), [42885, 21442.5])
+
+    def test_text_pipeline(self):
+        """Test that the pipeline matches the pandas string methods on plain and categorical columns."""
+        names = pd.Series(["Knox County", "Blount County", None, "Knox County"], index=list("abcd"))
+        expected = names.str.replace(" County", "")
+        pd.testing.assert_series_equal(maplab.edit_city_names(names, " County"), expected)
+        categorical = maplab.edit_city_names(names.astype("category"), " County")
+        self.assertEqual(str(categorical.dtype), "category")
+        self.assertEqual(categorical.astype("object").tolist(), expected.astype("object").tolist())
+
+        df = pd.DataFrame({"Cities": ["Alcoa, Maryville", "Knoxville", None], "County": ["Blount County"] * 3})
+        pipeline = tables.TextPipeline().strip_suffix(" County").copy_index(["Row"])
+        out = pipeline.apply(df, columns=["County"])
+        self.assertEqual(df["County"].iloc[0], "Blount County")
+        self.assertEqual(out["County"].tolist(), ["Blount"] * 3)
+        self.assertEqual(out["Row"].tolist(), [0, 1, 2])
+
+        same = maplab.columns_to_list(df, ["Cities"])
+        self.assertIs(same, df)
+        self.assertEqual(df["Cities"].iloc[0], ["Alcoa", "Maryville"])
+        self.assertTrue(pd.isna(df["Cities"].iloc[2]))
+
+        repeated = maplab.columns_to_list(pd.DataFrame({"Cities": ["Alcoa, Maryville"] * 2}), ["Cities"])
+        repeated["Cities"].iloc[0].append("Knoxville")
+        self.assertEqual(repeated["Cities"].iloc[1], ["Alcoa", "Maryville"])
+        self.assertIs(maplab.copy_columns_to_index(df, ["Row"]), df)
+        self.assertEqual(df["Row"].tolist(), [0, 1, 2])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.tiles` module."""
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from maplab import tiles
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """A stand-in tile server that returns the same PNG for every tile."""
+
+    requests = []
+
+    def do_GET(self):
+        Upstream.requests.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTiles(unittest.TestCase):
+    """Tests for `maplab.tiles` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.upstream = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+        threading.Thread(target=self.upstream.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.upstream.server_address[1]}/{{z}}/{{x}}/{{y}}.png"
+        self.server = tiles.TileServer()
+        Upstream.requests = []
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self.server.stop()
+        self.upstream.shutdown()
+        self.upstream.server_close()
+        self.tmp.cleanup()
+
+    def test_neighbors(self):
+        """Test the ring, parent and children of a tile."""
+        self.assertEqual(len(tiles.neighbors(3, 4, 4)), 13)
+        self.assertEqual(len(tiles.neighbors(0, 0, 0)), 4)
+
+    def test_tile_cache_lru(self):
+        """Test that the cache evicts least recently used tiles and reloads from disk."""
+        cache = tiles.TileCache(self.tmp.name, max_bytes=250)
+        for x in range(3):
+            cache.put("src", 1, x, 0, PNG)
+        self.assertIsNone(cache.get("src", 1, 0, 0))
+        self.assertEqual(cache.get("src", 1, 2, 0), PNG)
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertEqual(len(tiles.TileCache(self.tmp.name, max_bytes=250).entries), 2)
+
+    def test_proxy(self):
+        """Test that tiles are served through the proxy, cached and prefetched, and offline mode."""
+        cache = tiles.TileCache(self.tmp.name)
+        url = tiles.proxy_tile_url(self.url, cache=cache, server=self.server)
+
+        r = httpx.get(url.format(z=3, x=4, y=4))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["content-type"], "image/png")
+        self.assertEqual(r.content, PNG)
+
+        for _ in range(100):
+            if len(cache.entries) == 14:
+                break
+            time.sleep(0.05)
+        self.assertEqual(len(cache.entries), 14)
+
+        httpx.get(url.format(z=3, x=4, y=4))
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(len([p for p in Upstream.requests if p == "/3/4/4.png"]), 1)
+
+        offline = tiles.proxy_tile_url(self.url, offline=True, cache=cache, server=self.server)
+        self.assertEqual(httpx.get(offline.format(z=3, x=5, y=4)).status_code, 200)
+        self.assertEqual(httpx.get(offline.format(z=9, x=0, y=0)).status_code, 404)
+
+    def test_proxy_prefetch_on_miss(self):
+        """Test that neighbors are only prefetched when a tile is fetched from upstream."""
+        from unittest import mock
+
+        cache = tiles.TileCache(self.tmp.name)
+        proxy = tiles.TileProxy(self.url, cache)
+        cache.put(proxy.name, 3, 5, 4, PNG)
+        with mock.patch.object(proxy, "_prefetch") as prefetch:
+            self.assertEqual(proxy(3, 5, 4), PNG)
+            prefetch.assert_not_called()
+            self.assertEqual(proxy(3, 4, 4), PNG)
+            self.assertEqual(proxy(3, 4, 4), PNG)
+            prefetch.assert_called_once_with(3, 4, 4)
+        self.assertEqual(Upstream.requests, ["/3/4/4.png"])
+
+    def test_wms_proxy(self):
+        """Test that WMS GetMap requests are built per tile and cached."""
+        cache = tiles.TileCache(self.tmp.name)
+        wms = tiles.wms_tile_url(self.url.split("{z}")[0] + "wms?", "NLCD_2019_Land_Cover_L48")
+        url = tiles.proxy_tile_url(wms, prefetch=False, cache=cache, server=self.server)
+
+        for _ in range(2):
+            self.assertEqual(httpx.get(url.format(z=1, x=0, y=0)).status_code, 200)
+        self.assertEqual(len(Upstream.requests), 1)
+        self.assertIn("request=GetMap", Upstream.requests[0])
+        self.assertIn("bbox=-20037508.342789,0.000000,0.000000,20037508.342789", Upstream.requests[0])
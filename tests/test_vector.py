@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+"""Tests for `maplab.vector` module."""
+
+
+import unittest
+
+import geopandas as gpd
+import shapely
+
+from maplab import maplab, vector
+
+
+def layer_properties(layer):
+    return [feature["properties"] for feature in layer.data["features"]]
+
+
+class TestVector(unittest.TestCase):
+    """Tests for `maplab.vector` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.gdf = gpd.GeoDataFrame(
+            {"name": ["a", "b"]},
+            geometry=[
+                shapely.Point(-83.9207, 35.9606).buffer(1.0, quad_segs=256),
+                shapely.Point(-86.7816, 36.1627).buffer(0.5, quad_segs=256),
+            ],
+            crs="EPSG:4326",
+        )
+
+    def test_simplify_gdf(self):
+        """Test that low zooms drop vertices and round coordinates."""
+        out = vector.simplify_gdf(self.gdf, 2)
+        before = shapely.get_num_coordinates(self.gdf.geometry.values).sum()
+        after = shapely.get_num_coordinates(out.geometry.values).sum()
+        self.assertLess(after, before)
+        x, y = out.geometry.iloc[0].exterior.coords[0]
+        self.assertEqual(x, round(x, vector.zoom_precision(2)))
+        self.assertEqual(list(out["name"]), ["a", "b"])
+
+    def test_level_of_detail_cache(self):
+        """Test that each zoom band is simplified once."""
+        detail = vector.LevelOfDetail(self.gdf)
+        first = detail.geojson(4.2)
+        self.assertIs(detail.geojson(3.8), first)
+        self.assertEqual(sorted(detail.cache), [4])
+
+    def test_add_gdf_lod(self):
+        """Test that the layer data follows the map zoom."""
+        m = maplab.Map(zoom=2)
+        layer = m.add_gdf(self.gdf, lod=True)
+        low = layer.data
+        m.zoom = 12
+        self.assertIsNot(layer.data, low)
+        m.zoom = 2
+        self.assertIs(layer.data, low)
+
+    def test_viewport_culler(self):
+        """Test that only cells near the viewport are shown and panning applies diffs."""
+        points = gpd.GeoDataFrame(
+            {"id": range(400)},
+            geometry=gpd.points_from_xy([x % 20 * 5 - 50 for x in range(400)], [x // 20 * 4 - 40 for x in range(400)]),
+            crs="EPSG:4326",
+        )
+        culler = vector.ViewportCuller(points, cell_size=10, padding=0)
+        culler.update(((-40, -50), (-31, -41)))
+        shown = sum(len(layer.data["features"]) for layer in culler.layer.layers)
+        self.assertLess(shown, len(points))
+        self.assertGreater(shown, 0)
+
+        culler.update(((-40, -50), (-31, -31)))
+        self.assertGreater(culler.stats["cells_added"], 1)
+        self.assertEqual(len(culler.layer.layers), len(culler.visible))
+
+    def test_add_gdf_viewport(self):
+        """Test that add_gdf(viewport=True) follows the map bounds."""
+        m = maplab.Map(center=[36, -85], zoom=6)
+        group = m.add_gdf(self.gdf, viewport=True)
+        self.assertEqual(len(group.layers), 2)
+        with self.assertRaises(ValueError):
+            m.add_gdf(self.gdf, viewport=True, lod=True)
+
+        for empty in [self.gdf.iloc[:0], self.gdf.assign(geometry=[shapely.Polygon(), None])]:
+            group = m.add_gdf(empty, viewport=True)
+            self.assertEqual(group.layers, ())
+
+    def test_vector_tiler(self):
+        """Test that tiles are only rendered where features are and clicks find them."""
+        tiler = vector.VectorTiler(self.gdf, style={"color": "#ff0000", "weight": 2})
+        png = tiler(6, 17, 25)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertIs(tiler(6, 17, 25), png)
+        self.assertIsNone(tiler(6, 0, 0))
+
+        self.assertEqual(list(tiler.identify(-83.9, 35.9)["name"]), ["a"])
+        self.assertTrue(tiler.identify(0, 0).empty)
+
+    def test_add_gdf_raster(self):
+        """Test that add_gdf(raster=True) adds a tile layer and a click popup."""
+        m = maplab.Map(center=[36, -85], zoom=6)
+        layer = m.add_gdf(self.gdf, raster=True, style={"fillColor": "#00ff00"})
+        self.assertIn("/tiles/vector-", layer.url)
+        m._handle_leaflet_event(None, {"event": "interaction", "type": "click", "coordinates": [36.1627, -86.7816]}, [])
+        popup = m.identify_options["popup"]
+        self.assertIn(popup, m.layers)
+        self.assertIn("<td>b</td>", popup.child.value)
+
+    def test_identify(self):
+        """Test that features are identified in the kernel when properties are not sent."""
+        import ipywidgets
+
+        m = maplab.Map(center=[36, -85], zoom=6)
+        lower = m.add_gdf(self.gdf, name="lower", properties=[])
+        self.assertEqual(layer_properties(lower), [{}, {}])
+        upper = m.add_gdf(self.gdf.iloc[:1], name="upper", viewport=True)
+
+        hits = m.identify(-83.9, 35.9)
+        self.assertEqual([layer for layer, _ in hits], [upper, lower])
+        self.assertEqual(list(hits[1][1]["name"]), ["a"])
+        self.assertEqual(m.identify(0, 0), [])
+
+        upper.visible = False
+        self.assertEqual([layer for layer, _ in m.identify(-83.9, 35.9)], [lower])
+
+        output = ipywidgets.Output()
+        m.set_identify("mousemove", output=output)
+        m._handle_leaflet_event(None, {"event": "interaction", "type": "click", "coordinates": [35.9, -83.9]}, [])
+        self.assertEqual(output.outputs, ())
+        m._handle_leaflet_event(None, {"event": "interaction", "type": "mousemove", "coordinates": [35.9, -83.9]}, [])
+        self.assertIn("<td>a</td>", output.outputs[0]["data"]["text/html"])
+
+        m.remove_layer(upper)
+        self.assertEqual([layer for layer, _ in m.feature_indexes], [lower])
+        m.clear_layers()
+        self.assertEqual(m.feature_indexes, [])
+
+    def test_select(self):
+        """Test that drawn shapes select features from every visible layer and can be exported."""
+        import os
+        import tempfile
+
+        m = maplab.Map(center=[36, -85], zoom=6)
+        m.add_gdf(self.gdf, name="circles", properties=[])
+        m.add_gdf(self.gdf, name="tiles", raster=True)
+        control = m.add_draw_control(select=True)
+
+        box = {"type": "Feature", "properties": {},
+               "geometry": shapely.geometry.mapping(shapely.box(-84.5, 35.5, -83.5, 36.5))}
+        control._handle_leaflet_event(None, {"event": "draw:created", "geo_json": box}, [])
+        self.assertEqual(sorted(m.selection["layer"]), ["circles", "tiles"])
+        self.assertEqual(list(m.selection["name"]), ["a", "a"])
+        self.assertEqual(len(m.selection_layer.data["features"]), 2)
+
+        within = m.select(shapely.box(-85.5, 34.5, -82, 37.5), predicate="within", highlight=False)
+        self.assertEqual(list(within["name"]), ["a", "a"])
+        self.assertEqual(len(m.select(shapely.box(-84.5, 35.5, -83.5, 36.5), predicate="within")), 0)
+        contains = m.select(shapely.Point(-83.9207, 35.9606), predicate="contains", highlight=False)
+        self.assertEqual(list(contains["name"]), ["a", "a"])
+        with self.assertRaises(ValueError):
+            m.select(shapely.Point(-83.9207, 35.9606), predicate="contains_properly")
+
+        circle = {"type": "Feature", "properties": {"style": {"radius": 20000}},
+                  "geometry": {"type": "Point", "coordinates": [-86.7816, 36.1627]}}
+        control._handle_leaflet_event(None, {"event": "draw:created", "geo_json": circle}, [])
+        self.assertEqual(list(m.selection["name"]), ["b", "b"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "selection.gpkg")
+            m.export_selection(path)
+            self.assertEqual(list(gpd.read_file(path)["name"]), ["b", "b"])
+
+        control._handle_leaflet_event(None, {"event": "draw:deleted", "geo_json": circle}, [])
+        self.assertNotIn(m.selection_layer, m.layers)
+        with self.assertRaises(ValueError):
+            m.export_selection("selection.gpkg")
+
+    def test_geojson_cache(self):
+        """Test that equal contents share one payload and evicted payloads spill to disk."""
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = vector.GeoJSONCache(max_bytes=vector.geojson_nbytes(self.gdf), spill=True, directory=tmp)
+            first = cache.get(self.gdf)
+            self.assertEqual(first, self.gdf.__geo_interface__)
+            self.assertIs(cache.get(self.gdf.copy()), first)
+
+            changed = self.gdf.assign(name=["a", "c"])
+            self.assertNotEqual(vector.content_hash(changed), vector.content_hash(self.gdf))
+            self.assertEqual(cache.get(changed)["features"][1]["properties"]["name"], "c")
+            self.assertEqual(cache.stats["spilled"], 1)
+            self.assertEqual(cache.get(self.gdf), first)
+            self.assertEqual(cache.stats, {"hits": 1, "disk_hits": 1, "misses": 2, "spilled": 2})
+
+    def test_geojson_cache_backends(self):
+        """Test that both map backends reuse the cached GeoJSON."""
+        from maplab import foliumap
+
+        gdf = self.gdf.assign(name=["x", "y"])
+        layer = maplab.Map().add_gdf(gdf)
+        folium_layer = foliumap.Map().add_gdf(gdf, "counties")
+        self.assertIs(folium_layer.data, layer.data)
+
+    def test_add_geojson_cache(self):
+        """Test that adding the same GeoJSON file twice serializes it once."""
+        import tempfile
+
+        from maplab import foliumap
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/cities.geojson"
+            self.gdf.assign(name=["file", "cache"]).to_file(path, driver="GeoJSON")
+            stats = dict(vector.get_geojson_cache().stats)
+            m = maplab.Map()
+            first = m.add_geojson(path)
+            second = m.add_geojson(path)
+            folium_layer = foliumap.Map().add_geojson(path, "cities")
+
+        self.assertIs(second.data, first.data)
+        self.assertIs(folium_layer.data, first.data)
+        self.assertEqual(vector.get_geojson_cache().stats["misses"], stats["misses"] + 1)
+        self.assertEqual(layer_properties(first), [{"name": "file"}, {"name": "cache"}])
+
+    def test_iter_geojson(self):
+        """Test streaming a FeatureCollection with filters and small read chunks."""
+        import json
+        import tempfile
+
+        features = [
+            {"type": "Feature", "properties": {"id": i, "name": f"n{i}"},
+             "geometry": {"type": "Point", "coordinates": [i * 1.5, -i]}}
+            for i in range(50)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/points.geojson"
+            with open(path, "w") as f:
+                json.dump({"type": "FeatureCollection", "name": "x", "features": features}, f)
+
+            out = list(vector.iter_geojson(path, chunk_size=7))
+            self.assertEqual(out, features)
+
+            out = list(vector.iter_geojson(path, bbox=(0, -10, 9, 0), properties=["id"], chunk_size=7))
+            self.assertEqual([f["properties"] for f in out], [{"id": i} for i in range(7)])
+
+            fc = vector.read_geojson(path, max_features=3)
+            self.assertEqual(len(fc["features"]), 3)
+
+    def test_iter_geojson_seq(self):
+        """Test streaming GeoJSONSeq and newline-delimited GeoJSON."""
+        import json
+        import tempfile
+
+        feature = {"type": "Feature", "properties": {"a": 1}, "geometry": {"type": "Point", "coordinates": [1, 2]}}
+        with tempfile.TemporaryDirectory() as tmp:
+            for sep in ["", "\x1e"]:
+                path = f"{tmp}/points.geojsons"
+                with open(path, "w") as f:
+                    f.write("".join(sep + json.dumps(feature) + "\n" for _ in range(5)))
+                self.assertEqual(list(vector.iter_geojson(path, chunk_size=5)), [feature] * 5)